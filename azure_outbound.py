@@ -0,0 +1,459 @@
+# azure_outbound.py
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, TypeVar
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+T = TypeVar("T")
+
+# Retry-After values above this are treated as "give up now" rather than slept through.
+MAX_RETRY_AFTER_SECONDS = 60.0
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling Azure while an endpoint's circuit breaker is open."""
+
+
+# ---------------------------
+#  Building blocks
+# ---------------------------
+
+class TokenBucket:
+    """
+    Request-rate limiter: `rate` tokens per second, bursts up to `burst`.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token and return how long the caller must wait before using it.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def try_acquire(self) -> bool:
+        """
+        Take a token only if one is available now.
+        """
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit: grows by one after a full window of successes,
+    halves when the service throttles, and pauses new calls until the
+    service's Retry-After has passed.
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 64):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(initial)
+        self.in_flight = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """
+        Take a slot if one is free. Returns 0 on success, otherwise a suggested wait.
+        """
+        with self._lock:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                return pause
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return 0.0
+        return 0.01
+
+    def release(self, throttled: bool = False, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+                self._successes = 0
+                if retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            else:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self.limit = min(self.maximum, self.limit + 1)
+                    self._successes = 0
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of recent traffic: each first attempt deposits
+    `ratio` tokens, each retry spends one, plus `min_per_second` always-available
+    retries. Keeps retries from multiplying load during an outage.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, cap: float = 50.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.cap = cap
+        self._tokens = cap
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.cap, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.cap, self._tokens + (now - self._updated) * self.min_per_second)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and fails fast for
+    `reset_timeout` seconds; then lets a single probe call through (half-open)
+    and closes again if it succeeds.
+
+    Callers must call release() when an admitted call ends, whatever the
+    outcome, so a probe that neither succeeds nor fails (a fatal 4xx, a 429,
+    cancellation) does not keep the circuit half-open forever.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def release(self) -> None:
+        """
+        End of an admitted call; lets the next call probe if this one was the
+        half-open probe and recorded no outcome.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+
+# ---------------------------
+#  Error classification
+# ---------------------------
+
+def _status_code(error: BaseException) -> Optional[int]:
+    # azure.core HttpResponseError and openai APIStatusError both expose status_code.
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Retry-After hint from the error's HTTP response, in seconds.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    for name, scale in (("retry-after-ms", 0.001), ("x-ms-retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            continue
+    return None
+
+
+def _is_transport_error(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    # azure.core ServiceRequestError/ServiceResponseError, openai APIConnectionError/APITimeoutError
+    name = type(error).__name__
+    return any(part in name for part in ("Timeout", "Connection", "ServiceRequest", "ServiceResponse"))
+
+
+def classify(error: BaseException) -> str:
+    """
+    "throttled" (429), "transient" (5xx/408/network) or "fatal" (anything else).
+    """
+    status = _status_code(error)
+    if status == 429:
+        return "throttled"
+    if status is not None:
+        return "transient" if status >= 500 or status == 408 else "fatal"
+    return "transient" if _is_transport_error(error) else "fatal"
+
+
+# ---------------------------
+#  Endpoint
+# ---------------------------
+
+class OutboundEndpoint:
+    """
+    Shared gate for every call to one Azure service: circuit breaker, token
+    bucket, adaptive concurrency, and jittered retries under a retry budget.
+    Use call() from sync code and call_async() from async code.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float = 10.0,
+        burst: float = 20.0,
+        max_concurrency: int = 16,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(
+            initial=max(1, max_concurrency // 2), maximum=max_concurrency
+        )
+        self.budget = RetryBudget()
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._counters = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0, "rejected": 0}
+        self._counters_lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counters_lock:
+            counters = dict(self._counters)
+        counters.update({
+            "circuit": self.breaker.state,
+            "concurrency_limit": int(self.concurrency.limit),
+            "in_flight": self.concurrency.in_flight,
+        })
+        return counters
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError(f"{self.name}: circuit open, failing fast")
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        # Full jitter, but never earlier than the service asked for.
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        return max(delay, retry_after or 0.0)
+
+    def _after_failure(self, error: BaseException, attempt: int) -> float:
+        """
+        Record a failed attempt; return the delay before retrying or re-raise.
+        """
+        kind = classify(error)
+        retry_after = retry_after_seconds(error)
+        self.concurrency.release(throttled=kind == "throttled", retry_after=retry_after)
+
+        if kind == "fatal":
+            raise error
+        if kind == "throttled":
+            # The service is up and asking us to slow down: AIMD and
+            # Retry-After handle that; opening the circuit would stop all traffic.
+            self._count("throttled")
+        else:
+            self._count("failures")
+            self.breaker.record_failure()
+
+        last_attempt = attempt + 1 >= self.max_attempts
+        if last_attempt or (retry_after or 0) > MAX_RETRY_AFTER_SECONDS or not self.budget.try_spend():
+            raise error
+        self._count("retries")
+        return self._backoff(attempt, retry_after)
+
+    def _on_success(self) -> None:
+        self.concurrency.release()
+        self.breaker.record_success()
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        self._count("calls")
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            self._admit()
+            try:
+                time.sleep(self.bucket.reserve())
+                while (wait := self.concurrency.try_acquire()) > 0:
+                    time.sleep(wait)
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    delay = self._after_failure(e, attempt)
+                else:
+                    self._on_success()
+                    return result
+            finally:
+                self.breaker.release()
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        self._count("calls")
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            self._admit()
+            try:
+                await asyncio.sleep(self.bucket.reserve())
+                while (wait := self.concurrency.try_acquire()) > 0:
+                    await asyncio.sleep(wait)
+                try:
+                    result = await fn(*args, **kwargs)
+                except asyncio.CancelledError:
+                    self.concurrency.release()
+                    raise
+                except Exception as e:
+                    delay = self._after_failure(e, attempt)
+                else:
+                    self._on_success()
+                    return result
+            finally:
+                self.breaker.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+# ---------------------------
+#  Registry
+# ---------------------------
+
+# Defaults per service; override with OUTBOUND_<NAME>_RPS / _BURST / _MAX_CONCURRENCY.
+_ENDPOINT_DEFAULTS = {
+    "document_intelligence": {"rate": 15.0, "burst": 15.0, "max_concurrency": 8},
+    "embeddings": {"rate": 10.0, "burst": 20.0, "max_concurrency": 8},
+    "agents": {"rate": 10.0, "burst": 20.0, "max_concurrency": 16},
+}
+
+_endpoints: Dict[str, OutboundEndpoint] = {}
+_endpoints_lock = threading.Lock()
+
+
+def get_endpoint(name: str) -> OutboundEndpoint:
+    """
+    Return the process-wide OutboundEndpoint for a service name.
+    """
+    endpoint = _endpoints.get(name)
+    if endpoint is not None:
+        return endpoint
+
+    with _endpoints_lock:
+        if name not in _endpoints:
+            defaults = _ENDPOINT_DEFAULTS.get(name, {"rate": 10.0, "burst": 20.0, "max_concurrency": 16})
+            prefix = f"OUTBOUND_{name.upper()}_"
+            _endpoints[name] = OutboundEndpoint(
+                name,
+                rate=float(os.getenv(prefix + "RPS", defaults["rate"])),
+                burst=float(os.getenv(prefix + "BURST", defaults["burst"])),
+                max_concurrency=int(os.getenv(prefix + "MAX_CONCURRENCY", defaults["max_concurrency"])),
+            )
+        return _endpoints[name]
+
+
+def outbound_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Counters and current limits of every endpoint used so far.
+    """
+    with _endpoints_lock:
+        endpoints = dict(_endpoints)
+    return {name: endpoint.stats() for name, endpoint in endpoints.items()}
+
+
+# ---------------------------
+#  Per-loop clients
+# ---------------------------
+
+_closing: Set[asyncio.Task] = set()
+
+
+def close_on_owner_loop(owner: asyncio.AbstractEventLoop, close: Callable[[], Awaitable[None]]) -> None:
+    """
+    Close an async client bound to event loop `owner` once it has been replaced
+    by a client for the running loop. If `owner` is still running (another
+    thread), the close runs there; otherwise it runs as a task on the current
+    loop. Must be called from inside a running event loop.
+    """
+    async def run() -> None:
+        try:
+            await close()
+        except Exception:
+            pass  # the client is being discarded either way
+
+    if owner.is_running():
+        asyncio.run_coroutine_threadsafe(run(), owner)
+    else:
+        task = asyncio.get_running_loop().create_task(run())
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
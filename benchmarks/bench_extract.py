@@ -0,0 +1,233 @@
+# bench_extract.py
+"""
+CPU and memory microbenchmarks for the OCR extraction helpers and the chunker.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_extract                       # "statement" preset
+    python -m benchmarks.bench_extract --preset large --repeat 3
+    python -m benchmarks.bench_extract --compare benchmarks/results/<commit>-statement-sdk.json
+
+Results are written to benchmarks/results/<commit>-<preset>-<model>.json (the
+commit gets "-dirty" when the tree has uncommitted changes). --compare prints
+the change against an earlier run and exits with status 1 if any case is
+slower than --threshold.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.synthetic import as_local_result, as_sdk_result, make_analyze_result_dict
+from chunks.chunk_utils import chunk_text
+from ocr_slim import to_slim
+from ocr_utils import (
+    extract_key_value_pairs,
+    extract_lines,
+    extract_plain_text,
+    extract_table_columns,
+    extract_tables,
+)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+PRESETS: Dict[str, Dict[str, int]] = {
+    "small": {"pages": 2, "lines_per_page": 40, "tables": 1, "table_rows": 100, "key_value_pairs": 10},
+    "statement": {"pages": 20, "lines_per_page": 60, "tables": 2, "table_rows": 5000, "key_value_pairs": 40},
+    "large": {"pages": 200, "lines_per_page": 60, "tables": 4, "table_rows": 25000, "key_value_pairs": 100},
+}
+
+
+# ---------------------------
+#  Measurement
+# ---------------------------
+
+def _time_runs(fn: Callable[[], Any], repeat: int) -> List[float]:
+    fn()  # warm-up (lazy imports, caches)
+    runs = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            runs.append(time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return runs
+
+
+def _peak_memory(fn: Callable[[], Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def run_case(name: str, fn: Callable[[], Any], units: int, unit: str, repeat: int) -> Dict[str, Any]:
+    runs = _time_runs(fn, repeat)
+    median = statistics.median(runs)
+    return {
+        "name": name,
+        "unit": unit,
+        "units": units,
+        "best_s": min(runs),
+        "median_s": median,
+        "throughput_per_s": units / median if median else None,
+        "peak_bytes": _peak_memory(fn),
+    }
+
+
+def build_cases(result, text: str, chunk_size: int, overlap: int) -> List[Dict[str, Any]]:
+    lines = len(extract_lines(result))
+    cells = sum(len(row) for table in extract_tables(result) for row in table)
+    pairs = len(extract_key_value_pairs(result))
+    words = len(text.split())
+    return [
+        {"name": "extract_lines", "fn": lambda: extract_lines(result), "units": lines, "unit": "lines"},
+        {"name": "extract_plain_text", "fn": lambda: extract_plain_text(result), "units": lines, "unit": "lines"},
+        {"name": "extract_key_value_pairs", "fn": lambda: extract_key_value_pairs(result), "units": pairs, "unit": "pairs"},
+        {"name": "extract_tables", "fn": lambda: extract_tables(result), "units": cells, "unit": "cells"},
+        {"name": "extract_table_columns", "fn": lambda: extract_table_columns(result), "units": cells, "unit": "cells"},
+        {"name": "chunk_text", "fn": lambda: chunk_text(text, chunk_size, overlap), "units": words, "unit": "words"},
+    ]
+
+
+# ---------------------------
+#  Results
+# ---------------------------
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(RESULTS_DIR),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def commit_label() -> str:
+    commit = _git("rev-parse", "--short", "HEAD") or "unknown"
+    dirty = _git("status", "--porcelain", "--untracked-files=no")
+    return f"{commit}-dirty" if dirty else commit
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Print median time and peak memory changes; return the names of cases slower than threshold.
+    """
+    before = {case["name"]: case for case in baseline["cases"]}
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit')} ({baseline.get('model')}, {baseline.get('preset')}):")
+    for case in current["cases"]:
+        old = before.get(case["name"])
+        if old is None:
+            print(f"  {case['name']:<26} (new)")
+            continue
+        time_change = case["median_s"] / old["median_s"] - 1 if old["median_s"] else 0.0
+        memory_change = case["peak_bytes"] / old["peak_bytes"] - 1 if old["peak_bytes"] else 0.0
+        flag = ""
+        if time_change > threshold:
+            flag = "  <-- slower"
+            regressions.append(case["name"])
+        print(f"  {case['name']:<26} time {time_change:+7.1%}   peak memory {memory_change:+7.1%}{flag}")
+    return regressions
+
+
+def _print_table(report: Dict[str, Any]) -> None:
+    print(f"commit {report['commit']}  model={report['model']}  preset={report['preset']}  {report['params']}")
+    print(f"  {'case':<26}{'median ms':>11}{'best ms':>10}{'throughput':>20}{'peak MiB':>10}")
+    for case in report["cases"]:
+        throughput = f"{case['throughput_per_s']:,.0f} {case['unit']}/s" if case["throughput_per_s"] else "-"
+        print(
+            f"  {case['name']:<26}{case['median_s'] * 1000:>11.2f}{case['best_s'] * 1000:>10.2f}"
+            f"{throughput:>20}{case['peak_bytes'] / 2 ** 20:>10.2f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark extract_* helpers and chunk_text.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="statement")
+    parser.add_argument("--pages", type=int)
+    parser.add_argument("--lines-per-page", type=int)
+    parser.add_argument("--tables", type=int)
+    parser.add_argument("--table-rows", type=int)
+    parser.add_argument("--table-columns", type=int, default=6)
+    parser.add_argument("--span-every", type=int, default=25, help="body rows between merged cells (0 = none)")
+    parser.add_argument("--key-value-pairs", type=int)
+    parser.add_argument("--model", choices=["sdk", "local", "slim"], default="sdk",
+                        help="SDK AnalyzeResult model, ocr_local classes, or ocr_slim SlimDocument")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown treated as a regression")
+    args = parser.parse_args(argv)
+
+    params = dict(PRESETS[args.preset])
+    for name in ("pages", "lines_per_page", "tables", "table_rows", "key_value_pairs"):
+        if getattr(args, name) is not None:
+            params[name] = getattr(args, name)
+    params.update(table_columns=args.table_columns, span_every=args.span_every, seed=args.seed)
+
+    data = make_analyze_result_dict(**params)
+    if args.model == "sdk":
+        result = as_sdk_result(data)
+    elif args.model == "local":
+        result = as_local_result(data)
+    else:
+        result = to_slim(as_local_result(data))
+    text = extract_plain_text(result)
+
+    report: Dict[str, Any] = {
+        "commit": commit_label(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "model": args.model,
+        "preset": args.preset,
+        "params": params,
+        "repeat": args.repeat,
+        "cases": [],
+    }
+    for case in build_cases(result, text, args.chunk_size, args.overlap):
+        report["cases"].append(run_case(case["name"], case["fn"], case["units"], case["unit"], args.repeat))
+
+    _print_table(report)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{report['commit']}-{args.preset}-{args.model}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params or baseline.get("model") != args.model:
+            print("\nWarning: baseline was run with different parameters; ratios are not comparable.")
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
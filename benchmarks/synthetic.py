@@ -0,0 +1,203 @@
+# synthetic.py
+
+import random
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+# Generators for AnalyzeResult-shaped documents of any size, so the extract_*
+# helpers and the chunker can be measured without Azure or a sample PDF.
+
+_WORDS = (
+    "card payment transfer interest fee balance deposit withdrawal grocery market "
+    "coffee fuel rent salary refund online subscription pharmacy restaurant travel "
+    "insurance utilities electricity water phone internet atm cash cheque standing order"
+).split()
+
+_HEADER = ["Date", "Description", "Reference", "Debit", "Credit", "Balance", "Category", "Notes"]
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _polygon(rng: random.Random, top: float) -> List[float]:
+    left = round(rng.uniform(0.5, 1.0), 4)
+    right = round(left + rng.uniform(2.0, 6.0), 4)
+    bottom = round(top + 0.15, 4)
+    return [left, top, right, top, right, bottom, left, bottom]
+
+
+def _cell_text(rng: random.Random, row: int, column: int) -> str:
+    if column == 0:
+        return f"2024-{1 + row % 12:02d}-{1 + row % 28:02d}"
+    if column in (3, 4, 5):
+        return f"{rng.uniform(0, 5000):.2f}"
+    if column == 2:
+        return f"REF{row:08d}"
+    return _sentence(rng, 3)
+
+
+def make_analyze_result_dict(
+    pages: int = 10,
+    lines_per_page: int = 50,
+    words_per_line: int = 8,
+    tables: int = 1,
+    table_rows: int = 1000,
+    table_columns: int = 6,
+    span_every: int = 25,
+    key_value_pairs: int = 20,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Build the JSON (camelCase) form of a prebuilt-layout AnalyzeResult.
+
+    Lines carry spans into `content` and polygons. Every table has a header
+    row; every `span_every`-th body row has a cell spanning two columns and a
+    cell spanning two rows (0 disables spans).
+    """
+    rng = random.Random(seed)
+    content_parts: List[str] = []
+    offset = 0
+
+    def add_text(text: str) -> Dict[str, int]:
+        nonlocal offset
+        span = {"offset": offset, "length": len(text)}
+        content_parts.append(text)
+        offset += len(text) + 1  # joined with "\n"
+        return span
+
+    result_pages = []
+    for page_number in range(1, pages + 1):
+        page_offset = offset
+        lines = []
+        for i in range(lines_per_page):
+            text = _sentence(rng, words_per_line)
+            lines.append({
+                "content": text,
+                "polygon": _polygon(rng, 0.5 + i * 0.2),
+                "spans": [add_text(text)],
+            })
+        result_pages.append({
+            "pageNumber": page_number,
+            "width": 8.5,
+            "height": 11.0,
+            "unit": "inch",
+            "lines": lines,
+            "spans": [{"offset": page_offset, "length": offset - page_offset}],
+        })
+
+    result_tables = []
+    for t in range(tables):
+        page_number = 1 + t % max(pages, 1)
+        cells = []
+        row_count = table_rows + 1
+        covered = set()
+        for row in range(row_count):
+            for column in range(table_columns):
+                if (row, column) in covered:
+                    continue
+                row_span = column_span = 1
+                if row and span_every and row % span_every == 0 and row + 1 < row_count:
+                    if column == 1 and table_columns > 2:
+                        column_span = 2
+                    elif column == 0:
+                        row_span = 2
+                for r in range(row, row + row_span):
+                    for c in range(column, column + column_span):
+                        covered.add((r, c))
+
+                text = _HEADER[column % len(_HEADER)] if row == 0 else _cell_text(rng, row, column)
+                cell = {
+                    "rowIndex": row,
+                    "columnIndex": column,
+                    "content": text,
+                    "boundingRegions": [{"pageNumber": page_number, "polygon": _polygon(rng, 1.0)}],
+                    "spans": [add_text(text)],
+                }
+                if row == 0:
+                    cell["kind"] = "columnHeader"
+                if row_span > 1:
+                    cell["rowSpan"] = row_span
+                if column_span > 1:
+                    cell["columnSpan"] = column_span
+                cells.append(cell)
+        result_tables.append({
+            "rowCount": row_count,
+            "columnCount": table_columns,
+            "cells": cells,
+            "boundingRegions": [{"pageNumber": page_number, "polygon": _polygon(rng, 1.0)}],
+            "spans": [],
+        })
+
+    result_pairs = []
+    for i in range(key_value_pairs):
+        key, value = f"Field {i}", _sentence(rng, 2)
+        result_pairs.append({
+            "key": {"content": key, "spans": [add_text(key)]},
+            "value": {"content": value, "spans": [add_text(value)]},
+            "confidence": round(rng.uniform(0.5, 1.0), 3),
+        })
+
+    return {
+        "apiVersion": "2024-11-30",
+        "modelId": "prebuilt-layout",
+        "content": "\n".join(content_parts),
+        "pages": result_pages,
+        "tables": result_tables,
+        "keyValuePairs": result_pairs,
+    }
+
+
+def as_sdk_result(data: Dict[str, Any]):
+    """
+    Wrap the dict in the SDK's AnalyzeResult model (what analyze_document returns).
+    """
+    from azure.ai.documentintelligence.models import AnalyzeResult
+
+    return AnalyzeResult(data)
+
+
+def as_local_result(data: Dict[str, Any]):
+    """
+    Convert the dict to the plain-attribute shapes in ocr_local (no SDK needed).
+    """
+    from ocr_local import (
+        LocalAnalyzeResult,
+        LocalLine,
+        LocalPage,
+        LocalTable,
+        LocalTableCell,
+        SERVED_BY_AZURE,
+    )
+
+    pages = [
+        LocalPage(page["pageNumber"], [LocalLine(line["content"]) for line in page["lines"]])
+        for page in data["pages"]
+    ]
+    tables = [
+        LocalTable(
+            table["rowCount"],
+            table["columnCount"],
+            [
+                LocalTableCell(
+                    cell["rowIndex"],
+                    cell["columnIndex"],
+                    cell["content"],
+                    cell.get("rowSpan", 1),
+                    cell.get("columnSpan", 1),
+                )
+                for cell in table["cells"]
+            ],
+            table["boundingRegions"][0]["pageNumber"],
+        )
+        for table in data["tables"]
+    ]
+    pairs = [
+        SimpleNamespace(
+            key=SimpleNamespace(content=pair["key"]["content"]),
+            value=SimpleNamespace(content=pair["value"]["content"]),
+        )
+        for pair in data["keyValuePairs"]
+    ]
+    page_sources = {page.page_number: SERVED_BY_AZURE for page in pages}
+    return LocalAnalyzeResult(pages, tables, SERVED_BY_AZURE, page_sources, pairs)
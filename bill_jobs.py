@@ -0,0 +1,302 @@
+# bill_jobs.py
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from fastapi import Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from ocr_local import analyze_document_local_first_async
+from ocr_utils import extract_plain_text, extract_key_value_pairs, extract_tables
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BILL_STORAGE_DIR = os.getenv(
+    "BILL_STORAGE_DIR", os.path.join(tempfile.gettempdir(), "smart-bill-uploads")
+)
+# Uploads larger than this are rejected (413) while they stream in.
+MAX_UPLOAD_BYTES = int(os.getenv("BILL_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+# Upload data is written to disk in blocks of this size.
+UPLOAD_WRITE_CHUNK = 1024 * 1024
+MAX_CONCURRENT_JOBS = int(os.getenv("BILL_MAX_CONCURRENT_JOBS", "4"))
+MAX_TRACKED_JOBS = int(os.getenv("BILL_MAX_TRACKED_JOBS", "1000"))
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+FINAL_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+
+
+# ---------------------------
+#  Streaming Upload
+# ---------------------------
+
+class UploadError(ValueError):
+    """The request body is not a multipart upload with a file in the expected field."""
+
+
+class UploadTooLarge(UploadError):
+    """The uploaded file is over the size limit."""
+
+
+def _content_disposition(value: bytes) -> Tuple[str, Optional[str]]:
+    _, params = parse_options_header(value)
+    name = params.get(b"name", b"").decode("utf-8", "replace")
+    filename = params.get(b"filename")
+    return name, filename.decode("utf-8", "replace") if filename is not None else None
+
+
+async def save_upload(
+    request: Request,
+    field: str = "file",
+    storage_dir: str = BILL_STORAGE_DIR,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+) -> Tuple[str, str, str, str, int]:
+    """
+    Stream the `field` file of a multipart/form-data request straight from the
+    socket to local storage, hashing as it goes and writing UPLOAD_WRITE_CHUNK
+    blocks; nothing is spooled first, so memory use stays around one block
+    whatever the upload size.
+    The file is stored under its SHA-256, so re-uploads of the same bill share one file.
+
+    Returns (filename, content type, path, sha256 hex digest, size in bytes).
+    Raises UploadError if the body has no such file, and UploadTooLarge as
+    soon as the file passes `max_bytes`.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise UploadError("Expected a multipart/form-data body")
+
+    # The parser's callbacks are synchronous; they queue events that the loop
+    # below handles with awaits (file writes go to a thread).
+    events: List[Tuple[str, bytes]] = []
+    parser = MultipartParser(boundary, {
+        "on_part_begin": lambda: events.append(("begin", b"")),
+        "on_header_field": lambda data, start, end: events.append(("field", data[start:end])),
+        "on_header_value": lambda data, start, end: events.append(("value", data[start:end])),
+        "on_header_end": lambda: events.append(("header_end", b"")),
+        "on_headers_finished": lambda: events.append(("headers_done", b"")),
+        "on_part_data": lambda data, start, end: events.append(("data", data[start:end])),
+        "on_part_end": lambda: events.append(("end", b"")),
+    })
+
+    os.makedirs(storage_dir, exist_ok=True)
+    tmp_path = os.path.join(storage_dir, f".{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    filename = part_type = None
+    header_field = header_value = b""
+    headers: Dict[bytes, bytes] = {}
+    f = None
+    buffer = bytearray()
+    writing = done = False
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, data in events:
+                if kind == "begin":
+                    headers = {}
+                elif kind == "field":
+                    header_field += data
+                elif kind == "value":
+                    header_value += data
+                elif kind == "header_end":
+                    headers[header_field.lower()] = header_value
+                    header_field = header_value = b""
+                elif kind == "headers_done" and f is None:
+                    name, part_filename = _content_disposition(headers.get(b"content-disposition", b""))
+                    if name == field and part_filename is not None:
+                        filename = part_filename
+                        part_type = headers.get(b"content-type", b"application/octet-stream").decode("latin-1")
+                        f = await asyncio.to_thread(open, tmp_path, "wb")
+                        writing = True
+                elif kind == "data" and writing:
+                    size += len(data)
+                    if size > max_bytes:
+                        raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes")
+                    digest.update(data)
+                    buffer += data
+                    while len(buffer) >= UPLOAD_WRITE_CHUNK:
+                        block = bytes(buffer[:UPLOAD_WRITE_CHUNK])
+                        del buffer[:UPLOAD_WRITE_CHUNK]
+                        await asyncio.to_thread(f.write, block)
+                elif kind == "end" and writing:
+                    if buffer:
+                        await asyncio.to_thread(f.write, bytes(buffer))
+                        buffer.clear()
+                    writing = False
+                    done = True
+            events.clear()
+        parser.finalize()
+    except BaseException:
+        if f is not None:
+            f.close()
+            os.remove(tmp_path)
+        raise
+    if f is None:
+        raise UploadError(f"No file in form field {field!r}")
+    f.close()
+    if not done:
+        os.remove(tmp_path)
+        raise UploadError("Upload ended before the file part was complete")
+
+    sha256 = digest.hexdigest()
+    _, ext = os.path.splitext(filename or "")
+    path = os.path.join(storage_dir, f"{sha256}{ext.lower()}")
+    os.replace(tmp_path, path)
+    return filename, part_type, path, sha256, size
+
+
+# ---------------------------
+#  Jobs
+# ---------------------------
+
+class BillJob:
+    """
+    One background analysis of an uploaded bill.
+    """
+
+    def __init__(self, filename: str, content_type: str, path: str, sha256: str, size: int):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.content_type = content_type
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.status = STATUS_QUEUED
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._changed = asyncio.Event()
+
+    def set_status(self, status: str) -> None:
+        self.status = status
+        self.updated_at = time.time()
+        # Wake everyone waiting on this job, then re-arm for the next change.
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "filename": self.filename,
+            "content_type": self.content_type,
+            "sha256": self.sha256,
+            "size": self.size,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+async def analyze_bill(path: str) -> Dict[str, Any]:
+    """
+    Run OCR on a stored bill and return text, key-value pairs, tables and, for
+    statements with transaction tables, a ledger summary.
+    """
+    result = await analyze_document_local_first_async(path, features=["keyValuePairs"])
+    # Extraction and the ledger are CPU-bound; keep them off the event loop.
+    return await asyncio.to_thread(_bill_result, result)
+
+
+def _bill_result(result) -> Dict[str, Any]:
+    return {
+        "served_by": result.served_by,
+        "text": extract_plain_text(result),
+        "key_values": extract_key_value_pairs(result),
+        "tables": extract_tables(result),
+        "ledger": _ledger_summary(result),
+    }
+
+
+def _ledger_summary(result) -> Optional[Dict[str, Any]]:
+    # Best effort: a table the ledger cannot make sense of must not fail the OCR job.
+    from ledger import Ledger
+
+    try:
+        ledger = Ledger()
+        ledger.add_statement(result)
+        return ledger.summary() if len(ledger) else None
+    except Exception:
+        logger.warning("Ledger summary failed; returning the OCR result without it", exc_info=True)
+        return None
+
+
+class BillJobStore:
+    """
+    In-process registry of bill jobs. At most `max_concurrent` analyses run at
+    once; only the newest `max_jobs` finished jobs are kept, and a pruned job's
+    stored upload is deleted once no tracked job refers to it.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_JOBS, max_jobs: int = MAX_TRACKED_JOBS):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, BillJob]" = OrderedDict()
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def get(self, job_id: str) -> Optional[BillJob]:
+        return self._jobs.get(job_id)
+
+    def submit(self, job: BillJob) -> BillJob:
+        """
+        Register `job` and start its analysis in the background.
+        """
+        self._jobs[job.id] = job
+        self._prune()
+
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: BillJob) -> None:
+        async with self._semaphore:
+            job.set_status(STATUS_RUNNING)
+            try:
+                job.result = await analyze_bill(job.path)
+            except Exception as e:
+                job.error = str(e)
+                job.set_status(STATUS_FAILED)
+            else:
+                job.set_status(STATUS_SUCCEEDED)
+
+    def _prune(self) -> None:
+        if len(self._jobs) <= self.max_jobs:
+            return
+        for job_id in [j.id for j in self._jobs.values() if j.status in FINAL_STATUSES]:
+            if len(self._jobs) <= self.max_jobs:
+                break
+            self._remove_upload(self._jobs.pop(job_id).path)
+
+    def _remove_upload(self, path: str) -> None:
+        # Re-uploads of the same bill share one file; keep it while another job uses it.
+        if any(job.path == path for job in self._jobs.values()):
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.warning("Could not delete stored upload %s", path, exc_info=True)
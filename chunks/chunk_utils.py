@@ -1,13 +1,135 @@
-from typing import List
+import re
+from collections import deque
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Tuple, Union
+
+_TOKEN_RE = re.compile(r"\S+")
+_BYTES_TOKEN_RE = re.compile(rb"\S+")
+
+Text = Union[str, bytes, bytearray, memoryview]
+
+
+def _iter_token_spans(text: Text, base: int = 0) -> Iterator[Tuple[int, int]]:
+    pattern = _TOKEN_RE if isinstance(text, str) else _BYTES_TOKEN_RE
+    for match in pattern.finditer(text):
+        yield base + match.start(), base + match.end()
+
+
+def _window_spans(
+    tokens: Iterable[Tuple[int, int, int]],
+    chunk_size: int,
+    overlap: int,
+) -> Iterator[Tuple[int, int]]:
+    """
+    Core sliding window over (start, end, weight) tokens.
+
+    A chunk is emitted when the next token would push the window over chunk_size.
+    The window then drops tokens from the left until at most `overlap` weight is
+    left, always dropping at least one, so every chunk starts after the previous
+    one no matter how large `overlap` is.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+    if overlap < 0:
+        raise ValueError("overlap must be >= 0")
+
+    window: Deque[Tuple[int, int, int]] = deque()
+    total = 0
+    fresh = False  # window holds tokens not yet emitted
+
+    for start, end, weight in tokens:
+        if window and total + weight > chunk_size:
+            yield window[0][0], window[-1][1]
+            total -= window.popleft()[2]
+            while window and total > overlap:
+                total -= window.popleft()[2]
+        window.append((start, end, weight))
+        total += weight
+        fresh = True
+
+    if fresh:
+        yield window[0][0], window[-1][1]
 
-def chunk_text(text:str,chunk_size:int=500,overlap:int=50)->List[str]:
-    words=text.split()
-    chunks=[]
-    start=0
-    while(start<len(words)):
-        end=min(len(words),start+chunk_size)
-        chunk=" ".join(words[start:end])
-        chunks.append(chunk)
-        start=max(0,end-overlap)
-    return chunks
 
+def iter_chunk_spans(
+    text: Text,
+    chunk_size: int = 500,
+    overlap: int = 50,
+    count_tokens: Optional[Callable[[Text], int]] = None,
+) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) offsets of overlapping chunks of `text` in a single pass.
+
+    Chunks are cut on whitespace. By default size and overlap count words; pass
+    `count_tokens` (e.g. a tokenizer's encode length) to size chunks in model tokens.
+    Works on str, or on bytes/bytearray/memoryview (offsets are then byte offsets).
+    """
+    tokens = (
+        (start, end, count_tokens(text[start:end]) if count_tokens else 1)
+        for start, end in _iter_token_spans(text)
+    )
+    yield from _window_spans(tokens, chunk_size, overlap)
+
+
+def iter_chunks(
+    text: Text,
+    chunk_size: int = 500,
+    overlap: int = 50,
+    count_tokens: Optional[Callable[[Text], int]] = None,
+) -> Iterator[Text]:
+    """
+    Yield the chunks of `text` as slices. For bytes-like input the slices are
+    memoryviews over the original buffer, so no chunk is copied.
+    """
+    view = text if isinstance(text, str) else memoryview(text)
+    for start, end in iter_chunk_spans(text, chunk_size, overlap, count_tokens):
+        yield view[start:end]
+
+
+def iter_chunks_from_lines(
+    lines: Iterable[str],
+    chunk_size: int = 500,
+    overlap: int = 50,
+    count_tokens: Optional[Callable[[str], int]] = None,
+    separator: str = "",
+) -> Iterator[Tuple[int, int, str]]:
+    """
+    Chunk a stream of lines without materializing the whole document.
+
+    Yields (start, end, chunk) where offsets refer to `separator.join(lines)`;
+    use separator="\\n" for lines without trailing newlines (e.g. extract_lines output),
+    which makes the offsets match extract_plain_text. Only the text of the current
+    window is kept in memory.
+    """
+    buffer: List[str] = []  # text from buffer_start onwards
+    buffer_start = 0
+    consumed = 0
+
+    def tokens() -> Iterator[Tuple[int, int, int]]:
+        nonlocal consumed
+        for idx, line in enumerate(lines):
+            if idx and separator:
+                buffer.append(separator)
+                consumed += len(separator)
+            buffer.append(line)
+            for start, end in _iter_token_spans(line, consumed):
+                weight = count_tokens(line[start - consumed:end - consumed]) if count_tokens else 1
+                yield start, end, weight
+            consumed += len(line)
+
+    for start, end in _window_spans(tokens(), chunk_size, overlap):
+        text = "".join(buffer)
+        yield start, end, text[start - buffer_start:end - buffer_start]
+        # Later chunks start after `start`; drop the text before it.
+        buffer[:] = [text[start - buffer_start:]]
+        buffer_start = start
+
+
+def chunk_text(text:str,chunk_size:int=500,overlap:int=50)->List[str]:
+    """
+    Split text into overlapping chunks of `chunk_size` words, each joined with
+    single spaces. Prefer iter_chunk_spans/iter_chunks for large documents.
+    """
+    return [
+        " ".join(text[start:end].split())
+        for start, end in iter_chunk_spans(text, chunk_size, overlap)
+    ]
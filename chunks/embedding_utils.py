@@ -1,19 +1,35 @@
 # embedding_utils.py
 
+import asyncio
+import hashlib
 import os
-from typing import List
+import sqlite3
+import tempfile
+import threading
+import time
+from array import array
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
 
 from dotenv import load_dotenv
 
+from azure_outbound import close_on_owner_loop, get_endpoint
+
 # IMPORTANT: you'll need semantic-kernel installed:
 # pip install "semantic-kernel[azure]"
-
-from semantic_kernel.connectors.ai.azure_ai_inference import AzureAIInferenceTextEmbedding
+# It is imported on first use (it is slow to import), see get_embedding_model().
+if TYPE_CHECKING:
+    from semantic_kernel.connectors.ai.azure_ai_inference import AzureAIInferenceTextEmbedding
 
 load_dotenv()
 
+# Largest number of inputs sent in one embeddings request.
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("AZURE_AI_EMBEDDING_MAX_BATCH_SIZE", "64"))
+# Batches in flight at once for one generate_embeddings() call. The process-wide
+# request rate is set on the outbound endpoint (OUTBOUND_EMBEDDINGS_RPS).
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("AZURE_AI_EMBEDDING_MAX_CONCURRENCY", "4"))
 
-def get_embedding_model() -> AzureAIInferenceTextEmbedding:
+
+def get_embedding_model() -> "AzureAIInferenceTextEmbedding":
     """
     Create and return an AzureAIInferenceTextEmbedding client
     using environment variables:
@@ -21,6 +37,10 @@ def get_embedding_model() -> AzureAIInferenceTextEmbedding:
     - AZURE_AI_INFERENCE_KEY
     - AZURE_AI_EMBEDDING_MODEL
     """
+    from azure.ai.inference.aio import EmbeddingsClient
+    from azure.core.credentials import AzureKeyCredential
+    from semantic_kernel.connectors.ai.azure_ai_inference import AzureAIInferenceTextEmbedding
+
     endpoint = os.getenv("AZURE_AI_INFERENCE_ENDPOINT")
     key = os.getenv("AZURE_AI_INFERENCE_KEY")
     model_id = os.getenv("AZURE_AI_EMBEDDING_MODEL")
@@ -31,22 +51,235 @@ def get_embedding_model() -> AzureAIInferenceTextEmbedding:
             "AZURE_AI_INFERENCE_KEY / AZURE_AI_EMBEDDING_MODEL in .env"
         )
 
-    embedding_model = AzureAIInferenceTextEmbedding(
+    # The client is built here rather than by Semantic Kernel so that the SDK's
+    # own retries are off (the outbound layer retries) and so that a plain-http
+    # endpoint, such as the load-test stand-in, is accepted.
+    client = EmbeddingsClient(
         endpoint=endpoint,
-        api_key=key,
+        credential=AzureKeyCredential(key),
+        retry_total=0,
+    )
+    embedding_model = AzureAIInferenceTextEmbedding(
         ai_model_id=model_id,
+        client=client,
     )
     return embedding_model
 
 
-async def generate_embeddings(chunks: List[str]) -> List[List[float]]:
+# One embedding client per process, bound to the event loop that created it
+# (its aio EmbeddingsClient cannot be used from another loop).
+_shared_model: Optional["AzureAIInferenceTextEmbedding"] = None
+_shared_model_loop: Optional[asyncio.AbstractEventLoop] = None
+_shared_model_lock = threading.Lock()
+
+
+def get_shared_embedding_model() -> "AzureAIInferenceTextEmbedding":
+    """
+    Return the shared embedding client for the running event loop, created on
+    first use. Must be called from inside a running event loop.
+    """
+    global _shared_model, _shared_model_loop
+
+    loop = asyncio.get_running_loop()
+    with _shared_model_lock:
+        if _shared_model is None or _shared_model_loop is not loop:
+            # A client left over from another loop cannot be reused; close it.
+            if _shared_model is not None:
+                close_on_owner_loop(_shared_model_loop, _shared_model.client.close)
+            _shared_model = get_embedding_model()
+            _shared_model_loop = loop
+        return _shared_model
+
+
+async def close_shared_embedding_model() -> None:
+    """
+    Close the shared embedding client (call on app shutdown).
+    """
+    global _shared_model, _shared_model_loop
+
+    with _shared_model_lock:
+        model = _shared_model
+        _shared_model = _shared_model_loop = None
+    if model is not None:
+        await model.client.close()
+
+
+# ---------------------------
+#  Embedding Cache
+# ---------------------------
+
+DEFAULT_EMBEDDING_CACHE_PATH = os.path.join(tempfile.gettempdir(), "smart-bill-embeddings.sqlite3")
+
+
+def chunk_hash(chunk: str) -> str:
+    """
+    SHA-256 of the chunk text; together with the model id this is the cache key.
+    """
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by (model_id, chunk hash), stored in SQLite.
+    Vectors are stored as packed float32.
+    """
+
+    def __init__(self, path: str = DEFAULT_EMBEDDING_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model_id TEXT NOT NULL,"
+            " chunk_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (model_id, chunk_hash))"
+        )
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model_id: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        Return {chunk_hash: vector} for the hashes that are cached.
+        """
+        wanted = list(dict.fromkeys(hashes))
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for i in range(0, len(wanted), 500):
+                batch = wanted[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    "SELECT chunk_hash, vector FROM embeddings"
+                    f" WHERE model_id = ? AND chunk_hash IN ({placeholders})",
+                    [model_id, *batch],
+                )
+                for h, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[h] = vector.tolist()
+
+            self.hits += len(found)
+            self.misses += len(wanted) - len(found)
+        return found
+
+    def put_many(self, model_id: str, vectors: Dict[str, List[float]]) -> None:
+        """
+        Store {chunk_hash: vector} for `model_id`.
+        """
+        now = time.time()
+        rows = [
+            (model_id, h, array("f", vector).tobytes(), now)
+            for h, vector in vectors.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model_id, chunk_hash, vector, created_at)"
+                " VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Return the shared EmbeddingCache at EMBEDDING_CACHE_PATH, or None when
+    EMBEDDING_CACHE_ENABLED is "0"/"false".
+    """
+    global _embedding_cache
+
+    if os.getenv("EMBEDDING_CACHE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_EMBEDDING_CACHE_PATH))
+    return _embedding_cache
+
+
+# ---------------------------
+#  Batched Generation
+# ---------------------------
+
+async def _embed_batches(
+    model: "AzureAIInferenceTextEmbedding",
+    texts: List[str],
+    batch_size: int,
+    max_concurrency: int,
+) -> List[List[float]]:
+    # Request rate, throttling back-off and retries are shared process-wide
+    # through the "embeddings" outbound endpoint; the semaphore only caps this call.
+    semaphore = asyncio.Semaphore(max_concurrency)
+    endpoint = get_endpoint("embeddings")
+
+    async def run(batch: List[str]) -> List[List[float]]:
+        async with semaphore:
+            vectors = await endpoint.call_async(model.generate_embeddings, batch)
+        return [[float(x) for x in vector] for vector in vectors]
+
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = await asyncio.gather(*(run(batch) for batch in batches))
+    return [vector for batch in results for vector in batch]
+
+
+async def generate_embeddings(
+    chunks: List[str],
+    use_cache: bool = True,
+    batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+    max_concurrency: int = EMBEDDING_MAX_CONCURRENCY,
+) -> List[List[float]]:
     """
     Generate embeddings for a list of text chunks.
     Returns a list of embedding vectors, one per chunk.
+
+    Identical chunks are embedded once, and vectors already in the embedding
+    cache are not requested again. The remaining chunks are sent in batches of
+    at most `batch_size`, concurrently through the shared outbound layer.
     """
     if not chunks:
         return []
 
-    model = get_embedding_model()
-    embeddings: List[List[float]] = await model.generate_embeddings(chunks)
-    return embeddings
+    model = get_shared_embedding_model()
+    model_id = model.ai_model_id
+    cache = get_embedding_cache() if use_cache else None
+
+    hashes = [chunk_hash(chunk) for chunk in chunks]
+    unique: Dict[str, str] = dict(zip(hashes, chunks))
+
+    vectors: Dict[str, List[float]] = {}
+    if cache is not None:
+        vectors = await asyncio.to_thread(cache.get_many, model_id, unique.keys())
+
+    missing = [h for h in unique if h not in vectors]
+    if missing:
+        fresh = await _embed_batches(
+            model,
+            [unique[h] for h in missing],
+            batch_size,
+            max_concurrency,
+        )
+        new_vectors = dict(zip(missing, fresh))
+        vectors.update(new_vectors)
+        if cache is not None:
+            await asyncio.to_thread(cache.put_many, model_id, new_vectors)
+
+    return [vectors[h] for h in hashes]
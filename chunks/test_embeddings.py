@@ -1,7 +1,8 @@
 # test_embeddings.py
+# Run from the repository root: python -m chunks.test_embeddings
 
 import asyncio
-from embedding_utils import generate_embeddings
+from chunks.embedding_utils import generate_embeddings
 
 async def main():
     texts = [
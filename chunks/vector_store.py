@@ -0,0 +1,250 @@
+# vector_store.py
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_HEADER_FILE = "store.json"
+_VECTORS_FILE = "vectors.f32"
+_ALIVE_FILE = "alive.u8"
+_META_FILE = "meta.jsonl"
+
+# Rows scored per block during search, to bound temporary memory.
+SEARCH_BLOCK_ROWS = 65536
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorStore:
+    """
+    Local cosine-similarity index over chunk embeddings.
+
+    Files in `directory`:
+    - vectors.f32: contiguous float32 matrix with L2-normalized rows (memory-mapped)
+    - alive.u8:    one byte per row, 0 once the row is deleted
+    - meta.jsonl:  one JSON line per row: {"doc_id", "start", "end", ...}
+    - store.json:  dimension of the vectors
+
+    Opening only reads the metadata; vectors are paged in by the OS as searches touch them.
+    Appends write to the end of the files; deletes flip the alive byte (see compact()).
+    """
+
+    def __init__(self, directory: str, dim: Optional[int] = None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        header_path = os.path.join(directory, _HEADER_FILE)
+        if os.path.exists(header_path):
+            with open(header_path, "r", encoding="utf-8") as f:
+                stored_dim = json.load(f)["dim"]
+            if dim is not None and dim != stored_dim:
+                raise ValueError(f"Store has dim {stored_dim}, got {dim}")
+            dim = stored_dim
+        elif dim is None:
+            raise ValueError("dim is required when creating a new store")
+        else:
+            with open(header_path, "w", encoding="utf-8") as f:
+                json.dump({"dim": dim}, f)
+
+        self.dim = dim
+        self.metadata: List[Dict[str, Any]] = []
+        self._rows_by_doc: Dict[str, List[int]] = {}
+
+        self._vectors: Optional[np.memmap] = None
+        self._alive: Optional[np.memmap] = None
+
+        if os.path.exists(self._path(_META_FILE)):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load(self) -> None:
+        # meta.jsonl is written last, so it decides how many rows exist. Rows a
+        # crash left behind past it (or a torn last line) are cut off; otherwise
+        # the next append would land at row ids that don't match its metadata.
+        meta_path = self._path(_META_FILE)
+        valid_bytes = 0
+        with open(meta_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self.metadata.append(json.loads(line))
+                valid_bytes += len(line)
+        if valid_bytes != os.path.getsize(meta_path):
+            os.truncate(meta_path, valid_bytes)
+
+        count = len(self.metadata)
+        self._truncate(_VECTORS_FILE, count * self.dim * np.dtype(np.float32).itemsize)
+        self._truncate(_ALIVE_FILE, count)
+
+        alive = np.fromfile(self._path(_ALIVE_FILE), dtype=np.uint8) if count else np.zeros(0, dtype=np.uint8)
+        for row in np.flatnonzero(alive):
+            self._rows_by_doc.setdefault(self.metadata[row]["doc_id"], []).append(int(row))
+
+    def _truncate(self, name: str, size: int) -> None:
+        path = self._path(name)
+        actual = os.path.getsize(path) if os.path.exists(path) else 0
+        if actual < size:
+            raise ValueError(f"{path} has {actual} bytes, metadata needs {size}")
+        if actual > size:
+            os.truncate(path, size)
+
+    def _index_meta(self, meta: Dict[str, Any]) -> None:
+        self._rows_by_doc.setdefault(meta["doc_id"], []).append(len(self.metadata))
+        self.metadata.append(meta)
+
+    def _maps(self) -> Tuple[np.memmap, np.memmap]:
+        # (Re)map lazily; appends invalidate the maps since the files grew.
+        count = len(self.metadata)
+        if self._vectors is None or self._vectors.shape[0] != count:
+            self._vectors = np.memmap(self._path(_VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, self.dim))
+            self._alive = np.memmap(self._path(_ALIVE_FILE), dtype=np.uint8, mode="r+", shape=(count,))
+        return self._vectors, self._alive
+
+    # ---------------------------
+    #  Writes
+    # ---------------------------
+
+    def add(
+        self,
+        doc_id: str,
+        embeddings: Sequence[Sequence[float]],
+        spans: Sequence[Tuple[int, int]],
+        extra: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> List[int]:
+        """
+        Append the chunk embeddings of one document. `spans` are the (start, end)
+        character offsets of each chunk. Returns the new row ids.
+        """
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[1] != self.dim:
+            raise ValueError(f"Expected embeddings of shape (n, {self.dim}), got {matrix.shape}")
+        if len(spans) != matrix.shape[0]:
+            raise ValueError("spans and embeddings must have the same length")
+
+        matrix = np.ascontiguousarray(_normalize(matrix), dtype=np.float32)
+        first_row = len(self.metadata)
+        metas = []
+        for i, (start, end) in enumerate(spans):
+            meta = {"doc_id": doc_id, "start": int(start), "end": int(end)}
+            if extra is not None:
+                meta.update(extra[i])
+            metas.append(meta)
+
+        # Vectors first: a crash mid-append leaves unreferenced trailing rows (cut
+        # off by the next open), never metadata pointing past the end of the matrix.
+        with open(self._path(_VECTORS_FILE), "ab") as f:
+            f.write(matrix.tobytes())
+        with open(self._path(_ALIVE_FILE), "ab") as f:
+            f.write(b"\x01" * len(metas))
+        with open(self._path(_META_FILE), "a", encoding="utf-8") as f:
+            for meta in metas:
+                f.write(json.dumps(meta, separators=(",", ":")) + "\n")
+
+        for meta in metas:
+            self._index_meta(meta)
+        return list(range(first_row, len(self.metadata)))
+
+    def delete(self, doc_id: str) -> int:
+        """
+        Mark every row of `doc_id` as deleted. Returns the number of rows removed.
+        """
+        rows = self._rows_by_doc.pop(doc_id, [])
+        if rows:
+            _, alive = self._maps()
+            alive[rows] = 0
+            alive.flush()
+        return len(rows)
+
+    def compact(self) -> None:
+        """
+        Rewrite the files without deleted rows.
+        """
+        if not self.metadata:
+            return
+        vectors, alive = self._maps()
+        keep = np.flatnonzero(alive)
+        metas = [self.metadata[i] for i in keep]
+
+        tmp = {name: self._path(name + ".tmp") for name in (_VECTORS_FILE, _ALIVE_FILE, _META_FILE)}
+        with open(tmp[_VECTORS_FILE], "wb") as f:
+            for i in range(0, len(keep), SEARCH_BLOCK_ROWS):
+                f.write(np.ascontiguousarray(vectors[keep[i:i + SEARCH_BLOCK_ROWS]]).tobytes())
+        with open(tmp[_ALIVE_FILE], "wb") as f:
+            f.write(b"\x01" * len(keep))
+        with open(tmp[_META_FILE], "w", encoding="utf-8") as f:
+            for meta in metas:
+                f.write(json.dumps(meta, separators=(",", ":")) + "\n")
+
+        self._vectors = self._alive = None
+        for name, path in tmp.items():
+            os.replace(path, self._path(name))
+
+        self.metadata = []
+        self._rows_by_doc = {}
+        for meta in metas:
+            self._index_meta(meta)
+
+    # ---------------------------
+    #  Search
+    # ---------------------------
+
+    def search(
+        self,
+        queries: Sequence[Sequence[float]],
+        k: int = 5,
+    ) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        """
+        Cosine top-k for a batch of query vectors (or a single vector).
+        Returns one list of (score, metadata) per query, best first.
+        """
+        q = np.asarray(queries, dtype=np.float32)
+        if q.ndim == 1:
+            q = q[None, :]
+        if q.shape[1] != self.dim:
+            raise ValueError(f"Expected queries of dim {self.dim}, got {q.shape[1]}")
+        q = _normalize(q)
+
+        if not self.metadata or k < 1:
+            return [[] for _ in range(q.shape[0])]
+
+        vectors, alive = self._maps()
+        best_scores = np.full((q.shape[0], 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((q.shape[0], 0), dtype=np.int64)
+
+        for start in range(0, vectors.shape[0], SEARCH_BLOCK_ROWS):
+            block = vectors[start:start + SEARCH_BLOCK_ROWS]
+            scores = q @ block.T
+            scores[:, alive[start:start + SEARCH_BLOCK_ROWS] == 0] = -np.inf
+
+            rows = np.broadcast_to(np.arange(start, start + block.shape[0]), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, rows], axis=1)
+
+            keep = min(k, scores.shape[1])
+            top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_rows = np.take_along_axis(rows, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+
+        return [
+            [
+                (float(score), self.metadata[row])
+                for score, row in zip(scores_row, rows_row)
+                if np.isfinite(score)
+            ]
+            for scores_row, rows_row in zip(best_scores, best_rows)
+        ]
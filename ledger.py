@@ -0,0 +1,580 @@
+# ledger.py
+
+import re
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Transactions from extracted statement tables, stored column-wise: one NumPy
+# array per field, so summaries over years of history are a handful of
+# vectorized passes instead of Python loops over rows of strings.
+#
+# Amounts and balances are integers in minor units (cents): sums stay exact
+# and bincount/cumsum work on them directly.
+
+UNCATEGORIZED = "uncategorized"
+
+
+# ---------------------------
+#  Column Detection
+# ---------------------------
+
+# Header words that identify each field, checked in this order per column.
+COLUMN_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "balance": ("balance",),
+    "debit": ("debit", "withdrawal", "paid out", "money out", "outgoing"),
+    "credit": ("credit", "deposit", "paid in", "money in", "incoming"),
+    "amount": ("amount",),
+    "date": ("date", "posted", "booking"),
+    "category": ("category", "type"),
+    "description": ("description", "details", "narrative", "narration", "merchant", "payee", "particulars", "transaction"),
+}
+
+
+def detect_columns(names: Iterable[str]) -> Dict[str, str]:
+    """
+    Map ledger fields (date, description, debit, credit, amount, balance,
+    category) to the table column names that hold them.
+
+    Only the first column matching a field is used.
+    """
+    mapping: Dict[str, str] = {}
+    for name in names:
+        lowered = name.lower()
+        for field, keywords in COLUMN_KEYWORDS.items():
+            if field not in mapping and any(keyword in lowered for keyword in keywords):
+                mapping[field] = name
+                break
+    return mapping
+
+
+# ---------------------------
+#  Parsing
+# ---------------------------
+# Statements repeat the same dates, amounts and merchants many times, so every
+# parser works on the unique strings of a column and maps back with the
+# inverse index.
+
+_MONTHS = {
+    name: i + 1
+    for i, names in enumerate([
+        ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+        ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+        ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"), ("dec", "december"),
+    ])
+    for name in names
+}
+
+_NUMERIC_DATE = re.compile(r"^(\d{1,4})[-/.](\d{1,2})[-/.](\d{1,4})")
+_DAY_MONTH_NAME = re.compile(r"^(\d{1,2})[\s-]*([A-Za-z]{3,9})\.?[\s,-]*(\d{2,4})")
+_MONTH_NAME_DAY = re.compile(r"^([A-Za-z]{3,9})\.?\s+(\d{1,2}),?\s+(\d{2,4})")
+
+_NAT = np.datetime64("NaT", "D")
+
+# A whole column of YYYY-MM-DD values, joined with newlines.
+_ISO_DATES = re.compile(r"(?:\d{4}-\d{2}-\d{2}(?:\n|\Z))*")
+
+
+def _full_year(year: int) -> int:
+    return year + 2000 if year < 100 else year
+
+
+def _parse_date(text: str, dayfirst: bool) -> Optional[date]:
+    text = text.strip()
+    try:
+        match = _NUMERIC_DATE.match(text)
+        if match:
+            a, b, c = (int(g) for g in match.groups())
+            if len(match.group(1)) == 4:
+                return date(a, b, c)
+            day, month = (a, b) if dayfirst else (b, a)
+            if month > 12 >= day:
+                day, month = month, day
+            return date(_full_year(c), month, day)
+        match = _DAY_MONTH_NAME.match(text)
+        if match and match.group(2).lower() in _MONTHS:
+            return date(_full_year(int(match.group(3))), _MONTHS[match.group(2).lower()], int(match.group(1)))
+        match = _MONTH_NAME_DAY.match(text)
+        if match and match.group(1).lower() in _MONTHS:
+            return date(_full_year(int(match.group(3))), _MONTHS[match.group(1).lower()], int(match.group(2)))
+    except ValueError:
+        return None
+    return None
+
+
+def parse_dates(values: Sequence[str], dayfirst: bool = True) -> np.ndarray:
+    """
+    Parse date strings into datetime64[D]; unparseable values become NaT.
+
+    Accepts ISO (2024-03-31), numeric day/month orders (31/03/2024, 03/31/24;
+    `dayfirst` decides ambiguous ones) and month names (31 Mar 2024, Mar 31, 2024).
+    """
+    values = np.asarray(values, dtype=object)
+    if not len(values):
+        return np.empty(0, dtype="datetime64[D]")
+    uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+    parsed = None
+    if _ISO_DATES.fullmatch("\n".join(uniques)):
+        # Fast path: every value is a plain ISO date, which _parse_date would
+        # read the same way. NumPy also accepts "2024", "2024-03" and "today",
+        # so it is only trusted after that check.
+        try:
+            parsed = uniques.astype("datetime64[D]")
+        except ValueError:
+            pass  # e.g. 2024-02-30
+    if parsed is None:
+        parsed = np.array(
+            [_parse_date(text, dayfirst) or _NAT for text in uniques], dtype="datetime64[D]",
+        )
+    return parsed[inverse]
+
+
+_AMOUNT_CLEAN = re.compile(r"[^\d.,]")
+
+# A whole column of plain amounts, joined with newlines: values that float()
+# and _parse_amount agree on.
+_PLAIN_AMOUNTS = re.compile(r"(?:-?\d+(?:\.\d{1,2})?(?:\n|\Z))*")
+
+
+def _parse_amount(text: str) -> Optional[int]:
+    text = text.strip()
+    if not text:
+        return None
+    upper = text.upper()
+    negative = (
+        text.startswith("-") or text.endswith("-")
+        or (text.startswith("(") and text.endswith(")"))
+        or upper.endswith("DR")
+    )
+    digits = _AMOUNT_CLEAN.sub("", text)
+    if not any(ch.isdigit() for ch in digits):
+        return None
+
+    # The last separator is the decimal point if 1-2 digits follow it
+    # ("1,234.56", "1.234,56", "12,5"); otherwise separators group thousands.
+    last = max(digits.rfind("."), digits.rfind(","))
+    if last != -1 and 1 <= len(digits) - last - 1 <= 2:
+        whole, fraction = digits[:last], digits[last + 1:]
+    else:
+        whole, fraction = digits, ""
+    whole = whole.replace(",", "").replace(".", "")
+    cents = int(whole or 0) * 100 + int(fraction.ljust(2, "0") or 0)
+    return -cents if negative else cents
+
+
+def parse_amounts(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse money strings into (int64 cents, parsed mask).
+
+    Handles currency symbols, thousands separators in either convention,
+    and negatives written as -12.00, 12.00-, (12.00) or 12.00 DR. Blank or
+    non-numeric values give 0 with mask False.
+    """
+    values = np.asarray(values, dtype=object)
+    if not len(values):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+    uniques, inverse = np.unique(np.char.strip(values.astype(str)), return_inverse=True)
+    known = uniques != ""
+    plain = uniques[known]
+    if _PLAIN_AMOUNTS.fullmatch("\n".join(plain)):
+        # Fast path: plain numbers ("1234.56", "-12") with at most two decimals
+        # convert in C. Anything else ("1.234", "1,234.56", "$5") goes through
+        # _parse_amount, so a value never depends on the rest of its column.
+        cents = np.zeros(len(uniques), dtype=np.int64)
+        cents[known] = np.rint(plain.astype(np.float64) * 100)
+    else:
+        parsed = [_parse_amount(text) for text in uniques]
+        cents = np.array([0 if value is None else value for value in parsed], dtype=np.int64)
+        known = np.array([value is not None for value in parsed], dtype=bool)
+    return cents[inverse], known[inverse]
+
+
+_MERCHANT_NOISE = re.compile(r"[\d#*/\\:_-]+|\b(?:ref|card|pos|visa|debit|purchase|payment|to|from)\b", re.IGNORECASE)
+
+
+def merchant_key(description: str) -> str:
+    """
+    Normalize a transaction description to a merchant name: drop digits,
+    references and card-network noise, collapse whitespace, upper-case.
+    """
+    key = " ".join(_MERCHANT_NOISE.sub(" ", description).split()).upper()
+    return key or description.strip().upper()
+
+
+def _encode(values: Sequence[str], vocabulary: List[str], index: Dict[str, int],
+            transform: Optional[Callable[[str], str]] = None) -> np.ndarray:
+    """
+    Integer codes for `values`, adding unseen (transformed) values to `vocabulary`.
+    """
+    values = np.asarray(values, dtype=object)
+    if not len(values):
+        return np.empty(0, dtype=np.int32)
+    uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+    codes = np.empty(len(uniques), dtype=np.int32)
+    for i, text in enumerate(uniques):
+        text = str(text)  # np.str_ -> str, so vocabularies serialize as plain JSON strings
+        key = transform(text) if transform else text
+        code = index.get(key)
+        if code is None:
+            code = index[key] = len(vocabulary)
+            vocabulary.append(key)
+        codes[i] = code
+    return codes[inverse]
+
+
+# ---------------------------
+#  Ledger
+# ---------------------------
+
+_FIELDS = ("account", "date", "description", "merchant", "category", "amount", "balance", "balance_known")
+
+
+class Ledger:
+    """
+    Columnar store of transactions across accounts.
+
+    Columns (all the same length, in insertion order):
+    - account, merchant, category: int32 codes into `accounts`, `merchants`, `categories`
+    - date: datetime64[D]
+    - description: object (the statement text)
+    - amount: int64 cents, credits positive and debits negative
+    - balance / balance_known: int64 cents and where the statement printed one
+
+    Per-account indexes (rows ordered by date, and by category then date) are
+    built on the first query after new transactions are added.
+    """
+
+    def __init__(self, dayfirst: bool = True, categorize: Optional[Callable[[str], str]] = None):
+        self.dayfirst = dayfirst
+        self.categorize = categorize
+        self.accounts: List[str] = []
+        self.merchants: List[str] = []
+        self.categories: List[str] = []
+        self._account_index: Dict[str, int] = {}
+        self._merchant_index: Dict[str, int] = {}
+        self._category_index: Dict[str, int] = {}
+
+        self.account = np.empty(0, dtype=np.int32)
+        self.date = np.empty(0, dtype="datetime64[D]")
+        self.description = np.empty(0, dtype=object)
+        self.merchant = np.empty(0, dtype=np.int32)
+        self.category = np.empty(0, dtype=np.int32)
+        self.amount = np.empty(0, dtype=np.int64)
+        self.balance = np.empty(0, dtype=np.int64)
+        self.balance_known = np.empty(0, dtype=bool)
+
+        self._by_date: Optional[Dict[int, np.ndarray]] = None
+        self._by_category: Optional[Dict[Tuple[int, int], np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+    # ---------------------------
+    #  Loading
+    # ---------------------------
+
+    def add_columns(self, columns: Dict[str, np.ndarray], account: str = "default") -> int:
+        """
+        Add the rows of one statement table in columnar form (as returned by
+        ocr_utils.extract_table_columns with typed=False). Rows without a parseable date or
+        amount (opening balance lines, subtotals, repeated headers) are skipped.
+
+        Returns the number of transactions added; 0 if the table does not look
+        like a transaction table.
+        """
+        mapping = detect_columns(columns)
+        if "date" not in mapping or not ({"amount", "debit", "credit"} & set(mapping)):
+            return 0
+
+        dates = parse_dates(columns[mapping["date"]], self.dayfirst)
+        size = len(dates)
+        amount = np.zeros(size, dtype=np.int64)
+        has_amount = np.zeros(size, dtype=bool)
+        if "amount" in mapping:
+            cents, known = parse_amounts(columns[mapping["amount"]])
+            amount += cents
+            has_amount |= known
+        if "credit" in mapping:
+            cents, known = parse_amounts(columns[mapping["credit"]])
+            amount += np.abs(cents)
+            has_amount |= known
+        if "debit" in mapping:
+            cents, known = parse_amounts(columns[mapping["debit"]])
+            amount -= np.abs(cents)
+            has_amount |= known
+
+        keep = ~np.isnat(dates) & has_amount
+        if not keep.any():
+            return 0
+
+        if "description" in mapping:
+            description = np.asarray(columns[mapping["description"]], dtype=object)[keep]
+        else:
+            description = np.full(int(keep.sum()), "", dtype=object)
+        if "balance" in mapping:
+            balance, balance_known = parse_amounts(columns[mapping["balance"]])
+            balance, balance_known = balance[keep], balance_known[keep]
+        else:
+            balance = np.zeros(len(description), dtype=np.int64)
+            balance_known = np.zeros(len(description), dtype=bool)
+
+        if "category" in mapping:
+            category_text = np.asarray(columns[mapping["category"]], dtype=object)[keep]
+            category_text = np.where(category_text == "", UNCATEGORIZED, category_text)
+            category = _encode(category_text, self.categories, self._category_index)
+        elif self.categorize is not None:
+            category = _encode(description, self.categories, self._category_index, self.categorize)
+        else:
+            category = _encode(np.full(len(description), UNCATEGORIZED, dtype=object),
+                               self.categories, self._category_index)
+
+        account_code = self._account_index.get(account)
+        if account_code is None:
+            account_code = self._account_index[account] = len(self.accounts)
+            self.accounts.append(account)
+
+        self._append(
+            account=np.full(len(description), account_code, dtype=np.int32),
+            date=dates[keep],
+            description=description,
+            merchant=_encode(description, self.merchants, self._merchant_index, merchant_key),
+            category=category,
+            amount=amount[keep],
+            balance=balance,
+            balance_known=balance_known,
+        )
+        return len(description)
+
+    def add_statement(self, result, account: Optional[str] = None, header_rows: int = 1) -> int:
+        """
+        Add every transaction table of an analysis result (SDK, ocr_local or
+        SlimDocument). Without `account`, an "account" key-value pair of the
+        statement is used when present.
+        """
+        from ocr_utils import extract_key_value_pairs, extract_table_columns
+
+        if account is None:
+            account = statement_account(extract_key_value_pairs(result))
+        return sum(
+            self.add_columns(columns, account)
+            # Cell text: the ledger parses it with its own dayfirst setting and in exact cents.
+            for columns in extract_table_columns(result, header_rows=header_rows, typed=False)
+        )
+
+    def _append(self, **columns: np.ndarray) -> None:
+        for name in _FIELDS:
+            setattr(self, name, np.concatenate([getattr(self, name), columns[name]]))
+        self._by_date = self._by_category = None
+
+    # ---------------------------
+    #  Indexes
+    # ---------------------------
+
+    def _build_indexes(self) -> None:
+        # One stable lexsort per key order; the groups are slices of the result.
+        order = np.lexsort((self.date, self.account))
+        bounds = np.flatnonzero(np.diff(self.account[order])) + 1
+        self._by_date = {
+            int(self.account[group[0]]): group
+            for group in np.split(order, bounds) if len(group)
+        }
+
+        order = np.lexsort((self.date, self.category, self.account))
+        keys = self.account[order].astype(np.int64) << 32 | self.category[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        self._by_category = {
+            (int(self.account[group[0]]), int(self.category[group[0]])): group
+            for group in np.split(order, bounds) if len(group)
+        }
+
+    def _account_code(self, account: str) -> int:
+        code = self._account_index.get(account)
+        if code is None:
+            raise KeyError(f"Unknown account: {account}")
+        return code
+
+    def rows(
+        self,
+        account: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        category: Optional[str] = None,
+    ) -> np.ndarray:
+        """
+        Row indexes of the matching transactions, in date order within each
+        account. `start` and `end` are inclusive ISO dates.
+
+        With an account, this is a lookup in the per-account (and per-category)
+        index plus a binary search on the date range.
+        """
+        if self._by_date is None:
+            self._build_indexes()
+
+        if account is None:
+            accounts = list(self._by_date)
+        else:
+            accounts = [self._account_code(account)]
+        category_code = None
+        if category is not None:
+            category_code = self._category_index.get(category, -1)
+
+        empty = np.empty(0, dtype=np.intp)
+        parts = []
+        for code in accounts:
+            if category_code is None:
+                group = self._by_date.get(code, empty)
+            else:
+                group = self._by_category.get((code, category_code), empty)
+            if start is not None or end is not None:
+                dates = self.date[group]
+                lo = np.searchsorted(dates, np.datetime64(start, "D")) if start is not None else 0
+                hi = np.searchsorted(dates, np.datetime64(end, "D"), side="right") if end is not None else len(group)
+                group = group[lo:hi]
+            parts.append(group)
+        return np.concatenate(parts) if parts else empty
+
+    # ---------------------------
+    #  Queries
+    # ---------------------------
+
+    def monthly_totals(self, account: Optional[str] = None, start: Optional[str] = None,
+                       end: Optional[str] = None, category: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Credits, debits and net per calendar month (cents), months ascending.
+        Debits are reported as positive totals.
+        """
+        rows = self.rows(account, start, end, category)
+        if not len(rows):
+            empty = np.empty(0, dtype=np.int64)
+            return {"month": np.empty(0, dtype="datetime64[M]"), "credits": empty, "debits": empty,
+                    "net": empty, "count": empty}
+
+        # Months as offsets from the first one: bincount instead of a sort.
+        months = self.date[rows].astype("datetime64[M]").astype(np.int64)
+        first = months.min()
+        offsets = months - first
+        size = int(offsets.max()) + 1
+        amounts = self.amount[rows]
+        count = np.bincount(offsets, minlength=size)
+        credits = _sum_by(offsets, np.where(amounts > 0, amounts, 0), size)
+        debits = _sum_by(offsets, np.where(amounts < 0, -amounts, 0), size)
+
+        present = count > 0
+        return {
+            "month": (np.flatnonzero(present) + first).astype("datetime64[M]"),
+            "credits": credits[present],
+            "debits": debits[present],
+            "net": (credits - debits)[present],
+            "count": count[present],
+        }
+
+    def category_totals(self, account: Optional[str] = None, start: Optional[str] = None,
+                        end: Optional[str] = None) -> Dict[str, int]:
+        """
+        Net amount per category (cents), largest spend first.
+        """
+        rows = self.rows(account, start, end)
+        totals = _sum_by(self.category[rows], self.amount[rows], len(self.categories))
+        used = np.bincount(self.category[rows], minlength=len(self.categories)) > 0
+        codes = np.flatnonzero(used)
+        codes = codes[np.argsort(totals[codes], kind="stable")]
+        return {self.categories[code]: int(totals[code]) for code in codes}
+
+    def top_merchants(self, n: int = 10, account: Optional[str] = None, start: Optional[str] = None,
+                      end: Optional[str] = None, by: str = "spend") -> List[Dict[str, Any]]:
+        """
+        The `n` merchants with the most debit spend (by="spend") or the most
+        debit transactions (by="count").
+        """
+        if by not in ("spend", "count"):
+            raise ValueError(f"by must be 'spend' or 'count', not {by!r}")
+        rows = self.rows(account, start, end)
+        rows = rows[self.amount[rows] < 0]
+        codes = self.merchant[rows]
+        size = len(self.merchants)
+        spend = _sum_by(codes, -self.amount[rows], size)
+        count = np.bincount(codes, minlength=size)
+
+        score = spend if by == "spend" else count
+        candidates = np.flatnonzero(count)
+        if len(candidates) > n:
+            candidates = candidates[np.argpartition(-score[candidates], n - 1)[:n]]
+        candidates = candidates[np.argsort(-score[candidates], kind="stable")]
+        return [
+            {"merchant": self.merchants[code], "spend": int(spend[code]), "count": int(count[code])}
+            for code in candidates
+        ]
+
+    def running_balance(self, account: str, start: Optional[str] = None,
+                        end: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Balance after each transaction of `account`, in date order (cents).
+
+        The cumulative sum of amounts is anchored to the first balance printed
+        on the statement; `reconciled` is False where a printed balance
+        disagrees with the computed one (a missed or misread row).
+        """
+        rows = self.rows(account)
+        cumulative = np.cumsum(self.amount[rows])
+        known = np.flatnonzero(self.balance_known[rows])
+        opening = self.balance[rows[known[0]]] - cumulative[known[0]] if len(known) else 0
+        balance = opening + cumulative
+        reconciled = ~self.balance_known[rows] | (self.balance[rows] == balance)
+
+        if start is not None or end is not None:
+            dates = self.date[rows]
+            lo = np.searchsorted(dates, np.datetime64(start, "D")) if start is not None else 0
+            hi = np.searchsorted(dates, np.datetime64(end, "D"), side="right") if end is not None else len(rows)
+            rows, balance, reconciled = rows[lo:hi], balance[lo:hi], reconciled[lo:hi]
+        return {"date": self.date[rows], "balance": balance, "reconciled": reconciled}
+
+    def summary(self, account: Optional[str] = None, top: int = 5) -> Dict[str, Any]:
+        """
+        JSON-ready overview: transaction count, monthly totals and top merchants.
+        Amounts are in currency units.
+        """
+        monthly = self.monthly_totals(account)
+        return {
+            "transactions": int(monthly["count"].sum()),
+            "accounts": self.accounts if account is None else [account],
+            "monthly": [
+                {
+                    "month": str(month),
+                    "credits": int(credits) / 100,
+                    "debits": int(debits) / 100,
+                    "net": int(net) / 100,
+                }
+                for month, credits, debits, net in zip(
+                    monthly["month"], monthly["credits"], monthly["debits"], monthly["net"],
+                )
+            ],
+            "top_merchants": [
+                {**merchant, "spend": merchant["spend"] / 100}
+                for merchant in self.top_merchants(top, account)
+            ],
+        }
+
+
+def _sum_by(codes: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    """
+    Group sums of integer `values` by `codes` (0..size-1). bincount sums in
+    float64, which is exact for totals below 2**53 cents.
+    """
+    return np.rint(np.bincount(codes, weights=values, minlength=size)).astype(np.int64)
+
+
+# Labels of the account identifier on a statement ("Account No.:", "A/C #", "IBAN"),
+# but not other account fields such as "Account Type" or "Account Holder".
+_ACCOUNT_LABEL = re.compile(r"^(?:(?:account|acct|a/c)(?:\s*(?:number|num|no\.?|#))?|iban)\s*:?$")
+
+
+def statement_account(key_values: Dict[str, Any]) -> str:
+    """
+    The account number printed on a statement, from its key-value pairs;
+    "default" if there is none.
+    """
+    for key, value in key_values.items():
+        if _ACCOUNT_LABEL.match(" ".join(str(key).lower().split())) and value:
+            return str(value).strip()
+    return "default"
@@ -0,0 +1,67 @@
+# app.py
+"""
+The app wired to loadtest/fake_azure.py. Never deploy this module: before the
+app is imported it patches the Azure SDK entry points that
+travelPlanner/azure_client.py builds its clients from, so that
+DefaultAzureCredential becomes a fixed bearer token and agent lookups may go
+to the plain-http stand-in endpoint. Production code has no hook for either.
+
+    <environment printed by fake_azure> uvicorn loadtest.app:app --port 8000
+"""
+
+import functools
+import os
+import time
+from typing import Any
+
+import azure.ai.projects
+import azure.ai.projects.aio
+import azure.identity
+import azure.identity.aio
+from azure.core.credentials import AccessToken
+
+STATIC_TOKEN = os.getenv("LOADTEST_STATIC_TOKEN", "fake")
+
+
+class StaticTokenCredential:
+    def __init__(self, *args: Any, **kwargs: Any):
+        self._token = STATIC_TOKEN
+
+    def get_token(self, *scopes: str, **kwargs: Any) -> AccessToken:
+        return AccessToken(self._token, int(time.time()) + 3600)
+
+    def close(self) -> None:
+        pass
+
+
+class AsyncStaticTokenCredential(StaticTokenCredential):
+    async def get_token(self, *scopes: str, **kwargs: Any) -> AccessToken:
+        return super().get_token(*scopes, **kwargs)
+
+    async def close(self) -> None:
+        pass
+
+
+def _plain_http_agents(client_class):
+    """
+    Subclass of an AIProjectClient whose agents.get() accepts a plain-http
+    endpoint: azure-core refuses bearer tokens over http unless told otherwise.
+    """
+
+    class PlainHttpProjectClient(client_class):
+        def __init__(self, *args: Any, **kwargs: Any):
+            super().__init__(*args, **kwargs)
+            self.agents.get = functools.partial(self.agents.get, enforce_https=False)
+
+    return PlainHttpProjectClient
+
+
+# azure_client imports these names when it first builds its clients, so the
+# patches must be in place before the first agent call (they are: nothing is
+# built at import time).
+azure.identity.DefaultAzureCredential = StaticTokenCredential
+azure.identity.aio.DefaultAzureCredential = AsyncStaticTokenCredential
+azure.ai.projects.AIProjectClient = _plain_http_agents(azure.ai.projects.AIProjectClient)
+azure.ai.projects.aio.AIProjectClient = _plain_http_agents(azure.ai.projects.aio.AIProjectClient)
+
+from main import app  # noqa: E402
@@ -0,0 +1,262 @@
+# driver.py
+"""
+Open-loop load driver for the app's main endpoints.
+
+Requests arrive at --rps (Poisson arrivals) for --duration seconds, split by
+--mix between:
+
+- upload   POST /api/bills/upload, then long-poll the job until it finishes
+- extract  POST /api/extract with a unique imageUrl
+- chat     POST /api/chat with --memories synthetic memories
+
+and the report gives, per scenario, p50/p95/p99 latency, throughput and
+error rate. Run it against an app that points at loadtest/fake_azure.py:
+
+    python -m loadtest.fake_azure --port 9000          # prints the app environment
+    <that environment> uvicorn loadtest.app:app --port 8000 --workers 1
+    python -m loadtest.driver --base-url http://127.0.0.1:8000 --rps 20 --duration 60
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+BILL_FINAL_STATUSES = ("succeeded", "failed")
+
+
+# ---------------------------
+#  Scenarios
+# ---------------------------
+
+async def run_upload(client: httpx.AsyncClient, args: argparse.Namespace) -> None:
+    # Unique bytes per upload so the OCR cache cannot answer it.
+    data = b"\x89PNG\r\n\x1a\n" + os.urandom(args.upload_bytes)
+    response = await client.post(
+        "/api/bills/upload",
+        files={"file": (f"bill-{uuid.uuid4().hex[:8]}.png", data, "image/png")},
+    )
+    response.raise_for_status()
+    job_id = response.json()["job_id"]
+
+    while True:
+        response = await client.get(f"/api/bills/{job_id}", params={"wait": 30})
+        response.raise_for_status()
+        status = response.json()["status"]
+        if status in BILL_FINAL_STATUSES:
+            if status != "succeeded":
+                raise RuntimeError(f"bill job {status}: {response.json().get('error')}")
+            return
+
+
+async def run_extract(client: httpx.AsyncClient, args: argparse.Namespace) -> None:
+    response = await client.post(
+        "/api/extract",
+        json={"imageUrl": f"https://example.com/photos/{uuid.uuid4().hex}.jpg"},
+    )
+    response.raise_for_status()
+
+
+def _memories(count: int) -> List[Dict[str, str]]:
+    cities = ["Lisbon", "Porto", "Madrid", "Paris", "Rome", "Berlin"]
+    categories = ["food", "museum", "park", "bar", "hotel"]
+    return [
+        {
+            "id": uuid.uuid4().hex,
+            "placeName": f"Place {i}",
+            "city": random.choice(cities),
+            "category": random.choice(categories),
+            "notes": "Great spot, would go back. " * random.randint(1, 4),
+            "aiDescription": "A well reviewed place with a nice atmosphere and friendly staff. " * 2,
+            "createdAt": "2024-05-01T12:00:00Z",
+        }
+        for i in range(count)
+    ]
+
+
+async def run_chat(client: httpx.AsyncClient, args: argparse.Namespace) -> None:
+    response = await client.post(
+        "/api/chat",
+        json={"memories": _memories(args.memories), "question": "Where should I eat tonight?"},
+    )
+    response.raise_for_status()
+
+
+SCENARIOS = {"upload": run_upload, "extract": run_extract, "chat": run_chat}
+
+
+# ---------------------------
+#  Driver
+# ---------------------------
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}; choose from {sorted(SCENARIOS)}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+        self.dropped: Dict[str, int] = {}
+
+    def ok(self, scenario: str, seconds: float) -> None:
+        self.latencies.setdefault(scenario, []).append(seconds)
+
+    def error(self, scenario: str, error: BaseException) -> None:
+        if isinstance(error, httpx.HTTPStatusError):
+            kind = f"HTTP {error.response.status_code}"
+        else:
+            kind = type(error).__name__
+        errors = self.errors.setdefault(scenario, {})
+        errors[kind] = errors.get(kind, 0) + 1
+
+    def drop(self, scenario: str) -> None:
+        self.dropped[scenario] = self.dropped.get(scenario, 0) + 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        scenarios = sorted(set(self.latencies) | set(self.errors) | set(self.dropped))
+        report: Dict[str, Any] = {"elapsed_s": round(elapsed, 2), "scenarios": {}}
+        for name in scenarios:
+            latencies = sorted(self.latencies.get(name, []))
+            errors = sum(self.errors.get(name, {}).values())
+            total = len(latencies) + errors
+            report["scenarios"][name] = {
+                "requests": total,
+                "ok": len(latencies),
+                "errors": errors,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "error_kinds": self.errors.get(name, {}),
+                "dropped": self.dropped.get(name, 0),
+                "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": _ms(percentile(latencies, 50)),
+                "p95_ms": _ms(percentile(latencies, 95)),
+                "p99_ms": _ms(percentile(latencies, 99)),
+            }
+        return report
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+async def drive(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    recorder = Recorder()
+    in_flight = asyncio.Semaphore(args.max_in_flight)
+    tasks = set()
+
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        # Unrecorded requests first, so lazy client setup in the app is not measured.
+        for _ in range(args.warmup):
+            for scenario in names:
+                try:
+                    await SCENARIOS[scenario](client, args)
+                except Exception as e:
+                    print(f"warm-up {scenario} failed: {e!r}")
+
+        async def one(scenario: str) -> None:
+            start = time.perf_counter()
+            try:
+                await SCENARIOS[scenario](client, args)
+            except Exception as e:
+                recorder.error(scenario, e)
+            else:
+                recorder.ok(scenario, time.perf_counter() - start)
+            finally:
+                in_flight.release()
+
+        start = time.perf_counter()
+        next_arrival = start
+        while next_arrival - start < args.duration:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            scenario = random.choices(names, weights)[0]
+            if in_flight.locked():
+                # Open loop: never delay arrivals; count what the client could not send.
+                recorder.drop(scenario)
+            else:
+                await in_flight.acquire()
+                task = asyncio.create_task(one(scenario))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            next_arrival += random.expovariate(args.rps)
+
+        if tasks:
+            await asyncio.wait(set(tasks), timeout=args.timeout)
+        elapsed = time.perf_counter() - start
+
+        report = recorder.report(elapsed)
+        report.update(target_rps=args.rps, mix=args.mix)
+        try:
+            report["outbound"] = (await client.get("/api/outbound")).json()
+        except (httpx.HTTPError, ValueError):
+            pass
+    return report
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"target {report['target_rps']} rps for {report['elapsed_s']} s  mix={report['mix']}")
+    print(f"  {'scenario':<10}{'requests':>9}{'ok/s':>8}{'err %':>8}{'dropped':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, s in report["scenarios"].items():
+        print(
+            f"  {name:<10}{s['requests']:>9}{s['throughput_per_s']:>8}{s['error_rate'] * 100:>8.2f}{s['dropped']:>9}"
+            f"{s['p50_ms'] or '-':>10}{s['p95_ms'] or '-':>10}{s['p99_ms'] or '-':>10}"
+        )
+        if s["error_kinds"]:
+            print(f"  {'':<10}errors: {s['error_kinds']}")
+    for name, stats in (report.get("outbound") or {}).items():
+        print(f"  outbound {name}: {stats}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Open-loop load driver for the app.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=10.0, help="target arrival rate")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of arrivals")
+    parser.add_argument("--mix", default="upload=1,extract=3,chat=2")
+    parser.add_argument("--memories", type=int, default=60, help="memories per chat request")
+    parser.add_argument("--upload-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--max-in-flight", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--warmup", type=int, default=1, help="unrecorded requests per scenario before the run")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    report = asyncio.run(drive(args))
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
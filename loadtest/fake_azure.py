@@ -0,0 +1,322 @@
+# fake_azure.py
+"""
+Local stand-ins for the Azure services the app calls, for load testing
+without paying per request:
+
+- Document Intelligence analyze + poll   POST /documentintelligence/documentModels/{model}:analyze
+                                         GET  /documentintelligence/operations/{id}
+- AI Inference embeddings                POST /embeddings
+- AI Foundry project agents              GET  /api/projects/{project}/agents/{name}
+- Responses API (plain and streaming)    POST /api/projects/{project}/openai/v1/responses
+
+Each service has its own latency distribution and can throttle with 429 +
+Retry-After, either at random (--throttle-rate) or once a per-service
+request quota is exceeded (--*-rps).
+
+    python -m loadtest.fake_azure --port 9000 --agent-latency lognormal:0.8:0.4 --throttle-rate 0.02
+
+then start loadtest/app.py (the app with test credentials) with the
+environment printed at startup.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from azure_outbound import TokenBucket
+from benchmarks.synthetic import make_analyze_result_dict
+
+
+# ---------------------------
+#  Latency & throttling
+# ---------------------------
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Latency distribution in seconds from a spec:
+    fixed:S | uniform:LOW:HIGH | exp:MEAN | lognormal:MEDIAN:SIGMA
+    """
+    kind, _, rest = spec.partition(":")
+    args = [float(x) for x in rest.split(":") if x]
+    if kind == "fixed":
+        return lambda: args[0]
+    if kind == "uniform":
+        return lambda: random.uniform(args[0], args[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1.0 / args[0])
+    if kind == "lognormal":
+        mu = math.log(args[0])
+        return lambda: random.lognormvariate(mu, args[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class FakeService:
+    """
+    Latency, throttling and counters of one simulated service.
+    """
+
+    def __init__(self, name: str, latency: str, rps: float, throttle_rate: float, retry_after: float):
+        self.name = name
+        self.sample_latency = parse_latency(latency)
+        self.bucket = TokenBucket(rps, rps) if rps > 0 else None
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.counters = {"requests": 0, "throttled": 0}
+
+    def throttle(self) -> Optional[Response]:
+        """
+        A 429 response if this request should be throttled, else None.
+        """
+        self.counters["requests"] += 1
+        over_quota = self.bucket is not None and not self.bucket.try_acquire()
+        if over_quota or random.random() < self.throttle_rate:
+            self.counters["throttled"] += 1
+            return JSONResponse(
+                {"error": {"code": "429", "message": f"{self.name}: rate limit exceeded"}},
+                status_code=429,
+                headers={
+                    "Retry-After": str(max(1, math.ceil(self.retry_after))),
+                    "retry-after-ms": str(int(self.retry_after * 1000)),
+                },
+            )
+        return None
+
+    async def delay(self) -> None:
+        await asyncio.sleep(max(0.0, self.sample_latency()))
+
+
+# ---------------------------
+#  App
+# ---------------------------
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    app = FastAPI(title="Fake Azure services")
+    services = {
+        "document_intelligence": FakeService("document_intelligence", args.di_latency, args.di_rps, args.throttle_rate, args.retry_after),
+        "embeddings": FakeService("embeddings", args.embed_latency, args.embed_rps, args.throttle_rate, args.retry_after),
+        "agents": FakeService("agents", args.agent_latency, args.agent_rps, args.throttle_rate, args.retry_after),
+    }
+    # One canned layout result, reused for every analysis.
+    analyze_result = make_analyze_result_dict(
+        pages=args.di_pages, lines_per_page=40, tables=1, table_rows=args.di_table_rows, key_value_pairs=10,
+    )
+    operations: Dict[str, float] = {}  # operation id -> time the analysis is done
+
+    @app.get("/_stats")
+    def stats():
+        return {name: service.counters for name, service in services.items()}
+
+    # --- Document Intelligence -------------------------------------------
+
+    @app.post("/documentintelligence/documentModels/{model_action}")
+    async def analyze(model_action: str, request: Request):
+        service = services["document_intelligence"]
+        throttled = service.throttle()
+        if throttled is not None:
+            return throttled
+        await request.body()
+        operation_id = uuid.uuid4().hex
+        operations[operation_id] = time.monotonic() + max(0.0, service.sample_latency())
+        location = str(request.base_url).rstrip("/") + (
+            f"/documentintelligence/operations/{operation_id}?api-version="
+            + request.query_params.get("api-version", "2024-11-30")
+        )
+        return Response(
+            status_code=202,
+            headers={"Operation-Location": location, "retry-after-ms": str(int(args.di_poll_interval * 1000))},
+        )
+
+    @app.get("/documentintelligence/operations/{operation_id}")
+    @app.get("/documentintelligence/documentModels/{model_id}/analyzeResults/{operation_id}")
+    async def poll(operation_id: str, model_id: Optional[str] = None):
+        service = services["document_intelligence"]
+        throttled = service.throttle()
+        if throttled is not None:
+            return throttled
+        done_at = operations.get(operation_id)
+        if done_at is None:
+            return JSONResponse({"error": {"code": "NotFound", "message": "Unknown operation"}}, status_code=404)
+        now = time.monotonic()
+        if now < done_at:
+            return JSONResponse(
+                {"status": "running"},
+                headers={"retry-after-ms": str(int(min(args.di_poll_interval, done_at - now) * 1000))},
+            )
+        operations.pop(operation_id, None)
+        return {"status": "succeeded", "analyzeResult": analyze_result}
+
+    # --- Embeddings --------------------------------------------------------
+
+    @app.post("/embeddings")
+    async def embeddings(request: Request):
+        service = services["embeddings"]
+        throttled = service.throttle()
+        if throttled is not None:
+            return throttled
+        body = await request.json()
+        inputs: List[str] = body.get("input") or []
+        await service.delay()
+        return {
+            "id": uuid.uuid4().hex,
+            "object": "list",
+            "model": body.get("model") or "fake-embedding",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": _fake_vector(text, args.embed_dim)}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": sum(len(t) // 4 for t in inputs), "total_tokens": sum(len(t) // 4 for t in inputs)},
+        }
+
+    # --- Agents & Responses -------------------------------------------------
+
+    @app.get("/api/projects/{project}/agents/{agent_name}")
+    async def get_agent(project: str, agent_name: str):
+        service = services["agents"]
+        throttled = service.throttle()
+        if throttled is not None:
+            return throttled
+        return {
+            "object": "agent",
+            "id": f"{agent_name}-id",
+            "name": agent_name,
+            "state": "enabled",
+            "versions": {"latest": {"object": "agent.version", "id": f"{agent_name}:1", "name": agent_name, "version": "1"}},
+        }
+
+    @app.post("/api/projects/{project}/openai/v1/responses")
+    async def responses(project: str, request: Request):
+        service = services["agents"]
+        throttled = service.throttle()
+        if throttled is not None:
+            return throttled
+        body = await request.json()
+        agent_name = (body.get("agent") or {}).get("name", "")
+        text = json.dumps(_agent_output(agent_name, body))
+        await service.delay()
+        if body.get("stream"):
+            return StreamingResponse(_stream_events(text, args.stream_chunk_delay), media_type="text/event-stream")
+        return _response_object(text)
+
+    return app
+
+
+def _fake_vector(text: str, dim: int) -> List[float]:
+    # Deterministic per text, so repeated texts get the same vector.
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    return [rng.uniform(-1.0, 1.0) for _ in range(dim)]
+
+
+def _agent_output(agent_name: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    if "extract" in agent_name:
+        return {
+            "placeName": "Fake Place",
+            "city": "Lisbon",
+            "category": "food",
+            "notes": "Generated by the load-test stand-in.",
+            "aiDescription": "A plausible description of a place, long enough to look real.",
+        }
+    try:
+        payload = json.loads(body["input"][0]["content"])
+        ids = [row[0] for row in payload.get("rows", [])[:3]]
+    except (KeyError, IndexError, TypeError, ValueError):
+        ids = []
+    return {"responseText": "Here are a few places you saved that fit. " * 5, "matches": ids}
+
+
+def _response_object(text: str) -> Dict[str, Any]:
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": "fake-agent",
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "output": [{
+            "type": "message",
+            "id": f"msg_{uuid.uuid4().hex}",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+    }
+
+
+async def _stream_events(text: str, chunk_delay: float):
+    def event(payload: Dict[str, Any]) -> str:
+        return f"event: {payload['type']}\ndata: {json.dumps(payload)}\n\n"
+
+    response = _response_object(text)
+    sequence = 0
+    yield event({"type": "response.created", "sequence_number": sequence, "response": {**response, "status": "in_progress", "output": []}})
+    item_id = response["output"][0]["id"]
+    for start in range(0, len(text), 16):
+        sequence += 1
+        yield event({
+            "type": "response.output_text.delta", "sequence_number": sequence, "item_id": item_id,
+            "output_index": 0, "content_index": 0, "delta": text[start:start + 16], "logprobs": [],
+        })
+        if chunk_delay:
+            await asyncio.sleep(chunk_delay)
+    yield event({"type": "response.completed", "sequence_number": sequence + 1, "response": response})
+
+
+def app_environment(host: str, port: int) -> Dict[str, str]:
+    """
+    Environment that points the app at these stand-ins.
+    """
+    base = f"http://{host}:{port}"
+    return {
+        "AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT": base,
+        "AZURE_DOCUMENT_INTELLIGENCE_KEY": "fake",
+        "AZURE_AI_INFERENCE_ENDPOINT": base,
+        "AZURE_AI_INFERENCE_KEY": "fake",
+        "AZURE_AI_EMBEDDING_MODEL": "fake-embedding",
+        "AZURE_EXISTING_AIPROJECT_ENDPOINT": f"{base}/api/projects/loadtest",
+        # Every request should reach the stand-ins, not the local caches.
+        "OCR_CACHE_ENABLED": "0",
+        "EMBEDDING_CACHE_ENABLED": "0",
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local stand-ins for the Azure services.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--di-latency", default="lognormal:2.0:0.5", help="time until an analysis completes")
+    parser.add_argument("--di-poll-interval", type=float, default=0.5)
+    parser.add_argument("--di-pages", type=int, default=2)
+    parser.add_argument("--di-table-rows", type=int, default=50)
+    parser.add_argument("--embed-latency", default="lognormal:0.08:0.4")
+    parser.add_argument("--embed-dim", type=int, default=256)
+    parser.add_argument("--agent-latency", default="lognormal:1.0:0.5")
+    parser.add_argument("--stream-chunk-delay", type=float, default=0.02)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with 429s (seconds)")
+    parser.add_argument("--di-rps", type=float, default=15.0, help="quota before 429s (0 = unlimited)")
+    parser.add_argument("--embed-rps", type=float, default=0.0)
+    parser.add_argument("--agent-rps", type=float, default=0.0)
+    return parser
+
+
+def main() -> None:
+    import uvicorn
+
+    args = build_parser().parse_args()
+    print("Start the app with:\n")
+    print(" ".join(f"{k}={v}" for k, v in app_environment(args.host, args.port).items()) + " uvicorn loadtest.app:app\n")
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,19 @@
-from fastapi import FastAPI, File, UploadFile
-from fastapi.middleware.cors import CORSMiddleware
+import startup_profile
+
+# Must run before the other imports so they are included in the startup report.
+startup_profile.install()
+
+import asyncio
+import json
+import os
+import time
+
+with startup_profile.phase("import fastapi"):
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import PlainTextResponse, StreamingResponse
+
+import metrics
 
 app=FastAPI(title="My First FASTAPI")
 origins = [
@@ -13,9 +27,86 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+# Outermost, so the request histogram and Server-Timing cover the whole request.
+app.add_middleware(metrics.TimingMiddleware)
+
+with startup_profile.phase("import travelPlanner.routes.extract"):
+    from travelPlanner.routes import extract  # noqa: F401
+with startup_profile.phase("import travelPlanner.routes.chat_agent"):
+    from travelPlanner.routes import chat_agent  # noqa: F401
+with startup_profile.phase("import bill_jobs, ocr_utils"):
+    from azure_outbound import outbound_stats
+    from chunks.embedding_utils import close_shared_embedding_model
+    from ocr_utils import close_async_document_intelligence_client
+    from travelPlanner.azure_client import close_async_clients, warm_up_async
+    from bill_jobs import BillJob, BillJobStore, FINAL_STATUSES, UploadError, UploadTooLarge, save_upload
+
+bill_jobs = BillJobStore()
+
+# Set WARMUP_ON_STARTUP=1 to build the Azure clients and fetch agent definitions
+# in the background right after startup, instead of on the first request.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0").lower() in ("1", "true", "yes")
+_warmup_task = None
+
+
+async def warm_up() -> None:
+    with startup_profile.phase("warm-up: agent clients + agent definitions"):
+        try:
+            await warm_up_async()
+        except Exception as e:
+            print(f"Warm-up of agent clients failed: {e}")
+    with startup_profile.phase("warm-up: OCR/embedding SDK imports"):
+        await asyncio.to_thread(_import_heavy_sdks)
+
+
+def _import_heavy_sdks() -> None:
+    import azure.ai.documentintelligence.aio  # noqa: F401
+    import semantic_kernel.connectors.ai.azure_ai_inference  # noqa: F401
+
+
+@app.on_event("startup")
+async def on_startup():
+    global _warmup_task
+
+    startup_profile.mark_ready()
+    if WARMUP_ON_STARTUP:
+        _warmup_task = asyncio.create_task(warm_up())
+
 
-from travelPlanner.routes import extract, chat_agent  # noqa: F401
+@app.on_event("shutdown")
+async def close_shared_clients():
+    await close_async_document_intelligence_client()
+    await close_async_clients()
+    await close_shared_embedding_model()
+    await extract.extract_cache.close()
+
+
+@app.get("/api/startup")
+def get_startup_report():
+    """
+    Import / initialization time breakdown of this worker. Per-module import
+    times are included when the app was started with STARTUP_PROFILE=1.
+    """
+    return startup_profile.startup_report()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Request and per-stage latency histograms in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/outbound")
+def get_outbound_stats():
+    """
+    Per-service outbound call counters: retries, throttles, circuit state and
+    the current adaptive concurrency limit.
+    """
+    return outbound_stats()
 
 
 @app.get("/hello/{name}")
@@ -23,10 +114,69 @@ def say_hello(name:str):
     return { "greeting":f"Hello {name}" }
 
 @app.post("/api/bills/upload")
-def upload_bills(file:UploadFile=File(...)):
-    print(file)
+async def upload_bills(request: Request):
+    """
+    multipart/form-data upload with the bill in the "file" field; the body is
+    streamed to storage as it arrives (see save_upload). Files over
+    BILL_MAX_UPLOAD_BYTES get a 413.
+    """
+    try:
+        filename, content_type, path, sha256, size = await save_upload(request)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    job = bill_jobs.submit(
+        BillJob(filename, content_type, path, sha256, size)
+    )
     return {
         "success": True,
-        "filename": file.filename,
-        "content_type": file.content_type
-    }
\ No newline at end of file
+        "filename": filename,
+        "content_type": content_type,
+        "job_id": job.id,
+        "status": job.status,
+        "sha256": sha256,
+        "size": size,
+    }
+
+
+def _get_bill_job(job_id: str) -> BillJob:
+    job = bill_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@app.get("/api/bills/{job_id}")
+async def get_bill_job(job_id: str, wait: float = 0):
+    """
+    Return job status/result. With ?wait=N, long-poll up to N seconds (max 30)
+    for the job to finish.
+    """
+    job = _get_bill_job(job_id)
+    deadline = time.monotonic() + min(max(wait, 0), 30)
+    while job.status not in FINAL_STATUSES and time.monotonic() < deadline:
+        await job.wait_for_change(deadline - time.monotonic())
+    return job.to_dict()
+
+
+@app.get("/api/bills/{job_id}/events")
+async def stream_bill_job(job_id: str):
+    """
+    Server-Sent Events stream of job status changes; ends once the job finishes.
+    """
+    job = _get_bill_job(job_id)
+
+    async def events():
+        last_status = None
+        while True:
+            if job.status != last_status:
+                last_status = job.status
+                yield f"event: status\ndata: {json.dumps(job.to_dict())}\n\n"
+            if job.status in FINAL_STATUSES:
+                return
+            await job.wait_for_change(15)
+            if job.status == last_status:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
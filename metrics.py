@@ -0,0 +1,171 @@
+# metrics.py
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# No third-party imports: this is used on the hot path of every request.
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# Stage timings of the request being handled: a list of (stage, seconds) shared
+# by reference with every task/thread the request spawns (contexts are copied).
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+# ---------------------------
+#  Histograms
+# ---------------------------
+
+class Histogram:
+    """
+    Prometheus-style cumulative histogram, one series per label tuple.
+    """
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        # labels -> [bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], seconds: float) -> None:
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += seconds
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = {labels: (list(counts), total[0]) for labels, (counts, total) in self._series.items()}
+
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(snapshot.items()):
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels))
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+            series = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}_sum{series} {total}")
+            lines.append(f"{self.name}_count{series} {cumulative}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+stage_seconds = Histogram(
+    "app_stage_duration_seconds", "Time spent in one stage of request handling.", ("stage",)
+)
+request_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route", "status")
+)
+
+
+# ---------------------------
+#  Stage timing
+# ---------------------------
+
+def observe(stage: str, seconds: float) -> None:
+    """
+    Record a stage duration in the histogram and in the current request's timings.
+    """
+    stage_seconds.observe((stage,), seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Time the enclosed block as `stage` (also when it raises).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """
+    Format stage timings as a Server-Timing header value; repeated stages are summed.
+    """
+    durations: Dict[str, float] = {}
+    for stage, seconds in timings:
+        durations[stage] = durations.get(stage, 0.0) + seconds
+    entries = [f"{stage.replace('.', '_')};dur={seconds * 1000:.1f}" for stage, seconds in durations.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+# ---------------------------
+#  ASGI middleware & exposition
+# ---------------------------
+
+class TimingMiddleware:
+    """
+    Times each HTTP request, records it by route template, and adds a
+    Server-Timing header with the stages recorded before the response started
+    (for streaming responses that is the work done before the first byte).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                header = server_timing_header(timings, time.perf_counter() - start)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            request_seconds.observe(
+                (scope.get("method", ""), route, str(status[0])), time.perf_counter() - start
+            )
+
+
+def render_prometheus() -> str:
+    """
+    All histograms in the Prometheus text exposition format.
+    """
+    lines: List[str] = []
+    for histogram in (request_seconds, stage_seconds):
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
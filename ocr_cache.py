@@ -0,0 +1,339 @@
+# ocr_cache.py
+
+import hashlib
+import logging
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from ocr_slim import SlimDocument, to_slim
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------
+#  Config
+# ---------------------------
+
+# Analyses hold whole bank statements, so the disk tier lives in a per-user
+# cache directory created 0700, with 0600 files, never in the shared temp dir.
+DEFAULT_CACHE_DIR = os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "smart-bill", "ocr",
+)
+DEFAULT_MAX_MEMORY_ENTRIES = 64
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+# Disk entries are the stored_at timestamp followed by SlimDocument.to_bytes().
+_ENTRY_SUFFIX = ".slim"
+_STORED_AT = struct.Struct("<d")
+
+
+def make_cache_key(
+    data: bytes,
+    model_id: str,
+    features: Optional[Iterable[str]] = None,
+    pages: Optional[str] = None,
+) -> str:
+    """
+    Build a content-addressed key from the file bytes and the analysis options.
+    The same bytes analyzed with a different model (or feature set / page range)
+    get a different key.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    parts = [digest, model_id]
+    if features:
+        parts.append("features=" + ",".join(sorted(features)))
+    if pages:
+        parts.append("pages=" + pages)
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+# ---------------------------
+#  Two-tier cache
+# ---------------------------
+
+class AnalysisCache:
+    """
+    Cache of Document Intelligence results with two tiers, both holding the
+    compact SlimDocument form (see ocr_slim) rather than the SDK object graph:
+    - an in-memory LRU of SlimDocuments
+    - an on-disk store of their binary form, shared across restarts/workers
+
+    Entries older than `max_age_seconds` are treated as misses and removed.
+    The memory tier is bounded by entry count, the disk tier by total bytes
+    (least recently used files are deleted first). `cache_dir` is made private
+    to the current user (0700) before anything is written to it.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+        max_memory_entries: int = DEFAULT_MAX_MEMORY_ENTRIES,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+    ):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age_seconds = max_age_seconds
+
+        self._memory: "OrderedDict[str, Tuple[float, SlimDocument]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+        self._dir_ready = False
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ---- public API ----
+
+    def get(self, key: str) -> Optional[SlimDocument]:
+        """
+        Return the cached SlimDocument for `key`, or None on a miss.
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, result = entry
+                if now - stored_at <= self.max_age_seconds:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return result
+                del self._memory[key]
+                self.evictions += 1
+
+        loaded = self._load_from_disk(key, now)
+        if loaded is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        stored_at, result = loaded
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, stored_at, result)
+        return result
+
+    def put(self, key: str, result: Any) -> SlimDocument:
+        """
+        Convert `result` with to_slim() and store it under `key` in both tiers;
+        returns the stored SlimDocument. A failing disk write is logged and
+        skipped: the result has already been paid for.
+        """
+        slim = to_slim(result)
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, slim)
+        try:
+            self._write_to_disk(key, stored_at, slim)
+        except OSError:
+            logger.warning("OCR disk cache write failed for %s", key, exc_info=True)
+        return slim
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return hit/miss counters and current tier sizes.
+        """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes or 0,
+            }
+
+    def clear(self) -> None:
+        """
+        Drop every entry from both tiers.
+        """
+        with self._lock:
+            self._memory.clear()
+            for path, _, _ in self._disk_entries():
+                _remove_quietly(path)
+            self._disk_bytes = 0
+
+    # ---- memory tier ----
+
+    def _remember(self, key: str, stored_at: float, result: SlimDocument) -> None:
+        # Caller holds self._lock.
+        self._memory[key] = (stored_at, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    # ---- disk tier ----
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}{_ENTRY_SUFFIX}")
+
+    def _load_from_disk(self, key: str, now: float) -> Optional[Tuple[float, SlimDocument]]:
+        if not self.cache_dir:
+            return None
+
+        path = self._path_for(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            (stored_at,) = _STORED_AT.unpack_from(data)
+        except (OSError, struct.error):
+            return None
+
+        if now - stored_at > self.max_age_seconds:
+            with self._lock:
+                self._forget_file(path)
+                self.evictions += 1
+            return None
+
+        try:
+            result = SlimDocument.from_bytes(data[_STORED_AT.size:])
+        except (ValueError, struct.error):
+            return None
+
+        try:
+            # Bump mtime so size-based eviction removes the least recently used files.
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        return stored_at, result
+
+    def _write_to_disk(self, key: str, stored_at: float, result: SlimDocument) -> None:
+        if not self.cache_dir:
+            return
+
+        path = self._path_for(key)
+        data = _STORED_AT.pack(stored_at) + result.to_bytes()
+
+        self._ensure_private_dir()
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        try:
+            replaced_bytes = os.path.getsize(path)
+        except OSError:
+            replaced_bytes = 0
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+            else:
+                self._disk_bytes += len(data) - replaced_bytes
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _ensure_private_dir(self) -> None:
+        if self._dir_ready:
+            return
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+        # makedirs leaves an existing directory's mode alone.
+        os.chmod(self.cache_dir, 0o700)
+        self._dir_ready = True
+
+    def _disk_entries(self):
+        # Caller holds self._lock. Yields (path, size, mtime).
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(_ENTRY_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _evict_disk(self) -> None:
+        # Caller holds self._lock.
+        now = time.time()
+        entries = sorted(self._disk_entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+
+        for path, size, mtime in entries:
+            expired = now - mtime > self.max_age_seconds
+            if not expired and total <= self.max_disk_bytes:
+                break
+            _remove_quietly(path)
+            total -= size
+            self.evictions += 1
+
+        self._disk_bytes = total
+
+    def _forget_file(self, path: str) -> None:
+        # Caller holds self._lock.
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        _remove_quietly(path)
+        if self._disk_bytes is not None:
+            self._disk_bytes = max(0, self._disk_bytes - size)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# ---------------------------
+#  Process-wide default
+# ---------------------------
+
+_default_cache: Optional[AnalysisCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> Optional[AnalysisCache]:
+    """
+    Return the shared AnalysisCache configured from env variables, or None when
+    OCR_CACHE_ENABLED is "0"/"false":
+    - OCR_CACHE_DIR (empty string disables the disk tier)
+    - OCR_CACHE_MAX_ENTRIES
+    - OCR_CACHE_MAX_BYTES
+    - OCR_CACHE_MAX_AGE_SECONDS
+    """
+    global _default_cache
+
+    if os.getenv("OCR_CACHE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = AnalysisCache(
+                    cache_dir=os.getenv("OCR_CACHE_DIR", DEFAULT_CACHE_DIR) or None,
+                    max_memory_entries=int(
+                        os.getenv("OCR_CACHE_MAX_ENTRIES", DEFAULT_MAX_MEMORY_ENTRIES)
+                    ),
+                    max_disk_bytes=int(
+                        os.getenv("OCR_CACHE_MAX_BYTES", DEFAULT_MAX_DISK_BYTES)
+                    ),
+                    max_age_seconds=float(
+                        os.getenv("OCR_CACHE_MAX_AGE_SECONDS", DEFAULT_MAX_AGE_SECONDS)
+                    ),
+                )
+    return _default_cache
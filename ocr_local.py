@@ -0,0 +1,339 @@
+# ocr_local.py
+
+import asyncio
+import io
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from ocr_utils import analyze_document, analyze_document_async
+
+load_dotenv()
+
+# A page with fewer non-whitespace characters than this in its text layer is
+# treated as scanned / image-only and sent to Document Intelligence.
+DEFAULT_MIN_TEXT_CHARS = int(os.getenv("OCR_LOCAL_MIN_TEXT_CHARS", "20"))
+
+# Only ruled tables (drawn cell borders) are extracted locally.
+_RULED_TABLE_SETTINGS = {
+    "vertical_strategy": "lines",
+    "horizontal_strategy": "lines",
+}
+
+# Cell edges closer than this (in PDF points) are the same grid line.
+_EDGE_TOLERANCE = 1.0
+
+SERVED_BY_LOCAL = "local"
+SERVED_BY_AZURE = "azure"
+SERVED_BY_MIXED = "mixed"
+
+
+# ---------------------------
+#  Result Shapes
+# ---------------------------
+# Minimal stand-ins for the SDK models, exposing only the attributes that
+# ocr_utils.extract_lines / extract_tables / extract_key_value_pairs read.
+
+class LocalLine:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class LocalPage:
+    def __init__(self, page_number: int, lines: List[LocalLine]):
+        self.page_number = page_number
+        self.lines = lines
+
+
+class LocalBoundingRegion:
+    def __init__(self, page_number: int):
+        self.page_number = page_number
+
+
+class LocalTableCell:
+    def __init__(
+        self,
+        row_index: int,
+        column_index: int,
+        content: str,
+        row_span: int = 1,
+        column_span: int = 1,
+    ):
+        self.row_index = row_index
+        self.column_index = column_index
+        self.content = content
+        self.row_span = row_span
+        self.column_span = column_span
+
+
+class LocalTable:
+    def __init__(self, row_count: int, column_count: int, cells: List[LocalTableCell], page_number: int):
+        self.row_count = row_count
+        self.column_count = column_count
+        self.cells = cells
+        self.bounding_regions = [LocalBoundingRegion(page_number)]
+
+
+class LocalAnalyzeResult:
+    """
+    Analysis result assembled from the PDF text layer and/or Document Intelligence.
+
+    `served_by` is "local", "azure" or "mixed"; `page_sources` maps each page
+    number to the path that produced it.
+    """
+
+    def __init__(
+        self,
+        pages: List[Any],
+        tables: List[Any],
+        served_by: str,
+        page_sources: Dict[int, str],
+        key_value_pairs: Optional[List[Any]] = None,
+        documents: Optional[List[Any]] = None,
+    ):
+        self.pages = pages
+        self.tables = tables
+        self.served_by = served_by
+        self.page_sources = page_sources
+        self.key_value_pairs = key_value_pairs or []
+        self.documents = documents or []
+
+
+# ---------------------------
+#  Local Extraction
+# ---------------------------
+
+_Box = Tuple[float, float, float, float]  # x0, top, x1, bottom
+
+
+def _grid_lines(starts: Sequence[float]) -> List[float]:
+    lines: List[float] = []
+    for start in sorted(starts):
+        if not lines or start - lines[-1] > _EDGE_TOLERANCE:
+            lines.append(start)
+    return lines
+
+
+def _span(start: float, end: float, lines: List[float]) -> int:
+    # Grid lines from the cell's own start up to (not including) its end.
+    return max(1, sum(1 for line in lines if start - _EDGE_TOLERANCE <= line < end - _EDGE_TOLERANCE))
+
+
+def _table_from_rows(
+    rows: List[List[Optional[str]]],
+    page_number: int,
+    boxes: Optional[List[List[Optional[_Box]]]] = None,
+) -> LocalTable:
+    """
+    Build a table from pdfplumber's extract() rows and, when given, the
+    matching cell bounding boxes (Table.rows[i].cells).
+
+    pdfplumber reports every position covered by a merged cell as None,
+    whether the merge is horizontal or vertical, so spans are read from the
+    cell boxes: a cell spans the column (row) grid lines its box crosses.
+    Without boxes every cell spans one position.
+    """
+    cells: List[LocalTableCell] = []
+    column_count = max((len(row) for row in rows), default=0)
+
+    x_lines = y_lines = None
+    if boxes is not None:
+        present = [box for row in boxes for box in row if box is not None]
+        x_lines = _grid_lines([box[0] for box in present])
+        y_lines = _grid_lines([box[1] for box in present])
+
+    for r_idx, row in enumerate(rows):
+        for c_idx, value in enumerate(row):
+            if value is None:
+                continue
+            row_span = column_span = 1
+            box = boxes[r_idx][c_idx] if boxes is not None else None
+            if box is not None:
+                x0, top, x1, bottom = box
+                column_span = min(_span(x0, x1, x_lines), column_count - c_idx)
+                row_span = min(_span(top, bottom, y_lines), len(rows) - r_idx)
+            cells.append(LocalTableCell(r_idx, c_idx, value.strip(), row_span, column_span))
+
+    return LocalTable(len(rows), column_count, cells, page_number)
+
+
+def extract_text_layer(
+    data: bytes,
+    min_text_chars: int = DEFAULT_MIN_TEXT_CHARS,
+) -> Dict[str, Any]:
+    """
+    Read the embedded text layer of a PDF.
+
+    Returns:
+        {
+            "pages": [LocalPage, ...],      # pages that have a usable text layer
+            "tables": [LocalTable, ...],    # ruled tables found on those pages
+            "scanned_pages": [int, ...],    # 1-based numbers of pages needing OCR
+        }
+    """
+    import pdfplumber
+
+    pages: List[LocalPage] = []
+    tables: List[LocalTable] = []
+    scanned_pages: List[int] = []
+
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        for page in pdf.pages:
+            text_chars = sum(1 for ch in page.chars if not ch["text"].isspace())
+            if text_chars < min_text_chars:
+                scanned_pages.append(page.page_number)
+                continue
+
+            lines = [
+                LocalLine(line["text"])
+                for line in page.extract_text_lines(return_chars=False)
+                if line["text"]
+            ]
+            pages.append(LocalPage(page.page_number, lines))
+
+            for table in page.find_tables(_RULED_TABLE_SETTINGS):
+                rows = table.extract()
+                if rows:
+                    boxes = [list(row.cells) for row in table.rows]
+                    tables.append(_table_from_rows(rows, page.page_number, boxes))
+
+            page.flush_cache()
+
+    return {"pages": pages, "tables": tables, "scanned_pages": scanned_pages}
+
+
+def is_pdf(data: bytes) -> bool:
+    return data.lstrip()[:5] == b"%PDF-"
+
+
+# ---------------------------
+#  Local-first Analyze
+# ---------------------------
+
+def _format_pages(page_numbers: List[int]) -> str:
+    # [1, 2, 3, 7] -> "1-3,7"
+    parts: List[str] = []
+    start = prev = page_numbers[0]
+    for number in page_numbers[1:] + [None]:
+        if number is not None and number == prev + 1:
+            prev = number
+            continue
+        parts.append(str(start) if start == prev else f"{start}-{prev}")
+        if number is not None:
+            start = prev = number
+    return ",".join(parts)
+
+
+def _needs_every_page(analyze_kwargs: Dict[str, Any]) -> bool:
+    # Key-value pairs only come from Document Intelligence; a text layer has none.
+    return "keyValuePairs" in (analyze_kwargs.get("features") or ())
+
+
+def _table_page(table: Any) -> int:
+    regions = getattr(table, "bounding_regions", None) or []
+    return regions[0].page_number if regions else 0
+
+
+def _combine(local: Optional[Dict[str, Any]], azure_result: Any) -> LocalAnalyzeResult:
+    pages: List[Any] = []
+    tables: List[Any] = []
+    page_sources: Dict[int, str] = {}
+    key_value_pairs: List[Any] = []
+    documents: List[Any] = []
+
+    if local is not None:
+        pages.extend(local["pages"])
+        tables.extend(local["tables"])
+        page_sources.update({p.page_number: SERVED_BY_LOCAL for p in local["pages"]})
+
+    if azure_result is not None:
+        azure_pages = list(getattr(azure_result, "pages", []) or [])
+        pages.extend(azure_pages)
+        tables.extend(getattr(azure_result, "tables", []) or [])
+        page_sources.update({p.page_number: SERVED_BY_AZURE for p in azure_pages})
+        key_value_pairs = list(getattr(azure_result, "key_value_pairs", []) or [])
+        documents = list(getattr(azure_result, "documents", []) or [])
+
+    pages.sort(key=lambda p: p.page_number)
+    tables.sort(key=_table_page)  # stable: keeps in-page order
+
+    sources = set(page_sources.values())
+    if sources == {SERVED_BY_LOCAL}:
+        served_by = SERVED_BY_LOCAL
+    elif sources == {SERVED_BY_AZURE} or not sources:
+        served_by = SERVED_BY_AZURE
+    else:
+        served_by = SERVED_BY_MIXED
+
+    return LocalAnalyzeResult(pages, tables, served_by, page_sources, key_value_pairs, documents)
+
+
+def analyze_document_local_first(
+    file_path: str,
+    model_id: str = "prebuilt-layout",
+    min_text_chars: int = DEFAULT_MIN_TEXT_CHARS,
+    **analyze_kwargs: Any,
+) -> LocalAnalyzeResult:
+    """
+    Analyze a document, reading digitally generated PDF pages locally and sending
+    only scanned / image-only pages (or non-PDF files) to Document Intelligence.
+    When key-value pairs are requested (features=["keyValuePairs"]) the whole
+    document goes to Document Intelligence, since local pages cannot provide them.
+
+    The result works with extract_lines, extract_plain_text and extract_tables,
+    and records which path served it in `served_by` / `page_sources`.
+    Extra keyword arguments are passed to ocr_utils.analyze_document. Azure pages
+    are merged with the local ones as full SDK models (slim=False), so this path
+    always calls Azure for them; the results still land in the analysis cache.
+    """
+    with open(file_path, "rb") as f:
+        data = f.read()
+
+    if not is_pdf(data) or _needs_every_page(analyze_kwargs):
+        return _combine(None, analyze_document(file_path, model_id=model_id, slim=False, **analyze_kwargs))
+
+    local = extract_text_layer(data, min_text_chars)
+    azure_result = None
+    if local["scanned_pages"]:
+        azure_result = analyze_document(
+            file_path,
+            model_id=model_id,
+            slim=False,
+            pages=_format_pages(local["scanned_pages"]),
+            **analyze_kwargs,
+        )
+    return _combine(local, azure_result)
+
+
+async def analyze_document_local_first_async(
+    file_path: str,
+    model_id: str = "prebuilt-layout",
+    min_text_chars: int = DEFAULT_MIN_TEXT_CHARS,
+    **analyze_kwargs: Any,
+) -> LocalAnalyzeResult:
+    """
+    Async variant of analyze_document_local_first(); local parsing runs in a worker thread.
+    """
+    data = await asyncio.to_thread(_read_file, file_path)
+
+    if not is_pdf(data) or _needs_every_page(analyze_kwargs):
+        azure_result = await analyze_document_async(file_path, model_id=model_id, slim=False, **analyze_kwargs)
+        return _combine(None, azure_result)
+
+    local = await asyncio.to_thread(extract_text_layer, data, min_text_chars)
+    azure_result = None
+    if local["scanned_pages"]:
+        azure_result = await analyze_document_async(
+            file_path,
+            model_id=model_id,
+            slim=False,
+            pages=_format_pages(local["scanned_pages"]),
+            **analyze_kwargs,
+        )
+    return _combine(local, azure_result)
+
+
+def _read_file(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        return f.read()
@@ -1,40 +1,129 @@
 # ocr_plugin.py
 
-from typing import Dict, Any, List
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 
 from semantic_kernel.functions import kernel_function
 
 from ocr_utils import (
-    analyze_document,
+    analyze_document_async,
     extract_plain_text,
     extract_key_value_pairs,
     extract_tables,
 )
+from ocr_slim import to_slim
+
+# 'prebuilt-layout' with the keyValuePairs add-on returns lines, tables and
+# key-value pairs in one analysis, so one call can answer every plugin function.
+SESSION_MODEL_ID = "prebuilt-layout"
+SESSION_FEATURES = ["keyValuePairs"]
+
+
+class DocumentSession:
+    """
+    One analysis of one document. The Azure call happens at most once, on first
+    use; text, key-value pairs and tables are derived lazily from that result
+    and memoized.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        model_id: str = SESSION_MODEL_ID,
+        features: Optional[List[str]] = None,
+    ):
+        self.file_path = file_path
+        self.model_id = model_id
+        self.features = SESSION_FEATURES if features is None else features
+
+        self._lock = asyncio.Lock()
+        self._result = None
+        self._text: Optional[str] = None
+        self._key_values: Optional[Dict[str, str]] = None
+        self._tables: Optional[List[List[List[str]]]] = None
+
+    async def result(self):
+        """
+        Return the analysis result as a SlimDocument, running the analysis on
+        first call only. Concurrent callers wait for the same analysis.
+        """
+        if self._result is None:
+            async with self._lock:
+                if self._result is None:
+                    result = await analyze_document_async(
+                        self.file_path,
+                        model_id=self.model_id,
+                        features=self.features,
+                    )
+                    # Sessions outlive the call; keep only the compact form.
+                    self._result = to_slim(result)
+        return self._result
+
+    async def text(self) -> str:
+        if self._text is None:
+            self._text = extract_plain_text(await self.result())
+        return self._text
+
+    async def key_values(self) -> Dict[str, str]:
+        if self._key_values is None:
+            self._key_values = extract_key_value_pairs(await self.result())
+        return self._key_values
+
+    async def tables(self) -> List[List[List[str]]]:
+        if self._tables is None:
+            self._tables = extract_tables(await self.result())
+        return self._tables
 
 
 class OcrPlugin:
     """
     Semantic Kernel plugin for OCR / Document Intelligence.
     Exposes high-level functions that SK (or agents) can call.
+
+    Each file gets a DocumentSession, so asking for text and then for
+    key-values/tables analyzes the document only once.
     """
 
+    def __init__(self, max_sessions: int = 16):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[Tuple[str, float, int], DocumentSession]" = OrderedDict()
+
+    def get_session(self, file_path: str) -> DocumentSession:
+        """
+        Return the session for `file_path`, creating it if needed.
+        Sessions are keyed by path, mtime and size, so a modified file is re-analyzed.
+        """
+        path = os.path.abspath(file_path)
+        st = os.stat(path)
+        key = (path, st.st_mtime, st.st_size)
+
+        session = self._sessions.get(key)
+        if session is None:
+            session = DocumentSession(path)
+            self._sessions[key] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(key)
+        return session
+
     @kernel_function(
         name="analyze_pdf_to_text",
         description="Analyze a PDF using Azure Document Intelligence and return extracted plain text.",
     )
-    def analyze_pdf_to_text(self, file_path: str) -> str:
+    async def analyze_pdf_to_text(self, file_path: str) -> str:
         """
         Analyze the given PDF and return all extracted text as a single string.
         """
-        result = analyze_document(file_path, model_id="prebuilt-layout")
-        text = extract_plain_text(result)
-        return text
+        return await self.get_session(file_path).text()
 
     @kernel_function(
         name="analyze_pdf_to_kv_and_tables",
         description="Analyze a PDF and return key-value fields and tables as structured data.",
     )
-    def analyze_pdf_to_kv_and_tables(self, file_path: str) -> Dict[str, Any]:
+    async def analyze_pdf_to_kv_and_tables(self, file_path: str) -> Dict[str, Any]:
         """
         Analyze the given PDF and return structured data:
         {
@@ -42,25 +131,19 @@ class OcrPlugin:
             "tables": [ [ [cells...] ], ... ]
         }
         """
-        # For KV pairs, prebuilt-document is usually better
-        result = analyze_document(file_path, model_id="prebuilt-document")
-
-        kv = extract_key_value_pairs(result)
-        tables = extract_tables(result)
+        session = self.get_session(file_path)
 
         return {
-            "key_values": kv,
-            "tables": tables,
+            "key_values": await session.key_values(),
+            "tables": await session.tables(),
         }
 
     @kernel_function(
         name="get_pdf_tables",
         description="Extract only tables from a PDF document.",
     )
-    def get_pdf_tables(self, file_path: str) -> List[List[List[str]]]:
+    async def get_pdf_tables(self, file_path: str) -> List[List[List[str]]]:
         """
         Analyze the given PDF and return tables only.
         """
-        result = analyze_document(file_path, model_id="prebuilt-layout")
-        tables = extract_tables(result)
-        return tables
+        return await self.get_session(file_path).tables()
@@ -0,0 +1,256 @@
+# ocr_slim.py
+
+import struct
+import sys
+from array import array
+from typing import Any, Dict, List, Sequence
+
+# No imports from ocr_utils at module level: ocr_utils imports this module.
+
+SLIM_MAGIC = b"SLMD"
+SLIM_VERSION = 1
+
+_HEADER = struct.Struct("<4sBIIIIII")  # magic, version, strings, text bytes, pages, lines, kv ids, tables
+_TABLE_HEADER = struct.Struct("<II")  # row_count, column_count
+
+
+# ---------------------------
+#  Model
+# ---------------------------
+# All strings of a document live in one str; everything else refers to them by
+# index through typed arrays. A document with 100k table cells is a few MB of
+# arrays instead of hundreds of thousands of SDK model objects.
+
+class SlimTable:
+    """
+    Dense table grid: `cells` holds a string index per position (row-major),
+    with merged cells repeated across the positions they span; `covered` is 1
+    where a position is covered by a span that starts elsewhere.
+    """
+
+    __slots__ = ("row_count", "column_count", "cells", "covered")
+
+    def __init__(self, row_count: int, column_count: int, cells: array, covered: bytes):
+        self.row_count = row_count
+        self.column_count = column_count
+        self.cells = cells
+        self.covered = covered
+
+
+class SlimDocument:
+    """
+    Compact form of an analysis result holding only what the extract helpers
+    read: lines per page, key-value pairs and table grids.
+
+    Build one with to_slim(result); ocr_utils.extract_lines / extract_plain_text /
+    extract_key_value_pairs / extract_tables accept it in place of the SDK result.
+    to_bytes()/from_bytes() give a compact binary form, also used when pickling.
+    """
+
+    __slots__ = ("_text", "_ends", "page_numbers", "page_line_ends", "line_ids", "key_value_ids", "tables")
+
+    def __init__(
+        self,
+        text: str,
+        ends: array,
+        page_numbers: array,
+        page_line_ends: array,
+        line_ids: array,
+        key_value_ids: array,
+        tables: List[SlimTable],
+    ):
+        self._text = text
+        self._ends = ends                    # end offset of string i in _text
+        self.page_numbers = page_numbers
+        self.page_line_ends = page_line_ends  # cumulative line count after each page
+        self.line_ids = line_ids
+        self.key_value_ids = key_value_ids    # key, value, key, value, ...
+        self.tables = tables
+
+    def _strings(self, ids: Sequence[int]) -> List[str]:
+        text, ends = self._text, self._ends
+        return [text[ends[i - 1] if i else 0:ends[i]] for i in ids]
+
+    def lines(self) -> List[str]:
+        return [line for line in self._strings(self.line_ids) if line]
+
+    def key_values(self) -> Dict[str, str]:
+        strings = self._strings(self.key_value_ids)
+        return dict(zip(strings[0::2], strings[1::2]))
+
+    def table_grids(self, fill_spans: bool = True) -> List[List[List[str]]]:
+        grids = []
+        for table in self.tables:
+            values = self._strings(table.cells)
+            if not fill_spans:
+                values = ["" if covered else value for value, covered in zip(values, table.covered)]
+            width = table.column_count
+            grids.append([values[row * width:(row + 1) * width] for row in range(table.row_count)])
+        return grids
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the document's data.
+        """
+        size = sys.getsizeof(self._text)
+        for arr in (self._ends, self.page_numbers, self.page_line_ends, self.line_ids, self.key_value_ids):
+            size += arr.itemsize * len(arr)
+        for table in self.tables:
+            size += table.cells.itemsize * len(table.cells) + len(table.covered)
+        return size
+
+    # ---------------------------
+    #  Binary form
+    # ---------------------------
+
+    def to_bytes(self) -> bytes:
+        text = self._text.encode("utf-8")
+        parts = [
+            _HEADER.pack(
+                SLIM_MAGIC, SLIM_VERSION, len(self._ends), len(text), len(self.page_numbers),
+                len(self.line_ids), len(self.key_value_ids), len(self.tables),
+            ),
+            text,
+            _array_bytes(self._ends),
+            _array_bytes(self.page_numbers),
+            _array_bytes(self.page_line_ends),
+            _array_bytes(self.line_ids),
+            _array_bytes(self.key_value_ids),
+        ]
+        for table in self.tables:
+            parts.append(_TABLE_HEADER.pack(table.row_count, table.column_count))
+            parts.append(_array_bytes(table.cells))
+            parts.append(bytes(table.covered))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SlimDocument":
+        view = memoryview(data)
+        magic, version, n_strings, n_text, n_pages, n_lines, n_kv, n_tables = _HEADER.unpack_from(view)
+        if magic != SLIM_MAGIC or version != SLIM_VERSION:
+            raise ValueError(f"Not a slim document (magic={magic!r}, version={version})")
+
+        pos = _HEADER.size
+        text = bytes(view[pos:pos + n_text]).decode("utf-8")
+        pos += n_text
+
+        def take(count: int) -> array:
+            nonlocal pos
+            arr = _array_from(view[pos:pos + 4 * count])
+            pos += 4 * count
+            return arr
+
+        ends = take(n_strings)
+        page_numbers = take(n_pages)
+        page_line_ends = take(n_pages)
+        line_ids = take(n_lines)
+        key_value_ids = take(n_kv)
+
+        tables = []
+        for _ in range(n_tables):
+            row_count, column_count = _TABLE_HEADER.unpack_from(view, pos)
+            pos += _TABLE_HEADER.size
+            cells = take(row_count * column_count)
+            covered = bytes(view[pos:pos + row_count * column_count])
+            pos += row_count * column_count
+            tables.append(SlimTable(row_count, column_count, cells, covered))
+
+        return cls(text, ends, page_numbers, page_line_ends, line_ids, key_value_ids, tables)
+
+    def __reduce__(self):
+        # Pickle (e.g. to a ProcessPoolExecutor worker) as the compact binary form.
+        return (SlimDocument.from_bytes, (self.to_bytes(),))
+
+
+def _array_bytes(arr: array) -> bytes:
+    if sys.byteorder == "little":
+        return arr.tobytes()
+    swapped = array(arr.typecode, arr)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def _array_from(data: memoryview) -> array:
+    arr = array("I")
+    arr.frombytes(data)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+# ---------------------------
+#  Conversion
+# ---------------------------
+
+class _StringTable:
+    """Interns strings into one buffer; equal strings share an index."""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.ends = array("I")
+        self.index: Dict[str, int] = {}
+        self.length = 0
+
+    def add(self, text: str) -> int:
+        i = self.index.get(text)
+        if i is None:
+            i = self.index[text] = len(self.ends)
+            self.parts.append(text)
+            self.length += len(text)
+            self.ends.append(self.length)
+        return i
+
+
+def _covered_mask(table, row_count: int, column_count: int) -> bytes:
+    mask = bytearray(row_count * column_count)
+    for cell in table.cells:
+        row_span = getattr(cell, "row_span", None) or 1
+        column_span = getattr(cell, "column_span", None) or 1
+        if row_span == 1 and column_span == 1:
+            continue
+        for r in range(cell.row_index, min(cell.row_index + row_span, row_count)):
+            for c in range(cell.column_index, min(cell.column_index + column_span, column_count)):
+                if (r, c) != (cell.row_index, cell.column_index):
+                    mask[r * column_count + c] = 1
+    return bytes(mask)
+
+
+def to_slim(result: Any) -> SlimDocument:
+    """
+    Convert an analysis result (SDK AnalyzeResult, ocr_local result, or an
+    existing SlimDocument) into a SlimDocument.
+    """
+    if isinstance(result, SlimDocument):
+        return result
+
+    from ocr_utils import extract_key_value_pairs, extract_table_grids
+
+    strings = _StringTable()
+    page_numbers = array("I")
+    page_line_ends = array("I")
+    line_ids = array("I")
+
+    for index, page in enumerate(getattr(result, "pages", []) or []):
+        for line in getattr(page, "lines", []) or []:
+            line_ids.append(strings.add(line.content or ""))
+        page_numbers.append(getattr(page, "page_number", None) or index + 1)
+        page_line_ends.append(len(line_ids))
+
+    key_value_ids = array("I")
+    for key, value in extract_key_value_pairs(result).items():
+        key_value_ids.append(strings.add(key))
+        key_value_ids.append(strings.add(value if isinstance(value, str) else str(value)))
+
+    tables = []
+    source_tables = getattr(result, "tables", []) or []
+    for table, grid in zip(source_tables, extract_table_grids(result)):
+        row_count = len(grid)
+        column_count = len(grid[0]) if grid else 0
+        cells = array("I", [strings.add(value) for row in grid for value in row])
+        tables.append(SlimTable(row_count, column_count, cells, _covered_mask(table, row_count, column_count)))
+
+    return SlimDocument(
+        "".join(strings.parts), strings.ends, page_numbers, page_line_ends, line_ids, key_value_ids, tables,
+    )
+
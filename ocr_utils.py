@@ -1,11 +1,27 @@
+import asyncio
+import copy
 import os
-from typing import List, Dict, Any, Optional
+import re
+import threading
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 
 from dotenv import load_dotenv
-from azure.ai.documentintelligence import DocumentIntelligenceClient
-from azure.core.credentials import AzureKeyCredential
-from azure.ai.documentintelligence.models import AnalyzedDocument
-from semantic_kernel.functions import kernel_function
+
+import startup_profile
+from azure_outbound import close_on_owner_loop, get_endpoint
+from metrics import timed
+from ocr_cache import AnalysisCache, get_analysis_cache, make_cache_key
+from ocr_slim import SlimDocument, to_slim
+
+# The Azure SDK and aiohttp are imported where the clients are built, so that
+# importing this module (e.g. for the extract_* helpers) stays cheap.
+if TYPE_CHECKING:
+    import aiohttp
+    import numpy as np
+    from azure.ai.documentintelligence import DocumentIntelligenceClient
+    from azure.ai.documentintelligence.aio import (
+        DocumentIntelligenceClient as AsyncDocumentIntelligenceClient,
+    )
 
 # Load environment variables once
 load_dotenv()
@@ -15,12 +31,7 @@ load_dotenv()
 #  Client & Config
 # ---------------------------
 
-def get_document_intelligence_client() -> DocumentIntelligenceClient:
-    """
-    Create and return a DocumentIntelligenceClient using env variables:
-    - AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT
-    - AZURE_DOCUMENT_INTELLIGENCE_KEY
-    """
+def _get_document_intelligence_settings() -> Tuple[str, str]:
     endpoint = os.getenv("AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT")
     key = os.getenv("AZURE_DOCUMENT_INTELLIGENCE_KEY")
 
@@ -30,12 +41,100 @@ def get_document_intelligence_client() -> DocumentIntelligenceClient:
             "AZURE_DOCUMENT_INTELLIGENCE_KEY in environment."
         )
 
+    return endpoint, key
+
+
+def get_document_intelligence_client() -> "DocumentIntelligenceClient":
+    """
+    Create and return a DocumentIntelligenceClient using env variables:
+    - AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT
+    - AZURE_DOCUMENT_INTELLIGENCE_KEY
+    """
+    from azure.ai.documentintelligence import DocumentIntelligenceClient
+    from azure.core.credentials import AzureKeyCredential
+
+    endpoint, key = _get_document_intelligence_settings()
+
     return DocumentIntelligenceClient(
         endpoint=endpoint,
         credential=AzureKeyCredential(key),
     )
 
 
+# One async client per process, bound to the event loop that created it.
+_async_client: Optional["AsyncDocumentIntelligenceClient"] = None
+_async_session: Optional["aiohttp.ClientSession"] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_async_client_lock = threading.Lock()
+
+
+def get_async_document_intelligence_client() -> "AsyncDocumentIntelligenceClient":
+    """
+    Return the shared async DocumentIntelligenceClient for the running event loop.
+
+    All async analyses reuse one aiohttp connection pool, bounded by
+    AZURE_DOCUMENT_INTELLIGENCE_MAX_CONNECTIONS (default 32), so connections and
+    TLS sessions are kept alive between calls.
+    Must be called from inside a running event loop.
+    """
+    global _async_client, _async_session, _async_client_loop
+
+    loop = asyncio.get_running_loop()
+    with _async_client_lock:
+        if _async_client is not None and _async_client_loop is loop:
+            return _async_client
+
+        import aiohttp
+        from azure.ai.documentintelligence.aio import (
+            DocumentIntelligenceClient as AsyncDocumentIntelligenceClient,
+        )
+        from azure.core.credentials import AzureKeyCredential
+        from azure.core.pipeline.transport import AioHttpTransport
+
+        endpoint, key = _get_document_intelligence_settings()
+        max_connections = int(os.getenv("AZURE_DOCUMENT_INTELLIGENCE_MAX_CONNECTIONS", "32"))
+
+        # A client left over from another loop cannot be reused; close it so
+        # its aiohttp session and connector do not leak.
+        if _async_client is not None:
+            close_on_owner_loop(_async_client_loop, _closer(_async_client, _async_session))
+
+        with startup_profile.timed_init("ocr_utils.async_client"):
+            _async_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=max_connections, keepalive_timeout=60),
+            )
+            _async_client = AsyncDocumentIntelligenceClient(
+                endpoint=endpoint,
+                credential=AzureKeyCredential(key),
+                transport=AioHttpTransport(session=_async_session, session_owner=False),
+            )
+        _async_client_loop = loop
+        return _async_client
+
+
+def _closer(client: "AsyncDocumentIntelligenceClient", session: "aiohttp.ClientSession"):
+    async def close() -> None:
+        await client.close()
+        await session.close()
+    return close
+
+
+async def close_async_document_intelligence_client() -> None:
+    """
+    Close the shared async client and its connection pool (call on app shutdown).
+    """
+    global _async_client, _async_session, _async_client_loop
+
+    with _async_client_lock:
+        client, session = _async_client, _async_session
+        _async_client = _async_session = _async_client_loop = None
+
+    if client is not None:
+        await client.close()
+    if session is not None:
+        await session.close()
+
+
 # ---------------------------
 #  Core Analyze Function
 # ---------------------------
@@ -44,25 +143,446 @@ def analyze_document(
     file_path: str,
     model_id: str = "prebuilt-layout",
     content_type: str = "application/octet-stream",
+    cache: Optional[AnalysisCache] = None,
+    use_cache: bool = True,
+    features: Optional[List[str]] = None,
+    pages: Optional[str] = None,
+    slim: bool = True,
 ):
     """
-    Analyze a document with Azure Document Intelligence and return the result object.
+    Analyze a document with Azure Document Intelligence and return the result as a
+    SlimDocument (lines, key-value pairs and table grids; see ocr_slim).
+
+    Results are cached in that form by SHA-256 of the file bytes + model_id
+    (+ features, pages), so re-analyzing the same file returns the stored result
+    without calling Azure.
 
     :param file_path: Path to the local PDF/image.
     :param model_id: Model to use (e.g., 'prebuilt-layout', 'prebuilt-document').
     :param content_type: MIME type (default 'application/octet-stream' works for PDF).
+    :param cache: Cache to use instead of the shared one from get_analysis_cache().
+    :param use_cache: Set to False to always call Azure (the result is still stored).
+    :param features: Optional add-on features, e.g. ["keyValuePairs"] with 'prebuilt-layout'.
+    :param pages: Optional 1-based page selection, e.g. "1-3,5".
+    :param slim: Set to False to get the full SDK AnalyzeResult (spans, polygons, ...).
+        The cache cannot serve that form, so Azure is always called; the result
+        is still stored.
     """
+    data = _read_file(file_path)
+    return _analyze_bytes(data, model_id, content_type, cache, use_cache, features, pages, slim)
+
+
+async def analyze_document_async(
+    file_path: str,
+    model_id: str = "prebuilt-layout",
+    content_type: str = "application/octet-stream",
+    cache: Optional[AnalysisCache] = None,
+    use_cache: bool = True,
+    features: Optional[List[str]] = None,
+    pages: Optional[str] = None,
+    slim: bool = True,
+):
+    """
+    Async variant of analyze_document().
+
+    Uses the shared async client, so many analyses can run concurrently on one
+    event loop. File reads, hashing and disk-cache access run in worker threads.
+    """
+    data = await asyncio.to_thread(_read_file, file_path)
+    return await _analyze_bytes_async(
+        data, model_id, content_type, cache, use_cache, features, pages, slim
+    )
+
+
+def _analyze_bytes(
+    data: bytes,
+    model_id: str,
+    content_type: str,
+    cache: Optional[AnalysisCache],
+    use_cache: bool,
+    features: Optional[List[str]],
+    pages: Optional[str],
+    slim: bool = True,
+):
+    if cache is None:
+        cache = get_analysis_cache()
+    key = make_cache_key(data, model_id, features, pages) if cache is not None else None
+
+    if cache is not None and use_cache and slim:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    result = _run_analysis(data, model_id, content_type, features, pages)
+    return _store_result(cache, key, result, slim)
+
+
+async def _analyze_bytes_async(
+    data: bytes,
+    model_id: str,
+    content_type: str,
+    cache: Optional[AnalysisCache],
+    use_cache: bool,
+    features: Optional[List[str]],
+    pages: Optional[str],
+    slim: bool = True,
+):
+    if cache is None:
+        cache = get_analysis_cache()
+    key = None
+    if cache is not None:
+        key = await asyncio.to_thread(make_cache_key, data, model_id, features, pages)
+
+    if cache is not None and use_cache and slim:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return cached
+
+    result = await _run_analysis_async(data, model_id, content_type, features, pages)
+    return await asyncio.to_thread(_store_result, cache, key, result, slim)
+
+
+def _run_analysis(
+    data: bytes,
+    model_id: str,
+    content_type: str,
+    features: Optional[List[str]],
+    pages: Optional[str],
+):
     client = get_document_intelligence_client()
 
+    # Submit + poll as one unit under the shared outbound layer, which owns
+    # retries (retry_total=0 turns off the SDK's own retry policy).
+    def analyze():
+        with timed("ocr.submit"):
+            poller = client.begin_analyze_document(
+                model_id=model_id,
+                body=data,
+                content_type=content_type,
+                features=features,
+                pages=pages,
+                retry_total=0,
+            )
+        with timed("ocr.poll"):
+            return poller.result()
+
+    return get_endpoint("document_intelligence").call(analyze)
+
+
+async def _run_analysis_async(
+    data: bytes,
+    model_id: str,
+    content_type: str,
+    features: Optional[List[str]],
+    pages: Optional[str],
+):
+    client = get_async_document_intelligence_client()
+
+    async def analyze():
+        with timed("ocr.submit"):
+            poller = await client.begin_analyze_document(
+                model_id=model_id,
+                body=data,
+                content_type=content_type,
+                features=features,
+                pages=pages,
+                retry_total=0,
+            )
+        with timed("ocr.poll"):
+            return await poller.result()
+
+    return await get_endpoint("document_intelligence").call_async(analyze)
+
+
+def _store_result(cache: Optional[AnalysisCache], key: Optional[str], result: Any, slim: bool):
+    """Cache `result` (the cache converts it once) and return the form the caller asked for."""
+    if cache is not None:
+        stored = cache.put(key, result)
+        return stored if slim else result
+    return to_slim(result) if slim else result
+
+
+def _read_file(file_path: str) -> bytes:
     with open(file_path, "rb") as f:
-        poller = client.begin_analyze_document(
-            model_id=model_id,
-            body=f,
-            content_type=content_type,
+        return f.read()
+
+
+# ---------------------------
+#  Parallel Page-Range Analysis
+# ---------------------------
+
+DEFAULT_PAGES_PER_RANGE = 20
+DEFAULT_MAX_PARALLEL_RANGES = 4
+
+
+def count_pdf_pages(data: bytes) -> int:
+    """
+    Return the number of pages in a PDF given its bytes (1 for non-PDF input, e.g. images).
+    """
+    import io
+
+    import pdfplumber
+
+    if not data.lstrip()[:5] == b"%PDF-":
+        return 1
+
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        return len(pdf.pages)
+
+
+def split_page_ranges(page_count: int, pages_per_range: int) -> List[Tuple[int, int]]:
+    """
+    Split pages 1..page_count into inclusive (first, last) ranges of at most
+    pages_per_range pages each.
+    """
+    if pages_per_range < 1:
+        raise ValueError("pages_per_range must be >= 1")
+    return [
+        (first, min(first + pages_per_range - 1, page_count))
+        for first in range(1, page_count + 1, pages_per_range)
+    ]
+
+
+def analyze_document_parallel(
+    file_path: str,
+    model_id: str = "prebuilt-layout",
+    content_type: str = "application/octet-stream",
+    cache: Optional[AnalysisCache] = None,
+    use_cache: bool = True,
+    features: Optional[List[str]] = None,
+    pages_per_range: int = DEFAULT_PAGES_PER_RANGE,
+    max_concurrency: int = DEFAULT_MAX_PARALLEL_RANGES,
+    slim: bool = True,
+):
+    """
+    Analyze a (large) PDF as concurrent page ranges and merge the results.
+
+    The file is split with the service's `pages` option, at most `max_concurrency`
+    ranges run at once, and the full partial results are merged by
+    merge_analyze_results(). The merged result is cached under the same key as a
+    whole-document analyze_document() call and returned as a SlimDocument, or as
+    the merged AnalyzeResult with slim=False.
+    Documents that fit in one range are analyzed with a single call.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    data = _read_file(file_path)
+    ranges = split_page_ranges(count_pdf_pages(data), pages_per_range)
+
+    if len(ranges) <= 1:
+        return _analyze_bytes(data, model_id, content_type, cache, use_cache, features, None, slim)
+
+    if cache is None:
+        cache = get_analysis_cache()
+    key = make_cache_key(data, model_id, features) if cache is not None else None
+    if cache is not None and use_cache and slim:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    def run(page_range: Tuple[int, int]):
+        return _run_analysis(data, model_id, content_type, features, _format_range(page_range))
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        partials = list(pool.map(run, ranges))
+
+    merged = merge_analyze_results(partials, [first for first, _ in ranges])
+    return _store_result(cache, key, merged, slim)
+
+
+async def analyze_document_parallel_async(
+    file_path: str,
+    model_id: str = "prebuilt-layout",
+    content_type: str = "application/octet-stream",
+    cache: Optional[AnalysisCache] = None,
+    use_cache: bool = True,
+    features: Optional[List[str]] = None,
+    pages_per_range: int = DEFAULT_PAGES_PER_RANGE,
+    max_concurrency: int = DEFAULT_MAX_PARALLEL_RANGES,
+    slim: bool = True,
+):
+    """
+    Async variant of analyze_document_parallel().
+    """
+    data = await asyncio.to_thread(_read_file, file_path)
+    page_count = await asyncio.to_thread(count_pdf_pages, data)
+    ranges = split_page_ranges(page_count, pages_per_range)
+
+    if len(ranges) <= 1:
+        return await _analyze_bytes_async(
+            data, model_id, content_type, cache, use_cache, features, None, slim
         )
-        result = poller.result()
 
-    return result
+    if cache is None:
+        cache = get_analysis_cache()
+    key = None
+    if cache is not None:
+        key = await asyncio.to_thread(make_cache_key, data, model_id, features)
+    if cache is not None and use_cache and slim:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return cached
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(page_range: Tuple[int, int]):
+        async with semaphore:
+            return await _run_analysis_async(
+                data, model_id, content_type, features, _format_range(page_range)
+            )
+
+    partials = await asyncio.gather(*(run(r) for r in ranges))
+    merged = await asyncio.to_thread(
+        merge_analyze_results, partials, [first for first, _ in ranges]
+    )
+    return await asyncio.to_thread(_store_result, cache, key, merged, slim)
+
+
+def _format_range(page_range: Tuple[int, int]) -> str:
+    first, last = page_range
+    return str(first) if first == last else f"{first}-{last}"
+
+
+_MERGED_LIST_FIELDS = (
+    "pages", "paragraphs", "tables", "figures", "sections",
+    "keyValuePairs", "styles", "languages", "documents",
+)
+
+
+def merge_analyze_results(
+    partials: List[Any],
+    first_pages: Optional[List[int]] = None,
+    join_tables: bool = True,
+):
+    """
+    Merge analysis results of consecutive page ranges into one AnalyzeResult.
+
+    - `content` is concatenated (newline separated) and every span offset is shifted
+    - page numbers (pages and bounding regions) are made absolute: if a partial
+      numbers its pages from 1, they are shifted to start at its entry in first_pages
+    - list fields (pages, tables, key-value pairs, ...) are concatenated in range order,
+      and "/tables/N"-style element pointers are re-indexed accordingly
+    - with `join_tables`, a table that runs to the last page of one range and
+      continues (same column count) at the top of the next range's first page
+      is joined into one table, as a single analysis would have split it no
+      further than by page
+    """
+    from azure.ai.documentintelligence.models import AnalyzeResult
+
+    merged: Dict[str, Any] = {}
+    contents: List[str] = []
+    offset = 0
+    last_page = None
+
+    for idx, partial in enumerate(partials):
+        part = partial.as_dict() if hasattr(partial, "as_dict") else copy.deepcopy(partial)
+
+        page_shift = 0
+        page_numbers = [p.get("pageNumber", 0) for p in part.get("pages") or []]
+        if first_pages is not None and page_numbers:
+            page_shift = max(0, first_pages[idx] - min(page_numbers))
+
+        continued = (
+            join_tables
+            and last_page is not None
+            and bool(page_numbers)
+            and _continues_table(merged.get("tables"), part.get("tables"), last_page,
+                                 min(page_numbers) + page_shift, page_shift)
+        )
+
+        index_shifts = {
+            name: len(merged.get(name, [])) for name in _MERGED_LIST_FIELDS
+        }
+        if continued:
+            # Pointers to the continuation now point at the table it joins.
+            index_shifts["tables"] -= 1
+        _shift_partial(part, offset, page_shift, index_shifts)
+
+        if continued:
+            _append_table_rows(merged["tables"][-1], part["tables"].pop(0))
+
+        if not merged:
+            merged = {k: v for k, v in part.items() if k not in _MERGED_LIST_FIELDS}
+        for name in _MERGED_LIST_FIELDS:
+            if part.get(name):
+                merged.setdefault(name, []).extend(part[name])
+
+        if page_numbers:
+            last_page = max(page_numbers) + page_shift
+        content = part.get("content") or ""
+        contents.append(content)
+        offset += len(content) + 1
+
+    merged["content"] = "\n".join(contents)
+    return AnalyzeResult(merged)
+
+
+def _table_pages(table: Dict[str, Any], page_shift: int = 0) -> List[int]:
+    return [region.get("pageNumber", 0) + page_shift for region in table.get("boundingRegions") or []]
+
+
+def _continues_table(
+    previous_tables: Optional[List[Dict[str, Any]]],
+    tables: Optional[List[Dict[str, Any]]],
+    last_page: int,
+    first_page: int,
+    page_shift: int,
+) -> bool:
+    """True if tables[0] continues previous_tables[-1] across a range boundary."""
+    if not previous_tables or not tables or first_page != last_page + 1:
+        return False
+    previous, following = previous_tables[-1], tables[0]
+    previous_pages, following_pages = _table_pages(previous), _table_pages(following, page_shift)
+    return (
+        bool(previous_pages) and bool(following_pages)
+        and max(previous_pages) == last_page
+        and min(following_pages) == first_page
+        and previous.get("columnCount") == following.get("columnCount")
+    )
+
+
+def _append_table_rows(table: Dict[str, Any], continuation: Dict[str, Any]) -> None:
+    row_shift = table.get("rowCount", 0)
+    for cell in continuation.get("cells") or []:
+        cell["rowIndex"] = cell.get("rowIndex", 0) + row_shift
+    table.setdefault("cells", []).extend(continuation.get("cells") or [])
+    table["rowCount"] = row_shift + continuation.get("rowCount", 0)
+    for name in ("boundingRegions", "spans"):
+        if continuation.get(name):
+            table.setdefault(name, []).extend(continuation[name])
+
+
+def _shift_partial(node: Any, offset_shift: int, page_shift: int, index_shifts: Dict[str, int]) -> None:
+    """Shift span offsets, page numbers and element pointers of a partial result in place."""
+    if isinstance(node, list):
+        for item in node:
+            _shift_partial(item, offset_shift, page_shift, index_shifts)
+        return
+    if not isinstance(node, dict):
+        return
+
+    for key, value in node.items():
+        if key == "pageNumber" and isinstance(value, int):
+            node[key] = value + page_shift
+        elif key == "span" and isinstance(value, dict):
+            value["offset"] = value.get("offset", 0) + offset_shift
+        elif key == "spans" and isinstance(value, list):
+            for span in value:
+                span["offset"] = span.get("offset", 0) + offset_shift
+        elif key == "elements" and isinstance(value, list):
+            node[key] = [_shift_pointer(ptr, index_shifts) for ptr in value]
+        elif key != "content":
+            _shift_partial(value, offset_shift, page_shift, index_shifts)
+
+
+def _shift_pointer(pointer: Any, index_shifts: Dict[str, int]) -> Any:
+    # Pointers look like "/paragraphs/12" or "/tables/3".
+    if not isinstance(pointer, str) or pointer.count("/") != 2:
+        return pointer
+    _, name, index = pointer.split("/")
+    if name not in index_shifts or not index.isdigit():
+        return pointer
+    return f"/{name}/{int(index) + index_shifts[name]}"
 
 
 # ---------------------------
@@ -73,6 +593,9 @@ def extract_lines(result) -> List[str]:
     """
     Extract all text lines from the analysis result.
     """
+    if isinstance(result, SlimDocument):
+        return result.lines()
+
     lines: List[str] = []
     for page in getattr(result, "pages", []) or []:
         for line in getattr(page, "lines", []) or []:
@@ -103,6 +626,8 @@ def _extract_direct_key_value_pairs(result) -> Dict[str, str]:
 
 def _extract_document_fields(result) -> Dict[str, str]:
     """Extract key-value pairs from document fields."""
+    from azure.ai.documentintelligence.models import AnalyzedDocument
+
     kv_dict: Dict[str, str] = {}
     
     for doc in getattr(result, "documents", []) or []:
@@ -119,41 +644,155 @@ def extract_key_value_pairs(result) -> Dict[str, str]:
     """
     Extract key-value pairs as a dict from the result (mainly useful with 'prebuilt-document').
     """
+    if isinstance(result, SlimDocument):
+        return result.key_values()
+
     if hasattr(result, "key_value_pairs") and result.key_value_pairs:
         return _extract_direct_key_value_pairs(result)
     
     return _extract_document_fields(result)
 
 
+def _table_grid(table, fill_spans: bool) -> List[List[str]]:
+    """
+    Dense row_count x column_count grid of one table, built in a single pass
+    over its cells. A merged cell's content is copied into every position it
+    covers (or only its top-left position when fill_spans is False).
+    """
+    row_count = getattr(table, "row_count", 0) or 0
+    column_count = getattr(table, "column_count", 0) or 0
+    grid = [[""] * column_count for _ in range(row_count)]
+
+    for cell in table.cells:
+        row_index = cell.row_index
+        column_index = cell.column_index
+        content = cell.content or ""
+        row_span = (getattr(cell, "row_span", None) or 1) if fill_spans else 1
+        column_span = (getattr(cell, "column_span", None) or 1) if fill_spans else 1
+
+        if row_index + row_span > row_count or column_index + column_span > column_count:
+            # Cell outside the declared shape: grow the grid rather than drop it.
+            column_count = max(column_count, column_index + column_span)
+            for row in grid:
+                row.extend([""] * (column_count - len(row)))
+            while row_count < row_index + row_span:
+                grid.append([""] * column_count)
+                row_count += 1
+
+        if row_span == 1 and column_span == 1:
+            grid[row_index][column_index] = content
+            continue
+        for row in grid[row_index:row_index + row_span]:
+            row[column_index:column_index + column_span] = [content] * column_span
+
+    return grid
+
+
+def extract_table_grids(result, fill_spans: bool = True) -> List[List[List[str]]]:
+    """
+    Extract tables as dense grids: every row has column_count entries, missing
+    cells are "", and merged (row/column-spanning) cells are filled in.
+
+    Returns:
+        List[table] where table = List[row], row = List[cell_content]
+    """
+    with timed("ocr.extract_tables"):
+        if isinstance(result, SlimDocument):
+            return result.table_grids(fill_spans)
+        return [_table_grid(table, fill_spans) for table in getattr(result, "tables", []) or []]
+
+
 def extract_tables(result) -> List[List[List[str]]]:
     """
     Extract tables as a list of tables, where each table is a list of rows, and each row is a list of cell contents.
 
+    Rows are full width and merged cells are repeated across the positions
+    they span, so columns line up (see extract_table_grids).
+
     Returns:
         List[table] where table = List[row], row = List[cell_content]
     """
-    all_tables: List[List[List[str]]] = []
+    return extract_table_grids(result)
+
+
+def _column_names(header: List[str]) -> List[str]:
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for i, name in enumerate(header):
+        name = name.strip() or f"column_{i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}_{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
 
-    for table in getattr(result, "tables", []) or []:
-        # Build a dict of (row_index -> {col_index: content})
-        grid: Dict[int, Dict[int, str]] = {}
-        for cell in table.cells:
-            row_idx = cell.row_index
-            col_idx = cell.column_index
-            grid.setdefault(row_idx, {})
-            grid[row_idx][col_idx] = cell.content
 
-        # Convert grid to ordered list of rows
-        rows: List[List[str]] = []
-        for row_idx in sorted(grid.keys()):
-            row_dict = grid[row_idx]
-            # sort columns by index
-            row_cells = [row_dict[col_idx] for col_idx in sorted(row_dict.keys())]
-            rows.append(row_cells)
+# A cell that is only a number or an amount: optional sign or parentheses,
+# currency, digits with separators, trailing minus or DR/CR.
+_NUMBER_CELL = re.compile(r"[-+(]?\s*(?:[$€£¥₹]|[A-Z]{3})?\s*[-+]?\d[\d,.' ]*\)?\s*(?:-|DR|CR|Dr|Cr)?")
 
-        all_tables.append(rows)
 
-    return all_tables
+def _typed_column(values: Tuple[str, ...], dayfirst: bool) -> "np.ndarray":
+    """
+    Date column -> datetime64[D], number column -> float64, otherwise the
+    text (dtype object). A column is typed only when every non-blank cell
+    parses; blank cells become NaT / NaN. Parsing uses the ledger's rules.
+    """
+    import numpy as np
+    from ledger import parse_amounts, parse_dates
+
+    text = np.array(values, dtype=object)
+    filled = np.array([bool(value.strip()) for value in values], dtype=bool)
+    if not filled.any():
+        return text
+
+    dates = parse_dates(text, dayfirst)
+    if not np.isnat(dates[filled]).any():
+        return dates
+
+    if all(_NUMBER_CELL.fullmatch(value.strip()) for value in text[filled]):
+        cents, known = parse_amounts(text)
+        if known[filled].all():
+            numbers = cents / 100.0
+            numbers[~filled] = np.nan
+            return numbers
+    return text
+
+
+def extract_table_columns(
+    result,
+    header_rows: int = 1,
+    typed: bool = True,
+    dayfirst: bool = True,
+) -> List[Dict[str, "np.ndarray"]]:
+    """
+    Extract tables in columnar form: one {column name: NumPy array} dict per table.
+
+    The first `header_rows` rows name the columns (joined with " " when more
+    than one; use 0 for column_0, column_1, ...). With `typed`, date columns
+    are datetime64[D] and number/amount columns float64 (see _typed_column;
+    `dayfirst` settles dates like 03/04/2024), ready for pandas.DataFrame(columns)
+    or NumPy; other columns, and every column with typed=False, hold the cell
+    text (dtype object).
+    """
+    import numpy as np
+
+    tables: List[Dict[str, "np.ndarray"]] = []
+    for grid in extract_table_grids(result):
+        column_count = len(grid[0]) if grid else 0
+        header = [
+            " ".join(row[j] for row in grid[:header_rows] if row[j]).strip()
+            for j in range(column_count)
+        ]
+        body = grid[header_rows:]
+        columns = list(zip(*body)) if body else [()] * column_count
+        tables.append({
+            name: _typed_column(column, dayfirst) if typed else np.array(column, dtype=object)
+            for name, column in zip(_column_names(header), columns)
+        })
+    return tables
 
 
 # ---------------------------
@@ -0,0 +1,274 @@
+# pipeline.py
+
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from chunks.chunk_utils import chunk_text
+from chunks.embedding_utils import generate_embeddings
+from ocr_slim import to_slim
+from ocr_utils import analyze_document_async, extract_plain_text
+
+# Marks the end of the input on a stage queue.
+_DONE = object()
+
+
+# ---------------------------
+#  Items & Counters
+# ---------------------------
+
+class PipelineItem:
+    """
+    One document moving through the pipeline. Intermediate payloads are dropped
+    once the next stage has consumed them.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.result: Any = None
+        self.text: Optional[str] = None
+        self.chunks: Optional[List[str]] = None
+        self.embeddings: Optional[List[List[float]]] = None
+        self.error: Optional[str] = None
+        self.failed_stage: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+
+
+class StageStats:
+    """
+    Throughput counters for one stage.
+    """
+
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.first_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        wall = 0.0
+        if self.first_start is not None and self.last_end is not None:
+            wall = self.last_end - self.first_start
+        return {
+            "concurrency": self.concurrency,
+            "completed": self.completed,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "wall_seconds": round(wall, 3),
+            "items_per_second": round(self.completed / wall, 3) if wall else 0.0,
+            # Share of the stage's worker slots that were busy: close to 1.0 means saturated.
+            "utilization": round(self.busy_seconds / (wall * self.concurrency), 3) if wall else 0.0,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+# ---------------------------
+#  Process-pool stage functions
+# ---------------------------
+
+def _chunk_stage(text: str) -> List[str]:
+    return chunk_text(text)
+
+
+# ---------------------------
+#  Pipeline
+# ---------------------------
+
+class IngestPipeline:
+    """
+    Drives documents through OCR -> extract -> chunk -> embed.
+
+    - OCR and embedding are Azure calls and run as asyncio tasks
+    - extraction only joins the lines of the already-parsed result, so it runs
+      in a thread: pickling the result to another process would cost more
+    - chunking is CPU-bound and runs in a process pool
+    - every stage has its own concurrency limit and a bounded inbound queue, so a
+      slow stage blocks the stages feeding it instead of buffering without limit
+    """
+
+    STAGES = ("ocr", "extract", "chunk", "embed")
+
+    def __init__(
+        self,
+        ocr_concurrency: int = 8,
+        extract_concurrency: Optional[int] = None,
+        chunk_concurrency: Optional[int] = None,
+        embed_concurrency: int = 4,
+        queue_size: int = 32,
+        model_id: str = "prebuilt-layout",
+    ):
+        cpu_count = os.cpu_count() or 1
+        self.concurrency = {
+            "ocr": ocr_concurrency,
+            "extract": extract_concurrency or cpu_count,
+            "chunk": chunk_concurrency or cpu_count,
+            "embed": embed_concurrency,
+        }
+        self.queue_size = queue_size
+        self.model_id = model_id
+        self.stats: Dict[str, StageStats] = {
+            name: StageStats(name, self.concurrency[name]) for name in self.STAGES
+        }
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    # ---- stage bodies ----
+
+    async def _ocr(self, item: PipelineItem) -> None:
+        result = await analyze_document_async(item.file_path, model_id=self.model_id)
+        # Queued items hold the compact form.
+        item.result = await asyncio.to_thread(to_slim, result)
+
+    async def _extract(self, item: PipelineItem) -> None:
+        item.text = await asyncio.to_thread(extract_plain_text, item.result)
+        item.result = None
+
+    async def _chunk(self, item: PipelineItem) -> None:
+        loop = asyncio.get_running_loop()
+        item.chunks = await loop.run_in_executor(self._pool, _chunk_stage, item.text)
+        item.text = None
+
+    async def _embed(self, item: PipelineItem) -> None:
+        item.embeddings = await generate_embeddings(item.chunks or [])
+
+    # ---- plumbing ----
+
+    async def _worker(
+        self,
+        name: str,
+        body: Callable[[PipelineItem], Awaitable[None]],
+        inbox: asyncio.Queue,
+        outbox: asyncio.Queue,
+    ) -> None:
+        stats = self.stats[name]
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            if item.error is not None:
+                # Failed items skip the remaining stages but still reach the output.
+                await outbox.put(item)
+                continue
+
+            start = time.perf_counter()
+            if stats.first_start is None:
+                stats.first_start = start
+            try:
+                await body(item)
+            except Exception as e:
+                item.error = str(e)
+                item.failed_stage = name
+                stats.failed += 1
+            else:
+                stats.completed += 1
+            end = time.perf_counter()
+            stats.busy_seconds += end - start
+            stats.last_end = end
+            item.timings[name] = end - start
+
+            stats.max_queue_depth = max(stats.max_queue_depth, inbox.qsize())
+            await outbox.put(item)
+
+    async def _run_stage(self, name, body, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        workers = [
+            asyncio.create_task(self._worker(name, body, inbox, outbox))
+            for _ in range(self.concurrency[name])
+        ]
+        await asyncio.gather(*workers)
+
+        # Signal end of input to every worker of the next stage (or to the collector).
+        index = self.STAGES.index(name)
+        downstream = 1 if index == len(self.STAGES) - 1 else self.concurrency[self.STAGES[index + 1]]
+        for _ in range(downstream):
+            await outbox.put(_DONE)
+
+    async def run(
+        self,
+        file_paths: Iterable[str],
+        on_item: Optional[Callable[[PipelineItem], None]] = None,
+    ) -> List[PipelineItem]:
+        """
+        Process every file and return the finished items (in completion order).
+        `on_item` is called as each item leaves the pipeline.
+        """
+        bodies = {
+            "ocr": self._ocr,
+            "extract": self._extract,
+            "chunk": self._chunk,
+            "embed": self._embed,
+        }
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.STAGES]
+        output: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        outboxes = queues[1:] + [output]
+
+        pool = ProcessPoolExecutor(max_workers=self.concurrency["chunk"])
+        self._pool = pool
+        stages = [
+            asyncio.create_task(
+                self._run_stage(name, bodies[name], queues[i], outboxes[i])
+            )
+            for i, name in enumerate(self.STAGES)
+        ]
+
+        async def feed() -> None:
+            for path in file_paths:
+                await queues[0].put(PipelineItem(path))
+            for _ in range(self.concurrency["ocr"]):
+                await queues[0].put(_DONE)
+
+        feeder = asyncio.create_task(feed())
+        tasks = [feeder, *stages]
+
+        finished: List[PipelineItem] = []
+        try:
+            while True:
+                item = await output.get()
+                if item is _DONE:
+                    break
+                finished.append(item)
+                if on_item is not None:
+                    on_item(item)
+            await asyncio.gather(*tasks)
+        finally:
+            # on_item raised or run() was cancelled: stop every stage and the
+            # feeder instead of leaving them blocked on full queues.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+        return finished
+
+    def stats_report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-stage counters: completed/failed, items per second, utilization and
+        peak queue depth. The stage with utilization near 1.0 and a full inbound
+        queue is the bottleneck.
+        """
+        return {name: stats.to_dict() for name, stats in self.stats.items()}
+
+
+async def main(file_paths: List[str]) -> None:
+    pipeline = IngestPipeline()
+    items = await pipeline.run(file_paths)
+
+    for item in items:
+        if item.error:
+            print(f"{item.file_path}: failed in {item.failed_stage}: {item.error}")
+        else:
+            print(f"{item.file_path}: {len(item.chunks or [])} chunks embedded")
+
+    print("\n===== STAGE STATS =====\n")
+    for name, stats in pipeline.stats_report().items():
+        print(f"{name}: {stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
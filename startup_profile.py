@@ -0,0 +1,178 @@
+# startup_profile.py
+
+import importlib.machinery
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# Keep this module free of third-party imports: it is loaded before everything else.
+
+_start = time.perf_counter()
+_ready_at: Optional[float] = None
+_lock = threading.Lock()
+
+_phases: List[Dict[str, Any]] = []
+_inits: Dict[str, float] = {}
+_modules: Dict[str, Dict[str, float]] = {}
+
+_TIMED_LOADERS = (
+    importlib.machinery.SourceFileLoader,
+    importlib.machinery.SourcelessFileLoader,
+    importlib.machinery.ExtensionFileLoader,
+)
+
+
+# ---------------------------
+#  Import timing
+# ---------------------------
+
+class _ImportTimer:
+    """
+    Meta path finder that times each module's execution (like `python -X importtime`).
+
+    It never resolves modules itself: it asks the finders after it, then wraps
+    exec_module on the returned (per-module) loader instance, so loader types and
+    isinstance checks are unchanged.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _stack(self) -> List[List[Any]]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def find_spec(self, name, path=None, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+
+        loader = spec.loader
+        if isinstance(loader, _TIMED_LOADERS) and "exec_module" not in vars(loader):
+            loader.exec_module = self._timed(name, loader.exec_module)
+        return spec
+
+    def _timed(self, name: str, exec_module):
+        def exec_module_timed(module):
+            stack = self._stack()
+            frame = [name, 0.0]  # [module, time spent importing children]
+            stack.append(frame)
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                inclusive = time.perf_counter() - start
+                stack.pop()
+                if stack:
+                    stack[-1][1] += inclusive
+                with _lock:
+                    _modules[name] = {"self": inclusive - frame[1], "inclusive": inclusive}
+
+        return exec_module_timed
+
+
+_timer: Optional[_ImportTimer] = None
+
+
+def install() -> None:
+    """
+    Start timing imports (when STARTUP_PROFILE is enabled). Call before other imports.
+    """
+    global _timer
+
+    if _timer is not None or os.getenv("STARTUP_PROFILE", "0").lower() not in ("1", "true", "yes"):
+        return
+    _timer = _ImportTimer()
+    sys.meta_path.insert(0, _timer)
+
+
+def uninstall() -> None:
+    global _timer
+
+    if _timer is not None and _timer in sys.meta_path:
+        sys.meta_path.remove(_timer)
+    _timer = None
+
+
+# ---------------------------
+#  Phases & lazy initialization
+# ---------------------------
+
+@contextmanager
+def phase(name: str):
+    """
+    Time a named startup step (e.g. importing the route modules).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _phases.append({"name": name, "seconds": round(time.perf_counter() - start, 4)})
+
+
+@contextmanager
+def timed_init(name: str):
+    """
+    Time the first-use construction of a lazy client.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _inits[name] = round(_inits.get(name, 0.0) + time.perf_counter() - start, 4)
+
+
+def mark_ready() -> None:
+    global _ready_at
+
+    if _ready_at is None:
+        _ready_at = time.perf_counter()
+
+
+def startup_report(top: int = 25) -> Dict[str, Any]:
+    """
+    Startup breakdown: named phases, lazy client initializations, and (when import
+    timing is installed) the slowest modules and top-level packages by self time.
+    """
+    with _lock:
+        modules = dict(_modules)
+        report: Dict[str, Any] = {
+            "seconds_to_ready": round(_ready_at - _start, 4) if _ready_at else None,
+            "phases": list(_phases),
+            "inits": dict(_inits),
+        }
+
+    packages: Dict[str, float] = {}
+    for name, times in modules.items():
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0.0) + times["self"]
+
+    slowest = sorted(modules.items(), key=lambda item: item[1]["self"], reverse=True)[:top]
+    report["import_timing"] = _timer is not None or bool(modules)
+    report["modules"] = [
+        {"module": name, "self_ms": round(t["self"] * 1000, 2), "inclusive_ms": round(t["inclusive"] * 1000, 2)}
+        for name, t in slowest
+    ]
+    report["packages"] = {
+        name: round(seconds * 1000, 2)
+        for name, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    }
+    return report
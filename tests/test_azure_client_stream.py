@@ -0,0 +1,73 @@
+# test_azure_client_stream.py
+
+import asyncio
+import json
+from contextlib import aclosing
+from types import SimpleNamespace
+
+from travelPlanner import azure_client
+
+
+class FakeStream:
+    def __init__(self, text: str):
+        self.events = [SimpleNamespace(type="response.output_text.delta", delta=text[i:i + 8])
+                       for i in range(0, len(text), 8)]
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for event in self.events:
+            await asyncio.sleep(0)
+            yield event
+
+    async def close(self):
+        self.closed = True
+
+
+def _fake_clients(monkeypatch, stream: FakeStream):
+    async def get_agent(agent_name, **kwargs):
+        return SimpleNamespace(name=agent_name)
+
+    async def create(**kwargs):
+        return stream
+
+    clients = SimpleNamespace(
+        semaphore=asyncio.Semaphore(1),
+        project_client=SimpleNamespace(agents=SimpleNamespace(get=get_agent)),
+        openai_client=SimpleNamespace(responses=SimpleNamespace(create=create)),
+    )
+    monkeypatch.setattr(azure_client, "AZURE_AI_PROJECT_ENDPOINT", "https://example.invalid/api/projects/p")
+    monkeypatch.setattr(azure_client, "_get_async_clients", lambda: clients)
+    return clients
+
+
+def test_stream_is_closed_and_semaphore_free_while_yielding(monkeypatch):
+    stream = FakeStream(json.dumps({"responseText": "Try the place by the river, it is great.", "matches": []}))
+
+    async def scenario():
+        clients = _fake_clients(monkeypatch, stream)
+        kinds = []
+        async with aclosing(azure_client.stream_chat_agent_async([], "Where?")) as events:
+            async for kind, _ in events:
+                assert not clients.semaphore.locked()
+                kinds.append(kind)
+        return kinds
+
+    kinds = asyncio.run(scenario())
+    assert kinds[-1] == "result" and "delta" in kinds
+    assert stream.closed
+
+
+def test_stream_is_closed_when_the_consumer_stops_early(monkeypatch):
+    stream = FakeStream(json.dumps({"responseText": "A long answer " * 20, "matches": []}))
+
+    async def scenario():
+        _fake_clients(monkeypatch, stream)
+        async with aclosing(azure_client.stream_chat_agent_async([], "Where?")) as events:
+            async for _ in events:
+                break
+
+    asyncio.run(scenario())
+    assert stream.closed
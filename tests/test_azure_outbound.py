@@ -0,0 +1,80 @@
+# test_azure_outbound.py
+
+import asyncio
+
+import pytest
+
+from azure_outbound import CircuitBreaker, CircuitOpenError, OutboundEndpoint
+
+
+class FakeHttpError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _endpoint(**kwargs) -> OutboundEndpoint:
+    options = dict(rate=0, max_attempts=1, base_delay=0, failure_threshold=2, reset_timeout=0)
+    options.update(kwargs)
+    return OutboundEndpoint("test", **options)
+
+
+def _fail(status_code: int):
+    def fn():
+        raise FakeHttpError(status_code)
+    return fn
+
+
+def _open_circuit(endpoint: OutboundEndpoint) -> None:
+    for _ in range(endpoint.breaker.failure_threshold):
+        with pytest.raises(FakeHttpError):
+            endpoint.call(_fail(503))
+    assert endpoint.breaker.state == CircuitBreaker.OPEN
+
+
+def test_fatal_error_on_half_open_probe_releases_the_probe():
+    endpoint = _endpoint()
+    _open_circuit(endpoint)
+
+    with pytest.raises(FakeHttpError):
+        endpoint.call(_fail(400))  # the half-open probe
+    assert endpoint.call(lambda: "ok") == "ok"
+    assert endpoint.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_half_open_probe_releases_the_probe():
+    endpoint = _endpoint()
+    _open_circuit(endpoint)
+
+    async def hang():
+        await asyncio.sleep(3600)
+
+    async def ok():
+        return "ok"
+
+    async def scenario():
+        probe = asyncio.create_task(endpoint.call_async(hang))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        return await endpoint.call_async(ok)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert endpoint.concurrency.in_flight == 0
+
+
+def test_throttling_does_not_open_the_circuit():
+    endpoint = _endpoint(failure_threshold=2, reset_timeout=30)
+    for _ in range(5):
+        with pytest.raises(FakeHttpError):
+            endpoint.call(_fail(429))
+    assert endpoint.breaker.state == CircuitBreaker.CLOSED
+    assert endpoint.call(lambda: "ok") == "ok"
+
+
+def test_transient_errors_open_the_circuit():
+    endpoint = _endpoint(reset_timeout=30)
+    _open_circuit(endpoint)
+    with pytest.raises(CircuitOpenError):
+        endpoint.call(lambda: "ok")
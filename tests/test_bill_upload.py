@@ -0,0 +1,105 @@
+# test_bill_upload.py
+
+import asyncio
+import hashlib
+import os
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+import bill_jobs
+from bill_jobs import BillJob, BillJobStore, UploadError, UploadTooLarge, save_upload
+
+
+def _client(storage_dir: str, max_bytes: int = bill_jobs.MAX_UPLOAD_BYTES) -> TestClient:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        try:
+            filename, content_type, path, sha256, size = await save_upload(
+                request, storage_dir=storage_dir, max_bytes=max_bytes,
+            )
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except UploadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"filename": filename, "content_type": content_type, "path": path, "sha256": sha256, "size": size}
+
+    return TestClient(app)
+
+
+def test_upload_is_stored_under_its_hash(tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    response = _client(str(tmp_path)).post(
+        "/upload",
+        data={"note": "before the file"},
+        files={"file": ("Bill.PDF", data, "application/pdf")},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["sha256"] == hashlib.sha256(data).hexdigest()
+    assert body["size"] == len(data)
+    assert body["filename"] == "Bill.PDF"
+    assert body["content_type"] == "application/pdf"
+    assert body["path"] == os.path.join(str(tmp_path), body["sha256"] + ".pdf")
+    with open(body["path"], "rb") as f:
+        assert f.read() == data
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+
+
+def test_upload_without_file_field_is_rejected(tmp_path):
+    client = _client(str(tmp_path))
+    assert client.post("/upload", files={"other": ("x.png", b"123", "image/png")}).status_code == 400
+    assert client.post("/upload", content=b"raw", headers={"content-type": "application/pdf"}).status_code == 400
+    assert os.listdir(tmp_path) == []
+
+
+def test_upload_over_the_limit_is_rejected(tmp_path):
+    client = _client(str(tmp_path), max_bytes=1000)
+    assert client.post("/upload", files={"file": ("a.pdf", b"x" * 1000, "application/pdf")}).status_code == 200
+    assert client.post("/upload", files={"file": ("b.pdf", b"x" * 1001, "application/pdf")}).status_code == 413
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_upload_is_written_in_fixed_size_blocks(tmp_path, monkeypatch):
+    writes = []
+    to_thread = asyncio.to_thread
+
+    async def spy(fn, *args, **kwargs):
+        if getattr(fn, "__name__", "") == "write":
+            writes.append(len(args[0]))
+        return await to_thread(fn, *args, **kwargs)
+
+    monkeypatch.setattr(bill_jobs, "UPLOAD_WRITE_CHUNK", 4096)
+    monkeypatch.setattr(asyncio, "to_thread", spy)
+    data = os.urandom(10 * 4096 + 123)
+    response = _client(str(tmp_path)).post("/upload", files={"file": ("a.pdf", data, "application/pdf")})
+
+    assert response.status_code == 200
+    assert writes == [4096] * 10 + [123]
+
+
+def _finished_job(path: str) -> BillJob:
+    job = BillJob(os.path.basename(path), "application/pdf", path, "0" * 64, 1)
+    job.status = bill_jobs.STATUS_SUCCEEDED
+    return job
+
+
+def test_pruned_jobs_delete_their_upload_unless_still_shared(tmp_path):
+    shared, single = str(tmp_path / "shared.pdf"), str(tmp_path / "single.pdf")
+    for path in (shared, single):
+        open(path, "wb").close()
+    store = BillJobStore(max_jobs=2)
+    jobs = [_finished_job(single), _finished_job(shared), _finished_job(shared)]
+    for job in jobs:
+        store._jobs[job.id] = job
+
+    store._prune()
+    assert not os.path.exists(single)
+    assert os.path.exists(shared)
+
+    store.max_jobs = 0
+    store._prune()
+    assert not os.path.exists(shared)
+    assert store.get(jobs[2].id) is None
@@ -0,0 +1,46 @@
+# test_chunk_utils.py
+
+from chunks.chunk_utils import chunk_text, iter_chunk_spans, iter_chunks, iter_chunks_from_lines
+
+
+def _words(n: int) -> str:
+    return " ".join(f"w{i}" for i in range(n))
+
+
+def test_empty_and_blank_text_give_no_chunks():
+    assert chunk_text("") == []
+    assert chunk_text("  \n\t ") == []
+    assert list(iter_chunk_spans(b"")) == []
+    assert list(iter_chunks_from_lines([])) == []
+
+
+def test_consecutive_chunks_share_exactly_overlap_words():
+    chunks = [chunk.split() for chunk in chunk_text(_words(30), chunk_size=10, overlap=3)]
+    assert all(len(chunk) <= 10 for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous[-3:] == current[:3]
+    assert chunks[0][0] == "w0" and chunks[-1][-1] == "w29"
+
+
+def test_long_unbroken_token_terminates_as_its_own_chunk():
+    token = "x" * 10_000
+    spans = list(iter_chunk_spans(f"a {token} b", chunk_size=100, overlap=50, count_tokens=len))
+    assert spans == [(0, 1), (2, 10_002), (10_003, 10_004)]
+
+
+def test_overlap_not_smaller_than_chunk_size_still_advances():
+    spans = list(iter_chunk_spans(_words(20), chunk_size=5, overlap=5))
+    starts = [start for start, _ in spans]
+    assert starts == sorted(set(starts))
+    assert spans[-1][1] == len(_words(20))
+
+
+def test_bytes_and_lines_match_str_offsets():
+    text = _words(50)
+    lines = [" ".join(f"w{i}" for i in range(j, min(j + 7, 50))) for j in range(0, 50, 7)]
+    assert "\n".join(lines).replace("\n", " ") == text
+
+    expected = list(iter_chunk_spans(text, 12, 4))
+    assert list(iter_chunk_spans(text.encode(), 12, 4)) == expected
+    assert [bytes(c).decode() for c in iter_chunks(text.encode(), 12, 4)] == [text[s:e] for s, e in expected]
+    assert [(s, e) for s, e, _ in iter_chunks_from_lines(lines, 12, 4, separator="\n")] == expected
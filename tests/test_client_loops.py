@@ -0,0 +1,68 @@
+# test_client_loops.py
+
+import asyncio
+
+import ocr_utils
+
+
+def _on_new_loop(get_client, settle: float = 0.05):
+    async def run():
+        client = get_client()
+        await asyncio.sleep(settle)  # let the close of a replaced client run
+        return client
+    return asyncio.run(run())
+
+
+def test_document_intelligence_client_from_old_loop_is_closed(monkeypatch):
+    monkeypatch.setenv("AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT", "https://example.invalid")
+    monkeypatch.setenv("AZURE_DOCUMENT_INTELLIGENCE_KEY", "key")
+
+    first = _on_new_loop(ocr_utils.get_async_document_intelligence_client)
+    first_session = ocr_utils._async_session
+    second = _on_new_loop(ocr_utils.get_async_document_intelligence_client)
+
+    assert second is not first
+    assert first_session.closed
+    assert not ocr_utils._async_session.closed
+    asyncio.run(ocr_utils.close_async_document_intelligence_client())
+
+
+def test_agent_clients_from_old_loop_are_closed(monkeypatch):
+    from travelPlanner import azure_client
+
+    monkeypatch.setattr(azure_client, "AZURE_AI_PROJECT_ENDPOINT", "https://example.invalid/api/projects/p")
+    first = _on_new_loop(azure_client._get_async_clients)
+    second = _on_new_loop(azure_client._get_async_clients)
+
+    assert second is not first
+    assert first.http_client.is_closed
+    assert not second.http_client.is_closed
+    asyncio.run(azure_client.close_async_clients())
+
+
+def test_embedding_client_is_per_loop_and_old_one_closed(monkeypatch):
+    from chunks import embedding_utils
+
+    monkeypatch.setenv("AZURE_AI_INFERENCE_ENDPOINT", "https://example.invalid")
+    monkeypatch.setenv("AZURE_AI_INFERENCE_KEY", "key")
+    monkeypatch.setenv("AZURE_AI_EMBEDDING_MODEL", "model")
+
+    async def same_loop_twice():
+        return embedding_utils.get_shared_embedding_model(), embedding_utils.get_shared_embedding_model()
+
+    first, again = asyncio.run(same_loop_twice())
+    assert again is first
+
+    closed = []
+    close = first.client.close
+
+    async def tracking_close():
+        closed.append(True)
+        await close()
+
+    monkeypatch.setattr(first.client, "close", tracking_close)
+    second = _on_new_loop(embedding_utils.get_shared_embedding_model)
+
+    assert second is not first
+    assert closed == [True]
+    asyncio.run(embedding_utils.close_shared_embedding_model())
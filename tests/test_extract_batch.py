@@ -0,0 +1,100 @@
+# test_extract_batch.py
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from travelPlanner.request_cache import ExtractResultCache
+from travelPlanner.routes import extract
+
+
+def _response(url: str) -> extract.ExtractResponse:
+    return extract.ExtractResponse(
+        placeName=url, city="Lisbon", category="food", notes="", aiDescription="",
+    )
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    async def fake_extract(image_url: str):
+        calls.append(image_url)
+        if "broken" in image_url:
+            raise RuntimeError("agent said no")
+        return _response(image_url)
+
+    monkeypatch.setattr(extract, "_extract", fake_extract)
+    monkeypatch.setattr(extract, "extract_cache", ExtractResultCache(validate_etag=False))
+    return calls
+
+
+def _post(urls, **body):
+    response = TestClient(main.app).post("/api/extract/batch", json={"imageUrls": urls, **body})
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_repeated_urls_are_extracted_once(calls):
+    lines = _post(["http://a.example/x.jpg", "HTTP://A.EXAMPLE:80/x.jpg#top", "http://b.example/y.jpg"])
+
+    assert sorted(calls) == ["http://a.example/x.jpg", "http://b.example/y.jpg"]
+    by_index = {line["index"]: line for line in lines[:-1]}
+    assert sorted(by_index) == [0, 1, 2]
+    assert by_index[0]["result"] == by_index[1]["result"]
+    assert by_index[1]["imageUrl"].endswith("#top")  # each line echoes its own URL
+    assert lines[-1] == {"done": True, "succeeded": 3, "failed": 0}
+
+
+def test_failures_are_reported_per_item(calls):
+    lines = _post(["http://a.example/x.jpg", "http://broken.example/y.jpg"])
+
+    by_index = {line["index"]: line for line in lines[:-1]}
+    assert "result" in by_index[0]
+    assert by_index[1]["error"] == "Failed to extract details: agent said no"
+    assert "result" not in by_index[1]
+    assert lines[-1] == {"done": True, "succeeded": 1, "failed": 1}
+
+
+def test_concurrency_follows_the_agents_endpoint(monkeypatch):
+    maximum = extract.get_endpoint("agents").concurrency.maximum
+    monkeypatch.setattr(extract, "EXTRACT_BATCH_MAX_CONCURRENCY", 0)
+    assert extract._batch_concurrency(None) == maximum
+    assert extract._batch_concurrency(maximum + 100) == maximum
+    assert extract._batch_concurrency(2) == 2
+
+    monkeypatch.setattr(extract, "EXTRACT_BATCH_MAX_CONCURRENCY", 50)
+    assert extract._batch_concurrency(None) == 50
+
+
+def test_disconnect_stops_pending_items(monkeypatch):
+    started = []
+    blocked = asyncio.Event()
+
+    async def fake_extract(image_url: str):
+        started.append(image_url)
+        if "slow" in image_url:
+            await blocked.wait()
+        return _response(image_url)
+
+    monkeypatch.setattr(extract, "_extract", fake_extract)
+    monkeypatch.setattr(extract, "extract_cache", ExtractResultCache(validate_etag=False))
+
+    async def run():
+        req = extract.ExtractBatchRequest(
+            imageUrls=["http://a.example/1.jpg", "http://slow.example/2.jpg", "http://c.example/3.jpg"],
+            concurrency=1,
+        )
+        body = (await extract.extract_batch(req)).body_iterator
+        first = json.loads(await body.__anext__())
+        await asyncio.sleep(0.01)  # the slow item is now holding the only slot
+        await body.aclose()  # what Starlette does when the client goes away
+        blocked.set()  # a slot frees up, but no item is waiting for it any more
+        await asyncio.sleep(0.01)
+        return first
+
+    assert asyncio.run(run())["index"] == 0
+    assert started == ["http://a.example/1.jpg", "http://slow.example/2.jpg"]
@@ -0,0 +1,84 @@
+# test_ledger.py
+
+import json
+
+import numpy as np
+import pytest
+
+import bill_jobs
+import ledger
+from ledger import Ledger, detect_columns, statement_account
+
+
+def _columns(**columns):
+    return {name: np.array(values, dtype=object) for name, values in columns.items()}
+
+
+def test_narration_is_a_description_column():
+    assert detect_columns(["Date", "Narration", "Withdrawal", "Deposit", "Balance"]) == {
+        "date": "Date", "description": "Narration", "debit": "Withdrawal", "credit": "Deposit", "balance": "Balance",
+    }
+
+
+def test_statement_account_matches_account_number_labels_only():
+    assert statement_account({"Account Type": "Savings", "Account No.:": "1234"}) == "1234"
+    assert statement_account({"A/C #": "99"}) == "99"
+    assert statement_account({"Account Type": "Savings", "Account Holder": "Jo"}) == "default"
+
+
+def test_summary_is_plain_json():
+    book = Ledger()
+    book.add_columns(_columns(
+        Date=["01/02/2024", "03/02/2024", "05/03/2024"],
+        Narration=["CARD 1234 TESCO", "Salary", "TESCO 999"],
+        Category=["groceries", "income", "groceries"],
+        Amount=["-10.00", "1,000.00", "(5.50)"],
+    ), "acct")
+
+    summary = book.summary()
+    assert json.loads(json.dumps(summary)) == summary
+    assert all(type(name) is str for name in book.categories + book.merchants)
+    assert list(book.category_totals()) == ["groceries", "income"]
+    assert summary["top_merchants"][0] == {"merchant": "TESCO", "spend": 15.5, "count": 2}
+
+
+def test_ledger_failure_does_not_fail_the_bill(monkeypatch):
+    def broken(self, result, account=None, header_rows=1):
+        raise ValueError("unparseable table")
+
+    monkeypatch.setattr(ledger.Ledger, "add_statement", broken)
+    assert bill_jobs._ledger_summary(object()) is None
+
+
+@pytest.mark.parametrize("column", [["1.234", "500"], ["1.234", "x"], ["1.234"], ["1.234", "1,000.00"]])
+def test_amount_does_not_depend_on_its_column(column):
+    cents, known = ledger.parse_amounts(column)
+    assert cents[0] == 123400
+    assert known[0]
+
+
+def test_plain_amount_columns_match_the_slow_parser():
+    column = ["1234.56", "-12", "0.5", "", "12.5", "1.234", "1e3"]
+    cents, known = ledger.parse_amounts(column)
+    expected = [ledger._parse_amount(text) for text in column]
+
+    assert cents.tolist() == [0 if value is None else value for value in expected]
+    assert known.tolist() == [value is not None for value in expected]
+    # The same values without the odd ones out take the fast path.
+    fast, _ = ledger.parse_amounts(column[:5])
+    assert fast.tolist() == cents[:5].tolist()
+
+
+@pytest.mark.parametrize("column", [["2024"], ["2024", "2024-03-31"], ["2024", "31/03/2024"], ["today"]])
+def test_partial_iso_dates_are_not_parsed(column):
+    assert np.isnat(ledger.parse_dates(column)[0])
+
+
+def test_date_does_not_depend_on_its_column():
+    iso = ledger.parse_dates(["2024-03-31", "2024-02-01"])
+    mixed = ledger.parse_dates(["2024-03-31", "01/02/2024"])
+    invalid = ledger.parse_dates(["2024-03-31", "2024-02-30"])
+
+    assert iso[0] == mixed[0] == invalid[0] == np.datetime64("2024-03-31")
+    assert mixed[1] == iso[1]
+    assert np.isnat(invalid[1])
@@ -0,0 +1,34 @@
+# test_memory_retrieval.py
+
+import asyncio
+
+from travelPlanner import memory_retrieval
+
+
+def test_embedding_failure_forwards_every_memory(monkeypatch):
+    async def fail(texts):
+        raise ValueError("Missing one of AZURE_AI_INFERENCE_ENDPOINT")
+
+    monkeypatch.setattr(memory_retrieval, "generate_embeddings", fail)
+    memories = [{"id": str(i), "placeName": f"Place {i}"} for i in range(30)]
+
+    selected, report = asyncio.run(memory_retrieval.select_memories(memories, "Where to eat?", top_k=5))
+
+    assert selected == memories
+    assert report["forwarded"] == 30
+    assert "AZURE_AI_INFERENCE_ENDPOINT" in report["error"]
+
+
+def test_selected_memories_are_most_relevant_first(monkeypatch):
+    # Memory i scores i against the question, so the ranking is fully known.
+    async def embed(texts):
+        return [[1.0, 0.0]] + [[float(text.split()[1]), 30.0] for text in texts[1:]]
+
+    monkeypatch.setattr(memory_retrieval, "generate_embeddings", embed)
+    monkeypatch.setattr(memory_retrieval, "memory_vectors", memory_retrieval.MemoryVectorCache())
+    memories = [{"id": str(i), "placeName": f"Place {i}"} for i in range(30)]
+
+    selected, report = asyncio.run(memory_retrieval.select_memories(memories, "Where to eat?", top_k=5))
+
+    assert [m["id"] for m in selected] == ["29", "28", "27", "26", "25"]
+    assert report["forwarded"] == 5
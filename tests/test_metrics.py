@@ -0,0 +1,112 @@
+# test_metrics.py
+
+import re
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+import metrics
+from metrics import Histogram, TimingMiddleware, server_timing_header, timed
+
+
+# ---------------------------
+#  Histogram
+# ---------------------------
+
+def test_bucket_counts_are_cumulative():
+    histogram = Histogram("job_seconds", "Job time.", ("kind",), buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 2.0):  # 0.1 is on a bound: le is inclusive
+        histogram.observe(("ocr",), seconds)
+    histogram.observe(("embed",), 0.2)
+
+    assert histogram.render() == [
+        "# HELP job_seconds Job time.",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{kind="embed",le="0.1"} 0',
+        'job_seconds_bucket{kind="embed",le="1.0"} 1',
+        'job_seconds_bucket{kind="embed",le="+Inf"} 1',
+        'job_seconds_sum{kind="embed"} 0.2',
+        'job_seconds_count{kind="embed"} 1',
+        'job_seconds_bucket{kind="ocr",le="0.1"} 2',
+        'job_seconds_bucket{kind="ocr",le="1.0"} 3',
+        'job_seconds_bucket{kind="ocr",le="+Inf"} 4',
+        'job_seconds_sum{kind="ocr"} 2.65',
+        'job_seconds_count{kind="ocr"} 4',
+    ]
+
+
+def test_labels_are_escaped_and_optional():
+    labelled = Histogram("h", "Help.", ("route",), buckets=(1.0,))
+    labelled.observe(('say "hi"\\\n',), 0.5)
+    assert labelled.render()[2] == 'h_bucket{route="say \\"hi\\"\\\\\\n",le="1.0"} 1'
+
+    bare = Histogram("h", "Help.", (), buckets=(1.0,))
+    bare.observe((), 0.5)
+    assert bare.render()[2:] == ['h_bucket{le="1.0"} 1', 'h_bucket{le="+Inf"} 1', "h_sum 0.5", "h_count 1"]
+
+
+# ---------------------------
+#  Server-Timing
+# ---------------------------
+
+def test_server_timing_header_sums_repeated_stages():
+    header = server_timing_header([("ocr.submit", 0.25), ("ocr.poll", 1.5), ("ocr.submit", 0.0005)], total=2.0)
+    assert header == "ocr_submit;dur=250.5, ocr_poll;dur=1500.0, total;dur=2000.0"
+    assert server_timing_header([]) == ""
+
+
+def _timed_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(TimingMiddleware)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: str):
+        with timed("test.lookup"):
+            pass
+        with timed("test.lookup"):
+            pass
+        return {"id": item_id}
+
+    return app
+
+
+def test_middleware_adds_server_timing_and_records_the_route():
+    response = TestClient(_timed_app()).get("/items/42")
+
+    assert response.status_code == 200
+    assert re.fullmatch(r"test_lookup;dur=\d+\.\d, total;dur=\d+\.\d", response.headers["server-timing"])
+    assert 'route="/items/{item_id}",status="200",le="+Inf"}' in metrics.render_prometheus()
+
+
+def test_unmatched_requests_share_one_series():
+    response = TestClient(_timed_app()).get("/nowhere/1")
+
+    assert response.status_code == 404
+    assert response.headers["server-timing"].startswith("total;dur=")
+    assert 'method="GET",route="unmatched",status="404"' in metrics.render_prometheus()
+
+
+# ---------------------------
+#  /metrics
+# ---------------------------
+
+def _count(text: str, series: str) -> int:
+    match = re.search(rf"^{re.escape(series)} (\d+)$", text, re.MULTILINE)
+    return int(match.group(1)) if match else 0
+
+
+def test_metrics_endpoint_exposes_the_histograms():
+    client = TestClient(main.app)
+    series = 'http_request_duration_seconds_count{method="GET",route="/api/startup",status="200"}'
+    before = _count(client.get("/metrics").text, series)
+
+    client.get("/api/startup")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert _count(response.text, series) == before + 1
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    assert "# TYPE app_stage_duration_seconds histogram" in response.text
+    assert response.text.endswith("\n")
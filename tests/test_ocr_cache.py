@@ -0,0 +1,122 @@
+# test_ocr_cache.py
+
+import os
+import stat
+
+import ocr_utils
+from benchmarks.synthetic import as_sdk_result, make_analyze_result_dict
+from ocr_cache import AnalysisCache, make_cache_key
+from ocr_slim import SlimDocument
+from ocr_utils import analyze_document, extract_lines, extract_tables
+
+RESULT = as_sdk_result(make_analyze_result_dict(pages=2, lines_per_page=3, table_rows=4, key_value_pairs=2))
+
+
+def _mode(path) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_hit_and_miss():
+    cache = AnalysisCache(cache_dir=None)
+    key = make_cache_key(b"bill", "prebuilt-read")
+
+    assert cache.get(key) is None
+    stored = cache.put(key, RESULT)
+    assert isinstance(stored, SlimDocument)
+    assert cache.get(key) is stored
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_key_depends_on_options():
+    keys = {
+        make_cache_key(b"bill", "prebuilt-read"),
+        make_cache_key(b"bill", "prebuilt-layout"),
+        make_cache_key(b"bill", "prebuilt-read", features=["keyValuePairs"]),
+        make_cache_key(b"bill", "prebuilt-read", pages="1-2"),
+        make_cache_key(b"other", "prebuilt-read"),
+    }
+    assert len(keys) == 5
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = AnalysisCache(cache_dir=None, max_memory_entries=2)
+    cache.put("a", {"content": "a"})
+    cache.put("b", {"content": "b"})
+    cache.get("a")
+    cache.put("c", {"content": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    key = make_cache_key(b"bill", "prebuilt-read")
+    AnalysisCache(cache_dir=str(tmp_path)).put(key, RESULT)
+
+    fresh = AnalysisCache(cache_dir=str(tmp_path))
+    loaded = fresh.get(key)
+
+    assert isinstance(loaded, SlimDocument)
+    assert extract_lines(loaded) == extract_lines(RESULT)
+    assert extract_tables(loaded) == extract_tables(RESULT)
+    assert fresh.stats()["disk_hits"] == 1
+    assert fresh.get(key) is loaded  # promoted to the memory tier
+
+
+def test_disk_tier_is_private(tmp_path):
+    cache_dir = tmp_path / "ocr"
+    cache_dir.mkdir(mode=0o755)
+    key = make_cache_key(b"bill", "prebuilt-read")
+    AnalysisCache(cache_dir=str(cache_dir)).put(key, RESULT)
+
+    assert _mode(cache_dir) == 0o700
+    path = cache_dir / key[:2] / f"{key}.slim"
+    assert _mode(path.parent) == 0o700
+    assert _mode(path) == 0o600
+
+
+def test_failed_disk_write_still_caches_in_memory(tmp_path):
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_bytes(b"")
+    cache = AnalysisCache(cache_dir=str(not_a_dir))
+
+    stored = cache.put("k", RESULT)  # must not raise
+    assert cache.get("k") is stored
+
+
+def test_expired_disk_entry_is_removed(tmp_path):
+    key = make_cache_key(b"bill", "prebuilt-read")
+    AnalysisCache(cache_dir=str(tmp_path)).put(key, RESULT)
+
+    cache = AnalysisCache(cache_dir=str(tmp_path), max_age_seconds=-1)
+    assert cache.get(key) is None
+    assert not (tmp_path / key[:2] / f"{key}.slim").exists()
+
+
+# ---------------------------
+#  analyze_document
+# ---------------------------
+
+def test_analyze_document_caches_the_slim_form(tmp_path, monkeypatch):
+    calls = []
+
+    def run_analysis(data, model_id, content_type, features, pages):
+        calls.append(pages)
+        return RESULT
+
+    monkeypatch.setattr(ocr_utils, "_run_analysis", run_analysis)
+    path = tmp_path / "bill.pdf"
+    path.write_bytes(b"bill")
+    cache = AnalysisCache(cache_dir=None)
+
+    first = analyze_document(str(path), cache=cache)
+    assert isinstance(first, SlimDocument)
+    assert analyze_document(str(path), cache=cache) is first
+    assert len(calls) == 1
+
+    # The full SDK form cannot come from the cache.
+    assert analyze_document(str(path), cache=cache, slim=False) is RESULT
+    assert len(calls) == 2
@@ -0,0 +1,154 @@
+# test_ocr_local.py
+
+from types import SimpleNamespace
+
+import pytest
+
+import ocr_local
+from ocr_local import _table_from_rows, analyze_document_local_first, extract_text_layer
+from ocr_utils import extract_tables
+
+
+def _pdf(*page_streams: str) -> bytes:
+    """Minimal PDF with one Helvetica font; each argument is a page's content stream."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for stream in page_streams:
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return out
+
+
+def _text(x: int, y: int, text: str) -> str:
+    return f"BT /F1 10 Tf {x} {y} Td ({text}) Tj ET"
+
+
+def _line(x0: int, y0: int, x1: int, y1: int) -> str:
+    return f"{x0} {y0} m {x1} {y1} l S"
+
+
+# A ruled 3x3 table (columns at x=50/150/250/350, rows at y=700/680/660/640):
+# "Details" spans columns 1-2 of row 0, "Merged" spans rows 1-2 of column 0.
+STATEMENT_PAGE = "\n".join([
+    _text(50, 750, "Statement for March 2024, account 12345678"),
+    _line(50, 700, 350, 700), _line(50, 680, 350, 680), _line(150, 660, 350, 660), _line(50, 640, 350, 640),
+    _line(50, 640, 50, 700), _line(150, 640, 150, 700), _line(250, 640, 250, 680), _line(350, 640, 350, 700),
+    _text(55, 686, "Date"), _text(155, 686, "Details"),
+    _text(55, 666, "Merged"), _text(155, 666, "a"), _text(255, 666, "b"),
+    _text(155, 646, "c"), _text(255, 646, "d"),
+])
+SCANNED_PAGE = _line(50, 50, 60, 60)
+
+
+# ---------------------------
+#  Tables
+# ---------------------------
+
+def test_spans_follow_the_cell_boxes():
+    local = extract_text_layer(_pdf(STATEMENT_PAGE))
+    table = local["tables"][0]
+    spans = {(c.row_index, c.column_index): (c.content, c.row_span, c.column_span) for c in table.cells}
+
+    assert spans[(0, 1)] == ("Details", 1, 2)
+    assert spans[(1, 0)] == ("Merged", 2, 1)
+    assert spans[(1, 1)] == ("a", 1, 1)
+    assert extract_tables(SimpleNamespace(tables=[table])) == [[
+        ["Date", "Details", "Details"],
+        ["Merged", "a", "b"],
+        ["Merged", "c", "d"],
+    ]]
+
+
+def test_vertical_merge_is_not_a_column_span():
+    rows = [["a", "b"], ["c", None]]
+    boxes = [
+        [(0, 0, 10, 10), (10, 0, 20, 20)],  # "b" is two rows tall
+        [(0, 10, 10, 20), None],
+    ]
+    cells = {(c.row_index, c.column_index): c for c in _table_from_rows(rows, 1, boxes).cells}
+
+    assert (cells[(0, 1)].row_span, cells[(0, 1)].column_span) == (2, 1)
+    assert (cells[(1, 0)].row_span, cells[(1, 0)].column_span) == (1, 1)
+
+
+def test_without_boxes_every_cell_spans_one_position():
+    cells = _table_from_rows([["a", None], [None, "d"]], 1).cells
+    assert [(c.content, c.row_span, c.column_span) for c in cells] == [("a", 1, 1), ("d", 1, 1)]
+
+
+# ---------------------------
+#  Page routing
+# ---------------------------
+
+@pytest.fixture
+def azure_calls(monkeypatch):
+    calls = []
+
+    def fake_analyze(file_path, model_id="prebuilt-layout", pages=None, slim=True, **kwargs):
+        assert not slim  # pages and tables are merged as SDK models
+        calls.append({"pages": pages, **kwargs})
+        numbers = [2] if pages == "2" else [1, 2]
+        return SimpleNamespace(
+            pages=[SimpleNamespace(page_number=n, lines=[SimpleNamespace(content=f"ocr page {n}")]) for n in numbers],
+            tables=[],
+            key_value_pairs=[SimpleNamespace(key=SimpleNamespace(content="Account"), value=SimpleNamespace(content="1"))],
+            documents=[],
+        )
+
+    monkeypatch.setattr(ocr_local, "analyze_document", fake_analyze)
+    return calls
+
+
+def _write(tmp_path, data: bytes, name: str = "statement.pdf") -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_only_scanned_pages_go_to_azure(tmp_path, azure_calls):
+    result = analyze_document_local_first(_write(tmp_path, _pdf(STATEMENT_PAGE, SCANNED_PAGE)))
+
+    assert azure_calls == [{"pages": "2"}]
+    assert result.served_by == ocr_local.SERVED_BY_MIXED
+    assert result.page_sources == {1: "local", 2: "azure"}
+    assert [p.page_number for p in result.pages] == [1, 2]
+    assert len(result.tables) == 1
+
+
+def test_text_only_pdf_is_served_locally(tmp_path, azure_calls):
+    result = analyze_document_local_first(_write(tmp_path, _pdf(STATEMENT_PAGE)))
+
+    assert azure_calls == []
+    assert result.served_by == ocr_local.SERVED_BY_LOCAL
+
+
+def test_key_value_requests_send_every_page_to_azure(tmp_path, azure_calls):
+    result = analyze_document_local_first(
+        _write(tmp_path, _pdf(STATEMENT_PAGE, SCANNED_PAGE)), features=["keyValuePairs"],
+    )
+
+    assert azure_calls == [{"pages": None, "features": ["keyValuePairs"]}]
+    assert result.served_by == ocr_local.SERVED_BY_AZURE
+    assert len(result.key_value_pairs) == 1
+
+
+def test_non_pdf_goes_to_azure(tmp_path, azure_calls):
+    result = analyze_document_local_first(_write(tmp_path, b"\x89PNG\r\n", "photo.png"))
+
+    assert azure_calls == [{"pages": None}]
+    assert result.served_by == ocr_local.SERVED_BY_AZURE
@@ -0,0 +1,57 @@
+# test_ocr_slim.py
+
+import pickle
+
+import pytest
+
+from benchmarks.synthetic import as_local_result, as_sdk_result, make_analyze_result_dict
+from ocr_slim import SlimDocument, to_slim
+from ocr_utils import extract_key_value_pairs, extract_lines, extract_plain_text, extract_table_grids, extract_tables
+
+# Small statement with merged cells in both directions.
+STATEMENT = make_analyze_result_dict(pages=3, lines_per_page=5, table_rows=12, span_every=4, key_value_pairs=4)
+
+
+def _extracted(result):
+    return {
+        "lines": extract_lines(result),
+        "text": extract_plain_text(result),
+        "key_values": extract_key_value_pairs(result),
+        "tables": extract_tables(result),
+        "tables_unfilled": extract_table_grids(result, fill_spans=False),
+    }
+
+
+@pytest.mark.parametrize("build", [as_sdk_result, as_local_result], ids=["sdk", "local"])
+def test_slim_forms_extract_like_the_source(build):
+    source = build(STATEMENT)
+    slim = to_slim(source)
+    expected = _extracted(source)
+
+    assert expected["lines"] and expected["key_values"] and expected["tables"]
+    assert _extracted(slim) == expected
+    assert _extracted(SlimDocument.from_bytes(slim.to_bytes())) == expected
+    assert _extracted(pickle.loads(pickle.dumps(slim))) == expected
+
+
+def test_page_grouping_survives_the_round_trip():
+    slim = pickle.loads(pickle.dumps(to_slim(as_sdk_result(STATEMENT))))
+
+    assert list(slim.page_numbers) == [1, 2, 3]
+    assert list(slim.page_line_ends) == [5, 10, 15]
+
+
+def test_pickle_uses_the_binary_form():
+    slim = to_slim(as_sdk_result(STATEMENT))
+    assert slim.to_bytes() in pickle.dumps(slim)
+    assert to_slim(slim) is slim
+
+
+def test_from_bytes_rejects_other_data():
+    with pytest.raises(ValueError, match="Not a slim document"):
+        SlimDocument.from_bytes(b"JSON" + bytes(40))
+
+
+def test_empty_result():
+    slim = pickle.loads(pickle.dumps(to_slim(as_local_result({"pages": [], "tables": [], "keyValuePairs": []}))))
+    assert _extracted(slim) == {"lines": [], "text": "", "key_values": {}, "tables": [], "tables_unfilled": []}
@@ -0,0 +1,194 @@
+# test_ocr_utils.py
+
+import copy
+from types import SimpleNamespace
+
+import numpy as np
+
+from ocr_utils import _table_grid, extract_lines, extract_table_columns, extract_tables, merge_analyze_results
+
+
+def _cell(row, column, content, row_span=None, column_span=None):
+    return SimpleNamespace(row_index=row, column_index=column, content=content,
+                           row_span=row_span, column_span=column_span)
+
+
+def _table(row_count, column_count, cells):
+    return SimpleNamespace(row_count=row_count, column_count=column_count, cells=cells)
+
+
+# ---------------------------
+#  _table_grid
+# ---------------------------
+
+SPANNED = _table(3, 3, [
+    _cell(0, 0, "Date"), _cell(0, 1, "Details", column_span=2),
+    _cell(1, 0, "Merged", row_span=2), _cell(1, 1, "a"), _cell(1, 2, "b"),
+    _cell(2, 2, "d"),  # (2, 1) is missing
+])
+
+
+def test_spans_are_filled():
+    assert _table_grid(SPANNED, fill_spans=True) == [
+        ["Date", "Details", "Details"],
+        ["Merged", "a", "b"],
+        ["Merged", "", "d"],
+    ]
+
+
+def test_spans_are_kept_in_their_top_left_cell():
+    assert _table_grid(SPANNED, fill_spans=False) == [
+        ["Date", "Details", ""],
+        ["Merged", "a", "b"],
+        ["", "", "d"],
+    ]
+
+
+def test_cells_outside_the_declared_shape_grow_the_grid():
+    table = _table(1, 1, [_cell(0, 0, "a"), _cell(1, 1, "b", row_span=2)])
+    assert _table_grid(table, fill_spans=True) == [["a", ""], ["", "b"], ["", "b"]]
+
+
+# ---------------------------
+#  extract_table_columns
+# ---------------------------
+
+STATEMENT = SimpleNamespace(tables=[_table(4, 5, [
+    _cell(0, 0, "Date"), _cell(0, 1, "Description"), _cell(0, 2, "Amount"),
+    _cell(0, 3, "Ref"), _cell(0, 4, "Qty"),
+    _cell(1, 0, "03/04/2024"), _cell(1, 1, "Coffee"), _cell(1, 2, "(1.234,50)"),
+    _cell(1, 3, "Ref 123"), _cell(1, 4, "2"),
+    _cell(2, 0, "2024-04-05"), _cell(2, 1, "Rent"), _cell(2, 2, "$ 800.00"),
+    _cell(2, 3, "456"), _cell(2, 4, ""),
+    _cell(3, 0, ""), _cell(3, 1, "Total"), _cell(3, 2, "1,000.00 DR"),
+    _cell(3, 3, "789"), _cell(3, 4, "1.5"),
+])])
+
+
+def test_columns_are_typed():
+    columns = extract_table_columns(STATEMENT)[0]
+
+    assert columns["Date"].dtype == np.dtype("datetime64[D]")
+    assert columns["Date"][:2].tolist() == np.array(["2024-04-03", "2024-04-05"], dtype="datetime64[D]").tolist()
+    assert np.isnat(columns["Date"][2])
+
+    assert columns["Amount"].dtype == np.float64
+    assert columns["Amount"].tolist() == [-1234.5, 800.0, -1000.0]
+    assert columns["Qty"].dtype == np.float64
+    assert columns["Qty"][[0, 2]].tolist() == [2.0, 1.5] and np.isnan(columns["Qty"][1])
+
+    # One cell that is not a plain number keeps the whole column as text.
+    assert columns["Ref"].dtype == object
+    assert columns["Description"].tolist() == ["Coffee", "Rent", "Total"]
+
+
+def test_dayfirst_and_untyped_columns():
+    assert extract_table_columns(STATEMENT, dayfirst=False)[0]["Date"][0] == np.datetime64("2024-03-04")
+
+    columns = extract_table_columns(STATEMENT, typed=False)[0]
+    assert all(column.dtype == object for column in columns.values())
+    assert columns["Amount"].tolist() == ["(1.234,50)", "$ 800.00", "1,000.00 DR"]
+
+
+# ---------------------------
+#  merge_analyze_results
+# ---------------------------
+
+def _page(number, lines):
+    """A page whose lines are spans of `content`; lines are (offset, text) pairs."""
+    return {
+        "pageNumber": number,
+        "lines": [{"content": text, "spans": [{"offset": offset, "length": len(text)}]} for offset, text in lines],
+        "spans": [{"offset": lines[0][0], "length": sum(len(text) + 1 for _, text in lines) - 1}],
+    }
+
+
+def _table_dict(page, rows, offset):
+    cells = [
+        {"rowIndex": r, "columnIndex": c, "content": text, "spans": [{"offset": offset, "length": len(text)}]}
+        for r, row in enumerate(rows) for c, text in enumerate(row)
+    ]
+    return {
+        "rowCount": len(rows), "columnCount": len(rows[0]), "cells": cells,
+        "boundingRegions": [{"pageNumber": page, "polygon": [0, 0, 1, 0, 1, 1, 0, 1]}],
+        "spans": [{"offset": offset, "length": 1}],
+    }
+
+
+# Two ranges of a four-page statement (pages 1-2 and 3-4), each numbered from 1
+# as the service does for a range sent on its own. The table runs from the
+# bottom of page 2 onto page 3; page 4 has a separate two-column table.
+FIRST_RANGE = {
+    "content": "Intro\nDate Amount\nRow 1",
+    "pages": [_page(1, [(0, "Intro")]), _page(2, [(6, "Date Amount"), (18, "Row 1")])],
+    "tables": [_table_dict(2, [["Date", "Amount", "Ref"], ["Row 1", "1.00", "a"]], 6)],
+    "paragraphs": [{"content": "Intro", "spans": [{"offset": 0, "length": 5}]}],
+    "sections": [{"elements": ["/paragraphs/0", "/tables/0"]}],
+}
+SECOND_RANGE = {
+    "content": "Row 2\nTotals",
+    "pages": [_page(1, [(0, "Row 2")]), _page(2, [(6, "Totals")])],
+    "tables": [
+        _table_dict(1, [["Row 2", "2.00", "b"]], 0),
+        _table_dict(2, [["Totals", "3.00"]], 6),
+    ],
+    "paragraphs": [{"content": "Totals", "spans": [{"offset": 6, "length": 6}]}],
+    "sections": [{"elements": ["/tables/0", "/paragraphs/0", "/tables/1"]}],
+}
+
+
+def _merged(join_tables=True):
+    return merge_analyze_results([FIRST_RANGE, SECOND_RANGE], [1, 3], join_tables=join_tables).as_dict()
+
+
+def test_merged_pages_and_offsets_are_absolute():
+    merged = _merged()
+
+    assert merged["content"] == "Intro\nDate Amount\nRow 1\nRow 2\nTotals"
+    assert [p["pageNumber"] for p in merged["pages"]] == [1, 2, 3, 4]
+    for page in merged["pages"]:
+        for line in page["lines"]:
+            span = line["spans"][0]
+            assert merged["content"][span["offset"]:span["offset"] + span["length"]] == line["content"]
+    assert extract_lines(merge_analyze_results([FIRST_RANGE, SECOND_RANGE], [1, 3])) == [
+        "Intro", "Date Amount", "Row 1", "Row 2", "Totals",
+    ]
+
+    paragraph = merged["paragraphs"][1]["spans"][0]
+    assert merged["content"][paragraph["offset"]:paragraph["offset"] + paragraph["length"]] == "Totals"
+
+
+def test_table_crossing_a_range_boundary_is_joined():
+    merged = _merged()
+
+    assert len(merged["tables"]) == 2
+    joined = merged["tables"][0]
+    assert joined["rowCount"] == 3
+    assert [r["pageNumber"] for r in joined["boundingRegions"]] == [2, 3]
+    assert merged["tables"][1]["boundingRegions"][0]["pageNumber"] == 4
+    assert extract_tables(merge_analyze_results([FIRST_RANGE, SECOND_RANGE], [1, 3])) == [
+        [["Date", "Amount", "Ref"], ["Row 1", "1.00", "a"], ["Row 2", "2.00", "b"]],
+        [["Totals", "3.00"]],
+    ]
+
+    # Pointers to the continuation land on the joined table, later ones move up.
+    assert [s["elements"] for s in merged["sections"]] == [
+        ["/paragraphs/0", "/tables/0"],
+        ["/tables/0", "/paragraphs/1", "/tables/1"],
+    ]
+
+
+def test_tables_are_kept_apart_without_join_tables():
+    merged = _merged(join_tables=False)
+
+    assert [t["rowCount"] for t in merged["tables"]] == [2, 1, 1]
+    assert [r["boundingRegions"][0]["pageNumber"] for r in merged["tables"]] == [2, 3, 4]
+    assert merged["sections"][1]["elements"] == ["/tables/1", "/paragraphs/1", "/tables/2"]
+
+
+def test_table_with_different_columns_is_not_joined():
+    second = copy.deepcopy(SECOND_RANGE)
+    second["tables"][0]["columnCount"] = 2  # a different table that starts on page 3
+
+    merged = merge_analyze_results([FIRST_RANGE, second], [1, 3]).as_dict()
+    assert [t["rowCount"] for t in merged["tables"]] == [2, 1, 1]
@@ -0,0 +1,75 @@
+# test_payload_packer.py
+
+import json
+
+import pytest
+
+from travelPlanner.payload_packer import pack_chat_payload
+
+
+def _memory(i, city="Lisbon"):
+    return {
+        "id": f"mem-{i}",
+        "placeName": f"P{i}",
+        "city": city,
+        "category": "food",
+        "notes": "n" * 200,
+        "aiDescription": "d" * 400,
+        "createdAt": "2024-01-01T00:00:00Z",
+    }
+
+
+MEMORIES = [_memory(0), _memory(1), _memory(2, city="Porto")]
+
+
+@pytest.fixture
+def packed():
+    return pack_chat_payload(MEMORIES, "Where to eat?")
+
+
+def test_rows_keep_memory_ids(packed):
+    assert packed.payload["cols"][0] == "id"
+    assert [row[0] for row in packed.payload["rows"]] == ["mem-0", "mem-1", "mem-2"]
+    assert "createdAt" not in json.dumps(packed.payload)
+
+
+@pytest.mark.parametrize("matches", [
+    ["mem-1", "mem-2"],
+    [{"id": "mem-1"}, {"id": "mem-2", "placeName": "P2"}],
+    [["mem-1", "P1", 0, 0, "n", "d"], ["mem-2", "P2", 1, 0, "n", "d"]],
+    [{"placeName": "P1", "city": "Lisbon"}, {"placeName": "p2"}],
+    # An id the agent made up falls back to the place name.
+    [{"id": "made-up", "placeName": "P1"}, "mem-2"],
+])
+def test_each_match_shape_resolves(packed, matches):
+    assert packed.unpack_matches(matches) == [MEMORIES[1], MEMORIES[2]]
+
+
+def test_rows_sent_back_as_packed_resolve(packed):
+    assert packed.unpack_matches(packed.payload["rows"]) == MEMORIES
+
+
+def test_place_name_match_uses_city_to_disambiguate():
+    memories = [_memory(0), _memory(1), dict(_memory(2), placeName="P0", city="Porto")]
+    packed = pack_chat_payload(memories, "q")
+
+    assert packed.unpack_matches([{"placeName": "P0", "city": "Porto"}]) == [memories[2]]
+    assert packed.unpack_matches([{"placeName": "P0"}]) == [memories[0]]
+
+
+def test_unknown_and_duplicate_matches_are_skipped(packed):
+    matches = ["mem-1", "nope", None, [], {}, {"placeName": "Nowhere"}, ["mem-1"], 7]
+    assert packed.unpack_matches(matches) == [MEMORIES[1]]
+    assert packed.unpack_matches(None) == []
+
+
+def test_budget_drops_the_last_memories():
+    # select_memories() sends memories most relevant first, so the last rows go.
+    memories = [_memory(i) for i in range(50)]
+    packed = pack_chat_payload(memories, "q", token_budget=150)
+
+    sent = [row[0] for row in packed.payload["rows"]]
+    assert 0 < len(sent) < 50
+    assert sent == [f"mem-{i}" for i in range(len(sent))]
+    assert packed.stats["memories_dropped"] == 50 - len(sent)
+    assert packed.unpack_matches(sent) == memories[:len(sent)]
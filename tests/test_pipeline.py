@@ -0,0 +1,90 @@
+# test_pipeline.py
+
+import asyncio
+
+import pytest
+
+import pipeline
+from ocr_local import LocalAnalyzeResult, LocalLine, LocalPage
+from pipeline import IngestPipeline
+
+
+@pytest.fixture(autouse=True)
+def stub_azure(monkeypatch):
+    async def analyze(file_path, model_id="prebuilt-layout"):
+        if "broken" in file_path:
+            raise RuntimeError("analyze failed")
+        lines = [LocalLine(f"{file_path} line {i} " + "word " * 20) for i in range(30)]
+        return LocalAnalyzeResult([LocalPage(1, lines)], [], "azure", {1: "azure"})
+
+    async def embed(texts):
+        await asyncio.sleep(0)
+        return [[float(len(text))] for text in texts]
+
+    monkeypatch.setattr(pipeline, "analyze_document_async", analyze)
+    monkeypatch.setattr(pipeline, "generate_embeddings", embed)
+
+
+def _pipeline(**kwargs) -> IngestPipeline:
+    options = dict(ocr_concurrency=2, extract_concurrency=2, chunk_concurrency=2, embed_concurrency=2, queue_size=2)
+    options.update(kwargs)
+    return IngestPipeline(**options)
+
+
+def test_every_item_reaches_the_output():
+    paths = [f"doc{i}.pdf" for i in range(10)] + ["broken.pdf"]
+    p = _pipeline()
+    seen = []
+
+    items = asyncio.run(p.run(paths, on_item=seen.append))
+
+    assert sorted(item.file_path for item in items) == sorted(paths)
+    assert seen == items
+    for item in items:
+        if item.file_path == "broken.pdf":
+            assert (item.failed_stage, item.error) == ("ocr", "analyze failed")
+            assert item.embeddings is None
+        else:
+            assert item.error is None
+            assert item.chunks and len(item.embeddings) == len(item.chunks)
+            assert item.chunks[0].startswith(item.file_path)
+            # Intermediate payloads are released once consumed.
+            assert item.result is None and item.text is None
+
+    report = p.stats_report()
+    assert report["ocr"]["completed"] == 10 and report["ocr"]["failed"] == 1
+    assert report["embed"]["completed"] == 10
+    assert report["extract"]["max_queue_depth"] <= 2
+
+
+def test_failing_callback_stops_every_stage():
+    async def run():
+        def on_item(item):
+            raise ValueError("callback failed")
+
+        before = asyncio.all_tasks()
+        with pytest.raises(ValueError, match="callback failed"):
+            await _pipeline().run([f"doc{i}.pdf" for i in range(20)], on_item=on_item)
+        return asyncio.all_tasks() - before
+
+    assert asyncio.run(run()) == set()
+
+
+def test_cancelled_run_stops_every_stage(monkeypatch):
+    async def run():
+        embedding = asyncio.Event()
+
+        async def stuck_embed(texts):
+            embedding.set()
+            await asyncio.Event().wait()
+
+        monkeypatch.setattr(pipeline, "generate_embeddings", stuck_embed)
+        before = asyncio.all_tasks()
+        task = asyncio.create_task(_pipeline().run([f"doc{i}.pdf" for i in range(50)]))
+        await embedding.wait()  # every stage is busy or blocked on a full queue
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return asyncio.all_tasks() - before
+
+    assert asyncio.run(run()) == set()
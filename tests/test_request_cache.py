@@ -0,0 +1,145 @@
+# test_request_cache.py
+
+import asyncio
+
+import httpx
+import pytest
+
+from travelPlanner import request_cache
+from travelPlanner.request_cache import ExtractResultCache, SingleFlight, TTLCache, is_public_http_url
+
+
+# ---------------------------
+#  ETag validation requests
+# ---------------------------
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/photo.jpg",
+    "http://localhost:8000/photo.jpg",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://10.0.0.5/photo.jpg",
+    "http://192.168.1.1/photo.jpg",
+    "http://[::1]/photo.jpg",
+    "http://[::ffff:127.0.0.1]/photo.jpg",
+    "file:///etc/passwd",
+    "ftp://8.8.8.8/photo.jpg",
+    "http:///photo.jpg",
+])
+def test_internal_urls_are_not_requested(url):
+    cache = ExtractResultCache(validate_etag=True)
+
+    def no_client():
+        raise AssertionError("no request expected")
+
+    cache._client = no_client
+    assert asyncio.run(is_public_http_url(url)) is False
+    assert asyncio.run(cache._fetch_etag(url, '"v1"')) == (True, '"v1"')
+
+
+def test_public_urls_are_requested_without_following_redirects():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(304)
+
+    async def run():
+        cache = ExtractResultCache(validate_etag=True)
+        assert cache._client().follow_redirects is False
+        await cache.close()
+        cache._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await cache._fetch_etag("http://8.8.8.8/photo.jpg", '"v1"')
+        finally:
+            await cache.close()
+
+    assert asyncio.run(run()) == (True, '"v1"')
+    assert seen[0].method == "HEAD"
+    assert seen[0].headers["if-none-match"] == '"v1"'
+
+
+# ---------------------------
+#  SingleFlight
+# ---------------------------
+
+def test_concurrent_calls_share_one_flight():
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+        assert flight.coalesced == 4
+        assert await flight.do("k", work) == "result"  # finished flights are not reused
+        return results
+
+    assert asyncio.run(run()) == ["result"] * 5
+    assert calls == 2
+
+
+def test_errors_reach_every_waiter():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def run():
+        flight = SingleFlight()
+        return await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert [str(e) for e in results] == ["boom", "boom"]
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def run():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "result"
+
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await second == "result"
+        assert first.cancelled()
+
+    asyncio.run(run())
+
+
+# ---------------------------
+#  TTLCache
+# ---------------------------
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(request_cache.time, "monotonic", lambda: now[0])
+    cache = TTLCache(ttl=10, max_entries=10)
+
+    cache.put("k", "value", '"etag"')
+    now[0] += 10
+    assert cache.get("k") == ("value", '"etag"')
+    now[0] += 0.1
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (1, None)
+    assert cache.get("c") == (3, None)
@@ -0,0 +1,53 @@
+# test_vector_store.py
+
+import numpy as np
+import pytest
+
+from chunks.vector_store import VectorStore
+
+
+def _vectors(n: int, dim: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def test_reopen_drops_rows_written_without_metadata(tmp_path):
+    store = VectorStore(str(tmp_path), dim=8)
+    store.add("a", _vectors(3, 8, 0), [(0, 1)] * 3)
+
+    # Crash after the vectors and alive bytes were appended, before meta.jsonl.
+    with open(tmp_path / "vectors.f32", "ab") as f:
+        f.write(np.zeros((2, 8), dtype=np.float32).tobytes())
+    with open(tmp_path / "alive.u8", "ab") as f:
+        f.write(b"\x01" * 2)
+
+    store = VectorStore(str(tmp_path))
+    assert len(store) == 3
+    b = _vectors(1, 8, 2)
+    store.add("b", b, [(0, 1)])
+
+    score, meta = store.search(b[0], k=1)[0][0]
+    assert meta["doc_id"] == "b"
+    assert score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_reopen_drops_torn_metadata_line(tmp_path):
+    store = VectorStore(str(tmp_path), dim=4)
+    store.add("a", _vectors(2, 4, 0), [(0, 1)] * 2)
+    with open(tmp_path / "meta.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"doc_id":"b","sta')
+
+    store = VectorStore(str(tmp_path))
+    assert len(store) == 2
+    store.add("c", _vectors(1, 4, 1), [(0, 1)])
+    assert len(VectorStore(str(tmp_path))) == 3
+
+
+def test_reopen_skips_deleted_rows(tmp_path):
+    store = VectorStore(str(tmp_path), dim=4)
+    store.add("a", _vectors(2, 4, 0), [(0, 1)] * 2)
+    store.add("b", _vectors(1, 4, 1), [(0, 1)])
+    assert store.delete("a") == 2
+
+    store = VectorStore(str(tmp_path))
+    assert store.delete("a") == 0
+    assert store.delete("b") == 1
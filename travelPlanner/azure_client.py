@@ -1,10 +1,17 @@
 import os
 import json
-from typing import Any, Dict, List
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
 from dotenv import load_dotenv
 
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects import AIProjectClient
+import startup_profile
+from azure_outbound import close_on_owner_loop, get_endpoint
+from metrics import timed
+from travelPlanner.json_stream import JsonStringFieldStream
+from travelPlanner.payload_packer import pack_chat_payload
 
 load_dotenv()
 
@@ -13,20 +20,219 @@ AZURE_AI_PROJECT_ENDPOINT = os.getenv("AZURE_EXISTING_AIPROJECT_ENDPOINT")
 AZURE_AI_EXTRACT_AGENT_NAME = "travel-extract-agent"
 AZURE_AI_CHAT_AGENT_NAME = "travel-chat-agent"
 
-if not AZURE_AI_PROJECT_ENDPOINT:
-    raise RuntimeError("AZURE_EXISTING_AIPROJECT_ENDPOINT is not set")
+# Per-process limits for the async path: agent calls in flight, and HTTP connections.
+AZURE_AI_AGENT_MAX_CONCURRENCY = int(os.getenv("AZURE_AI_AGENT_MAX_CONCURRENCY", "16"))
+AZURE_AI_AGENT_MAX_CONNECTIONS = int(os.getenv("AZURE_AI_AGENT_MAX_CONNECTIONS", "32"))
+
+# How long a fetched agent definition is served from memory.
+AZURE_AI_AGENT_CACHE_TTL = float(os.getenv("AZURE_AI_AGENT_CACHE_TTL", "300"))
+
+
+def _require_endpoint() -> str:
+    if not AZURE_AI_PROJECT_ENDPOINT:
+        raise RuntimeError("AZURE_EXISTING_AIPROJECT_ENDPOINT is not set")
+    return AZURE_AI_PROJECT_ENDPOINT
+
+
+# ---------------------------
+#  Sync clients (created on first use)
+# ---------------------------
+# The Azure SDKs are imported and DefaultAzureCredential is built only when the
+# first agent call needs them, which keeps app import and cold start fast.
+
+_project_client = None
+_openai_client = None
+_sync_clients_lock = threading.Lock()
+
+
+def _get_sync_clients():
+    """
+    Return the shared (project client, OpenAI client), creating them once.
+    """
+    global _project_client, _openai_client
+
+    if _openai_client is None:
+        with _sync_clients_lock:
+            if _openai_client is None:
+                with startup_profile.timed_init("azure_client.sync_clients"):
+                    from azure.identity import DefaultAzureCredential
+                    from azure.ai.projects import AIProjectClient
+
+                    # Single project client (reused)
+                    project_client = AIProjectClient(
+                        endpoint=_require_endpoint(),
+                        credential=DefaultAzureCredential(),
+                    )
+                    # Retries are owned by the shared outbound layer (azure_outbound).
+                    _openai_client = project_client.get_openai_client(max_retries=0)
+                    _project_client = project_client
+    return _project_client, _openai_client
+
+
+# ---------------------------
+#  Agent definition cache
+# ---------------------------
+
+class AgentCache:
+    """
+    TTL cache of agent definitions shared by the sync and async paths.
+
+    - fresh entries are served from memory
+    - entries past `refresh_after` (a fraction of the TTL) are still served, and a
+      background refresh is started
+    - expired entries are fetched inline; if that fetch fails, the last known
+      definition is served instead of failing the request
+    """
+
+    def __init__(self, ttl: float = AZURE_AI_AGENT_CACHE_TTL, refresh_after: float = 0.8):
+        self.ttl = ttl
+        self.refresh_after = ttl * refresh_after
+        self._entries: Dict[str, Tuple[Any, float]] = {}
+        self._refreshing: Set[str] = set()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.stale_served = 0
+
+    def invalidate(self, agent_name: Optional[str] = None) -> None:
+        """
+        Drop one agent (or all agents) so the next call fetches it again.
+        """
+        with self._lock:
+            if agent_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(agent_name, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "stale_served": self.stale_served,
+            }
+
+    def _lookup(self, agent_name: str) -> Tuple[Optional[Any], bool]:
+        """Return (cached agent or None, whether a background refresh should start)."""
+        with self._lock:
+            entry = self._entries.get(agent_name)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            agent, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            if age > self.ttl:
+                self.misses += 1
+                return None, False
+            self.hits += 1
+            start_refresh = age > self.refresh_after and agent_name not in self._refreshing
+            if start_refresh:
+                self._refreshing.add(agent_name)
+            return agent, start_refresh
+
+    def _store(self, agent_name: str, agent: Any) -> None:
+        with self._lock:
+            self._entries[agent_name] = (agent, time.monotonic())
+            self.refreshes += 1
+
+    def _fallback(self, agent_name: str, error: Exception) -> Any:
+        with self._lock:
+            self.refresh_failures += 1
+            entry = self._entries.get(agent_name)
+            if entry is None:
+                raise error
+            self.stale_served += 1
+            # Keep serving it, retrying in the background rather than inline.
+            self._entries[agent_name] = (entry[0], time.monotonic() - self.refresh_after)
+            return entry[0]
+
+    def _refresh_done(self, agent_name: str) -> None:
+        with self._lock:
+            self._refreshing.discard(agent_name)
+
+    def get(self, agent_name: str, fetch: Callable[[str], Any]) -> Any:
+        agent, start_refresh = self._lookup(agent_name)
+        if agent is not None:
+            if start_refresh:
+                threading.Thread(
+                    target=self._refresh, args=(agent_name, fetch), daemon=True
+                ).start()
+            return agent
+
+        try:
+            agent = fetch(agent_name)
+        except Exception as e:
+            return self._fallback(agent_name, e)
+        self._store(agent_name, agent)
+        return agent
 
-# Single project client (reused)
-_project_client = AIProjectClient(
-    endpoint=AZURE_AI_PROJECT_ENDPOINT,
-    credential=DefaultAzureCredential(),
-)
+    def _refresh(self, agent_name: str, fetch: Callable[[str], Any]) -> None:
+        try:
+            self._store(agent_name, fetch(agent_name))
+        except Exception:
+            with self._lock:
+                self.refresh_failures += 1
+        finally:
+            self._refresh_done(agent_name)
 
-_openai_client = _project_client.get_openai_client()
+    async def get_async(self, agent_name: str, fetch: Callable[[str], Awaitable[Any]]) -> Any:
+        agent, start_refresh = self._lookup(agent_name)
+        if agent is not None:
+            if start_refresh:
+                task = asyncio.create_task(self._refresh_async(agent_name, fetch))
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+            return agent
+
+        try:
+            agent = await fetch(agent_name)
+        except Exception as e:
+            return self._fallback(agent_name, e)
+        self._store(agent_name, agent)
+        return agent
+
+    async def _refresh_async(self, agent_name: str, fetch: Callable[[str], Awaitable[Any]]) -> None:
+        try:
+            self._store(agent_name, await fetch(agent_name))
+        except Exception:
+            with self._lock:
+                self.refresh_failures += 1
+        finally:
+            self._refresh_done(agent_name)
+
+
+agent_cache = AgentCache()
+_background_tasks: Set[asyncio.Task] = set()
 
 
 def _get_agent(agent_name: str):
-    return _project_client.agents.get(agent_name=agent_name)
+    with timed("agent.lookup"):
+        return agent_cache.get(
+            agent_name,
+            lambda name: _get_sync_clients()[0].agents.get(agent_name=name),
+        )
+
+
+def _agent_request(agent_name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the responses.create() arguments that send `payload` as a single
+    JSON user message to the named agent.
+    """
+    return {
+        "input": [
+            {
+                "role": "user",
+                "content": json.dumps(payload),
+            }
+        ],
+        "extra_body": {"agent": {"name": agent_name, "type": "agent_reference"}},
+    }
 
 
 def call_extract_agent(image_url: str) -> Dict[str, Any]:
@@ -43,20 +249,16 @@ def call_extract_agent(image_url: str) -> Dict[str, Any]:
         "imageUrl": image_url
     }
 
-    response = _openai_client.responses.create(
-        input=[
-            {
-                "role": "user",
-                "content": json.dumps(payload),
-            }
-        ],
-        extra_body={"agent": {"name": agent.name, "type": "agent_reference"}},
-    )
+    with timed("agent.responses_create"):
+        response = get_endpoint("agents").call(
+            _get_sync_clients()[1].responses.create, **_agent_request(agent.name, payload)
+        )
 
     # In the code sample they used response.output_text (string).
     # That should be the JSON string we want to parse.
     text = response.output_text
-    return json.loads(text)
+    with timed("agent.parse"):
+        return json.loads(text)
 
 
 def call_chat_agent(memories: List[Dict[str, Any]], question: str) -> Dict[str, Any]:
@@ -65,25 +267,199 @@ def call_chat_agent(memories: List[Dict[str, Any]], question: str) -> Dict[str,
     Agent returns:
     {
       "responseText": "...",
-      "matches": [ ...subset of memories... ]
+      "matches": [ ...ids of the matching memories... ]
     }
+
+    Memories are sent in the compact, token-budgeted format from
+    payload_packer, which keeps each memory's id. Matches given as ids, as
+    packed rows or as memory objects (the agent's older "subset of memories"
+    answer) are all mapped back to the original memory dicts; packing stats
+    are returned under "payload".
     """
     agent = _get_agent(AZURE_AI_CHAT_AGENT_NAME)
 
-    payload = {
-        "memories": memories,
-        "question": question,
-    }
+    with timed("agent.pack_payload"):
+        packed = pack_chat_payload(memories, question)
 
-    response = _openai_client.responses.create(
-        input=[
-            {
-                "role": "user",
-                "content": json.dumps(payload),
-            }
-        ],
-        extra_body={"agent": {"name": agent.name, "type": "agent_reference"}},
-    )
+    with timed("agent.responses_create"):
+        response = get_endpoint("agents").call(
+            _get_sync_clients()[1].responses.create, **_agent_request(agent.name, packed.payload)
+        )
 
     text = response.output_text
-    return json.loads(text)
+    with timed("agent.parse"):
+        return _unpack_chat_result(json.loads(text), packed)
+
+
+def _unpack_chat_result(result: Dict[str, Any], packed) -> Dict[str, Any]:
+    result["matches"] = packed.unpack_matches(result.get("matches"))
+    result["payload"] = packed.stats
+    return result
+
+
+# ---------------------------
+#  Async client path
+# ---------------------------
+# One async project client + AsyncOpenAI client per process, bound to the event
+# loop that created them and sharing one bounded httpx connection pool.
+
+class _AsyncClients:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        import httpx
+        from azure.identity.aio import DefaultAzureCredential as AsyncDefaultAzureCredential
+        from azure.ai.projects.aio import AIProjectClient as AsyncAIProjectClient
+
+        self.loop = loop
+        self.credential = AsyncDefaultAzureCredential()
+        self.project_client = AsyncAIProjectClient(
+            endpoint=_require_endpoint(),
+            credential=self.credential,
+        )
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=AZURE_AI_AGENT_MAX_CONNECTIONS,
+                max_keepalive_connections=AZURE_AI_AGENT_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(120.0, connect=10.0),
+        )
+        self.openai_client = self.project_client.get_openai_client(
+            http_client=self.http_client,
+            max_retries=0,
+        )
+        self.semaphore = asyncio.Semaphore(AZURE_AI_AGENT_MAX_CONCURRENCY)
+
+    async def close(self) -> None:
+        await self.openai_client.close()
+        await self.http_client.aclose()
+        await self.project_client.close()
+        await self.credential.close()
+
+
+_async_clients: Optional[_AsyncClients] = None
+_async_clients_lock = threading.Lock()
+
+
+def _get_async_clients() -> _AsyncClients:
+    global _async_clients
+
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        if _async_clients is None or _async_clients.loop is not loop:
+            # Clients of another loop cannot be reused; close them so their
+            # httpx pool and credential sessions do not leak.
+            if _async_clients is not None:
+                close_on_owner_loop(_async_clients.loop, _async_clients.close)
+            with startup_profile.timed_init("azure_client.async_clients"):
+                _async_clients = _AsyncClients(loop)
+        return _async_clients
+
+
+async def close_async_clients() -> None:
+    """
+    Close the shared async clients and their connection pool (call on app shutdown).
+    """
+    global _async_clients
+
+    with _async_clients_lock:
+        clients, _async_clients = _async_clients, None
+    if clients is not None:
+        await clients.close()
+
+
+async def _call_agent_async(agent_name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    clients = _get_async_clients()
+    async with clients.semaphore:
+        with timed("agent.lookup"):
+            agent = await agent_cache.get_async(
+                agent_name,
+                lambda name: clients.project_client.agents.get(agent_name=name),
+            )
+        with timed("agent.responses_create"):
+            response = await get_endpoint("agents").call_async(
+                clients.openai_client.responses.create,
+                **_agent_request(agent.name, payload),
+            )
+    with timed("agent.parse"):
+        return json.loads(response.output_text)
+
+
+async def call_extract_agent_async(image_url: str) -> Dict[str, Any]:
+    """
+    Async variant of call_extract_agent(); does not block the event loop.
+    """
+    return await _call_agent_async(AZURE_AI_EXTRACT_AGENT_NAME, {"imageUrl": image_url})
+
+
+async def call_chat_agent_async(memories: List[Dict[str, Any]], question: str) -> Dict[str, Any]:
+    """
+    Async variant of call_chat_agent(); does not block the event loop.
+    """
+    with timed("agent.pack_payload"):
+        packed = pack_chat_payload(memories, question)
+    result = await _call_agent_async(AZURE_AI_CHAT_AGENT_NAME, packed.payload)
+    return _unpack_chat_result(result, packed)
+
+
+async def stream_chat_agent_async(
+    memories: List[Dict[str, Any]],
+    question: str,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of call_chat_agent_async() using the Responses streaming API.
+
+    Yields ("delta", text) as pieces of responseText arrive, then one
+    ("result", {responseText, matches, payload}) once the full output is parsed.
+    Consume it with contextlib.aclosing() so stopping early closes the stream.
+    """
+    clients = _get_async_clients()
+    with timed("agent.pack_payload"):
+        packed = pack_chat_payload(memories, question)
+    response_text = JsonStringFieldStream("responseText")
+    output: List[str] = []
+
+    # The semaphore covers opening the stream only, so a slow reader does not
+    # hold a slot for the whole generation.
+    async with clients.semaphore:
+        with timed("agent.lookup"):
+            agent = await agent_cache.get_async(
+                AZURE_AI_CHAT_AGENT_NAME,
+                lambda name: clients.project_client.agents.get(agent_name=name),
+            )
+        # Only opening the stream is retried; a stream that fails midway is not.
+        with timed("agent.stream_open"):
+            stream = await get_endpoint("agents").call_async(
+                clients.openai_client.responses.create,
+                stream=True,
+                **_agent_request(agent.name, packed.payload),
+            )
+
+    # Closed on every exit, including a client disconnect (the generator is
+    # closed or cancelled) and errors, so the HTTP connection goes back to the pool.
+    try:
+        async for event in stream:
+            if event.type == "response.output_text.delta":
+                output.append(event.delta)
+                text = response_text.feed(event.delta)
+                if text:
+                    yield "delta", text
+            elif event.type in ("response.failed", "error"):
+                raise RuntimeError(f"Chat agent stream failed: {event}")
+    finally:
+        await stream.close()
+
+    with timed("agent.parse"):
+        result = _unpack_chat_result(json.loads("".join(output)), packed)
+    yield "result", result
+
+
+async def warm_up_async() -> None:
+    """
+    Build the async clients and prefetch both agent definitions, so the first
+    user request does not pay for SDK imports, credential discovery or agent lookup.
+    """
+    clients = _get_async_clients()
+    for agent_name in (AZURE_AI_EXTRACT_AGENT_NAME, AZURE_AI_CHAT_AGENT_NAME):
+        await agent_cache.get_async(
+            agent_name,
+            lambda name: clients.project_client.agents.get(agent_name=name),
+        )
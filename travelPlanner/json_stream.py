@@ -0,0 +1,69 @@
+import json
+import re
+from typing import List
+
+
+class JsonStringFieldStream:
+    """
+    Incrementally decodes the value of one top-level string field from a JSON
+    document that arrives in fragments, e.g. '{"responseText": "Hel' + 'lo", ...'.
+
+    feed() returns the newly decoded characters of the field's value (possibly "").
+    Escape sequences split across fragments are buffered until complete.
+    """
+
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self, field: str):
+        self._key_re = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ""
+        self._in_value = False
+        self.done = False
+
+    def feed(self, fragment: str) -> str:
+        if self.done:
+            return ""
+        self._buffer += fragment
+
+        if not self._in_value:
+            match = self._key_re.search(self._buffer)
+            if match is None:
+                # Keep only a tail long enough to still hold a split key.
+                self._buffer = self._buffer[-(len(self._key_re.pattern) + 16):]
+                return ""
+            self._buffer = self._buffer[match.end():]
+            self._in_value = True
+
+        out: List[str] = []
+        i = 0
+        buf = self._buffer
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self.done = True
+                i = len(buf)
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            if i + 1 >= len(buf):
+                break  # wait for the escaped character
+            code = buf[i + 1]
+            if code != "u":
+                out.append(self._ESCAPES.get(code, code))
+                i += 2
+                continue
+            if i + 6 > len(buf):
+                break  # wait for the 4 hex digits
+            # \uXXXX, possibly the first half of a surrogate pair.
+            unit = buf[i:i + 6]
+            if 0xD800 <= int(unit[2:], 16) <= 0xDBFF:
+                if i + 12 > len(buf):
+                    break
+                unit = buf[i:i + 12]
+            out.append(json.loads(f'"{unit}"'))
+            i += len(unit)
+
+        self._buffer = buf[i:]
+        return "".join(out)
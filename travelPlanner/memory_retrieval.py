@@ -0,0 +1,119 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from chunks.embedding_utils import generate_embeddings
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Memories forwarded to the chat agent; 0 disables the pre-filter.
+CHAT_MEMORY_TOP_K = int(os.getenv("CHAT_MEMORY_TOP_K", "20"))
+MEMORY_VECTOR_CACHE_SIZE = int(os.getenv("MEMORY_VECTOR_CACHE_SIZE", "100000"))
+
+
+def memory_text(memory: Dict[str, Any]) -> str:
+    """
+    Text that represents a memory for retrieval.
+    """
+    return " | ".join(
+        str(memory.get(field) or "")
+        for field in ("placeName", "city", "notes", "aiDescription")
+    )
+
+
+class MemoryVectorCache:
+    """
+    In-process LRU of memory embeddings keyed by (id, createdAt), so a memory is
+    embedded once and re-embedded only if the client sends a new version of it.
+    """
+
+    def __init__(self, max_entries: int = MEMORY_VECTOR_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._vectors: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str]):
+        vector = self._vectors.get(key)
+        if vector is not None:
+            self._vectors.move_to_end(key)
+        return vector
+
+    def put(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        self._vectors[key] = vector
+        self._vectors.move_to_end(key)
+        while len(self._vectors) > self.max_entries:
+            self._vectors.popitem(last=False)
+
+
+memory_vectors = MemoryVectorCache()
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(v))
+    return v / norm if norm else v
+
+
+async def select_memories(
+    memories: List[Dict[str, Any]],
+    question: str,
+    top_k: int = CHAT_MEMORY_TOP_K,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Rank memories by cosine similarity to the question and keep the top_k,
+    most relevant first, so anything trimmed later (payload_packer drops rows
+    from the end) is the least relevant.
+
+    Returns (selected memories, report) where the report has the counts and
+    per-stage timings in milliseconds. When there are no more than top_k
+    memories, all of them are returned without embedding anything. If the
+    embeddings call fails (not configured, service down), all memories are
+    returned and the report carries the error.
+    """
+    report: Dict[str, Any] = {"considered": len(memories), "forwarded": len(memories), "timings_ms": {}}
+    if top_k <= 0 or len(memories) <= top_k:
+        return memories, report
+
+    timings = report["timings_ms"]
+    t0 = time.perf_counter()
+
+    keys = [(str(m.get("id")), str(m.get("createdAt"))) for m in memories]
+    cached = [memory_vectors.get(key) for key in keys]
+    missing = [i for i, vector in enumerate(cached) if vector is None]
+    t1 = time.perf_counter()
+    timings["cache_lookup"] = (t1 - t0) * 1000
+
+    texts = [question] + [memory_text(memories[i]) for i in missing]
+    try:
+        vectors = await generate_embeddings(texts)
+    except Exception as e:
+        # The pre-filter is an optimization: without it the agent still gets every memory.
+        logger.warning("Memory pre-filter disabled for this request: %s", e, exc_info=True)
+        report["error"] = str(e)
+        return memories, report
+    t2 = time.perf_counter()
+    timings["embed"] = (t2 - t1) * 1000
+
+    question_vector = _unit(vectors[0])
+    for i, vector in zip(missing, vectors[1:]):
+        cached[i] = _unit(vector)
+        memory_vectors.put(keys[i], cached[i])
+
+    scores = np.stack(cached) @ question_vector
+    top = np.argpartition(-scores, top_k - 1)[:top_k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    selected = [memories[i] for i in top]
+    t3 = time.perf_counter()
+    timings["rank"] = (t3 - t2) * 1000
+
+    report["forwarded"] = len(selected)
+    report["embedded"] = len(missing)
+    timings = {k: round(v, 2) for k, v in timings.items()}
+    report["timings_ms"] = timings
+    return selected, report
@@ -0,0 +1,178 @@
+import os
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHAT_PAYLOAD_TOKEN_BUDGET = int(os.getenv("CHAT_PAYLOAD_TOKEN_BUDGET", "6000"))
+
+PACKED_COLUMNS = ["id", "placeName", "city", "category", "notes", "aiDescription"]
+
+PACKED_FORMAT = (
+    "memories are rows of [id, placeName, city, category, notes, aiDescription], "
+    "most relevant first; city and category are indexes into the cities and "
+    "categories lists; text ending in '…' was truncated. Return matches as a "
+    "list of memory ids."
+)
+
+# Trimming steps tried in order until the payload fits the budget:
+# (max aiDescription chars, max notes chars); None means keep in full.
+_TRIM_LEVELS: List[Tuple[Optional[int], Optional[int]]] = [
+    (None, None),
+    (240, None),
+    (120, 240),
+    (60, 120),
+    (0, 80),
+    (0, 0),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English/JSON).
+    """
+    return (len(text) + 3) // 4
+
+
+def _truncate(text: str, limit: Optional[int]) -> str:
+    if limit is None or len(text) <= limit:
+        return text
+    if limit == 0:
+        return ""
+    return text[:limit - 1].rstrip() + "…"
+
+
+def _dumps(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+class PackedChatPayload:
+    """
+    Compact chat payload plus what is needed to map the agent's answer back.
+    """
+
+    def __init__(self, payload: Dict[str, Any], memories: List[Dict[str, Any]], stats: Dict[str, Any]):
+        self.payload = payload
+        self.memories = memories  # original memories, in the order they were packed
+        self.stats = stats
+
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_place: Dict[str, List[Dict[str, Any]]] = {}
+        for m in memories:
+            if m.get("id") is not None:
+                self._by_id.setdefault(str(m["id"]), m)
+            self._by_place.setdefault(_place_key(m.get("placeName")), []).append(m)
+
+    def unpack_matches(self, matches: Any) -> List[Dict[str, Any]]:
+        """
+        Map the agent's matches back to the original memory dicts. Accepts ids,
+        rows as sent ([id, placeName, ...]) and memory objects, which are
+        matched by "id" or, failing that, by placeName and city. Unknown
+        matches are skipped and duplicates are kept once.
+        """
+        resolved: List[Dict[str, Any]] = []
+        seen = set()
+
+        for match in matches or []:
+            memory = self._resolve(match)
+            if memory is not None and id(memory) not in seen:
+                seen.add(id(memory))
+                resolved.append(memory)
+        return resolved
+
+    def _resolve(self, match: Any) -> Optional[Dict[str, Any]]:
+        if isinstance(match, dict):
+            memory = self._by_id.get(str(match.get("id")))
+            if memory is None:
+                memory = self._match_place(match.get("placeName"), match.get("city"))
+            return memory
+        if isinstance(match, (list, tuple)):
+            if not match:
+                return None
+            memory = self._by_id.get(str(match[0]))
+            if memory is None and len(match) > 1:
+                memory = self._match_place(match[1], None)
+            return memory
+        return self._by_id.get(str(match))
+
+    def _match_place(self, place_name: Any, city: Any) -> Optional[Dict[str, Any]]:
+        candidates = self._by_place.get(_place_key(place_name)) if place_name else None
+        if not candidates:
+            return None
+        if city:
+            for m in candidates:
+                if _place_key(m.get("city")) == _place_key(city):
+                    return m
+        return candidates[0]
+
+
+def _place_key(value: Any) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+
+def pack_chat_payload(
+    memories: List[Dict[str, Any]],
+    question: str,
+    token_budget: int = CHAT_PAYLOAD_TOKEN_BUDGET,
+) -> PackedChatPayload:
+    """
+    Encode memories as columnar rows with deduplicated city/category tables and
+    no createdAt. If the result is over `token_budget`, aiDescription and notes
+    are truncated and then dropped, and as a last resort the last memories are
+    left out; pass memories most relevant first (select_memories() returns them
+    that way) so those are the least relevant ones.
+    """
+    original_tokens = estimate_tokens(_dumps({"memories": memories, "question": question}))
+
+    cities: Dict[str, int] = {}
+    categories: Dict[str, int] = {}
+    base_rows = []
+    for m in memories:
+        city = cities.setdefault(str(m.get("city") or ""), len(cities))
+        category = categories.setdefault(str(m.get("category") or ""), len(categories))
+        base_rows.append((str(m.get("id") or ""), str(m.get("placeName") or ""), city, category,
+                          str(m.get("notes") or ""), str(m.get("aiDescription") or "")))
+
+    def build(level: Tuple[Optional[int], Optional[int]], count: int) -> Dict[str, Any]:
+        description_limit, notes_limit = level
+        return {
+            "question": question,
+            "format": PACKED_FORMAT,
+            "cols": PACKED_COLUMNS,
+            "cities": list(cities),
+            "categories": list(categories),
+            "rows": [
+                [memory_id, place, city, category, _truncate(notes, notes_limit), _truncate(description, description_limit)]
+                for memory_id, place, city, category, notes, description in base_rows[:count]
+            ],
+        }
+
+    payload = None
+    level = _TRIM_LEVELS[-1]
+    for level in _TRIM_LEVELS:
+        payload = build(level, len(base_rows))
+        if estimate_tokens(_dumps(payload)) <= token_budget:
+            break
+    else:
+        # Even the leanest encoding is too big: binary search the row count.
+        low, high = 0, len(base_rows)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if estimate_tokens(_dumps(build(level, mid))) <= token_budget:
+                low = mid
+            else:
+                high = mid - 1
+        payload = build(level, low)
+
+    packed_tokens = estimate_tokens(_dumps(payload))
+    stats = {
+        "original_tokens": original_tokens,
+        "packed_tokens": packed_tokens,
+        "tokens_saved": original_tokens - packed_tokens,
+        "memories_sent": len(payload["rows"]),
+        "memories_dropped": len(base_rows) - len(payload["rows"]),
+        "trim_level": _TRIM_LEVELS.index(level),
+    }
+    return PackedChatPayload(payload, memories, stats)
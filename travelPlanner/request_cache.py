@@ -0,0 +1,203 @@
+import os
+import time
+import socket
+import asyncio
+import ipaddress
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EXTRACT_CACHE_TTL = float(os.getenv("EXTRACT_CACHE_TTL", "3600"))
+EXTRACT_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACT_CACHE_MAX_ENTRIES", "1024"))
+EXTRACT_CACHE_VALIDATE_ETAG = os.getenv("EXTRACT_CACHE_VALIDATE_ETAG", "0").lower() in ("1", "true", "yes")
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_image_url(url: str) -> str:
+    """
+    Canonical form of an image URL used as the cache key: lowercase scheme and
+    host, no default port, no fragment, query parameters sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+async def is_public_http_url(url: str) -> bool:
+    """
+    True if `url` is http(s) and its host resolves only to public addresses,
+    so a request to it cannot reach loopback, private, link-local (cloud
+    metadata) or other internal services.
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return False
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            parts.hostname, parts.port or _DEFAULT_PORTS[scheme], type=socket.SOCK_STREAM,
+        )
+        addresses = [ipaddress.ip_address(info[4][0]) for info in infos]
+    except (OSError, ValueError):
+        return False
+    for address in addresses:
+        if getattr(address, "ipv4_mapped", None):
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            return False
+    return bool(addresses)
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; concurrent callers for the same key
+    await the same result (or exception).
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded: one caller disconnecting must not cancel the shared call.
+        return await asyncio.shield(task)
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after `ttl` seconds.
+    Each entry carries an optional validator (e.g. an ETag).
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[str], float]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, Optional[str]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, validator, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value, validator
+
+    def put(self, key: Hashable, value: Any, validator: Optional[str] = None) -> None:
+        self._entries[key] = (value, validator, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ExtractResultCache:
+    """
+    Result cache + request coalescing for extract calls, keyed by normalized image URL.
+
+    With `validate_etag`, the image's ETag is recorded when a result is stored,
+    and a cached result is only reused while a conditional HEAD request still
+    answers 304 Not Modified (or the server gives no ETag to compare).
+    Image URLs come from users, so HEAD requests only go to public http(s)
+    hosts and redirects are not followed.
+    """
+
+    def __init__(
+        self,
+        ttl: float = EXTRACT_CACHE_TTL,
+        max_entries: int = EXTRACT_CACHE_MAX_ENTRIES,
+        validate_etag: bool = EXTRACT_CACHE_VALIDATE_ETAG,
+    ):
+        self.cache = TTLCache(ttl, max_entries)
+        self.flight = SingleFlight()
+        self.validate_etag = validate_etag
+        self._http: Optional[httpx.AsyncClient] = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.flight.coalesced,
+            "entries": len(self.cache),
+        }
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=5.0, follow_redirects=False)
+        return self._http
+
+    async def close(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _fetch_etag(self, url: str, known: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Return (unchanged, etag) from a HEAD request; network errors and URLs
+        that are not public http(s) count as unchanged.
+        """
+        if not await is_public_http_url(url):
+            return True, known
+        headers = {"If-None-Match": known} if known else {}
+        try:
+            response = await self._client().head(url, headers=headers)
+        except httpx.HTTPError:
+            return True, known
+        if response.status_code == 304:
+            return True, known
+        etag = response.headers.get("etag")
+        return (known is None or etag is None or etag == known), etag
+
+    async def get_or_compute(self, url: str, compute: Callable[[str], Awaitable[Any]]) -> Any:
+        key = normalize_image_url(url)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            value, etag = cached
+            if not self.validate_etag or etag is None:
+                self.hits += 1
+                return value
+            unchanged, _ = await self._fetch_etag(url, etag)
+            if unchanged:
+                self.hits += 1
+                return value
+            self.cache.invalidate(key)
+
+        self.misses += 1
+
+        async def run() -> Any:
+            if self.validate_etag:
+                value, (_, etag) = await asyncio.gather(compute(url), self._fetch_etag(url))
+            else:
+                value, etag = await compute(url), None
+            self.cache.put(key, value, etag)
+            return value
+
+        return await self.flight.do(key, run)
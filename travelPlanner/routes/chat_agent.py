@@ -1,7 +1,13 @@
+import json
+import time
+from contextlib import aclosing
 from typing import List
 from pydantic import BaseModel
 from fastapi import HTTPException
-from travelPlanner.azure_client import call_chat_agent
+from fastapi.responses import StreamingResponse
+from metrics import timed
+from travelPlanner.azure_client import call_chat_agent_async, stream_chat_agent_async
+from travelPlanner.memory_retrieval import select_memories
 from main import app
 
 class Memory(BaseModel):
@@ -20,10 +26,61 @@ class ChatRequest(BaseModel):
 @app.post("/api/chat")
 async def chat_with_memories(req: ChatRequest):
     try:
-        result = call_chat_agent(
-            memories=[m.model_dump() for m in req.memories],
+        # Only the memories most relevant to the question go to the agent.
+        with timed("chat.select_memories"):
+            memories, retrieval = await select_memories(
+                [m.model_dump() for m in req.memories],
+                req.question,
+            )
+        start = time.perf_counter()
+        result = await call_chat_agent_async(
+            memories=memories,
             question=req.question,
         )
-        return result  # already { responseText, matches }
+        retrieval["timings_ms"]["agent"] = round((time.perf_counter() - start) * 1000, 2)
+        result["retrieval"] = retrieval
+        return result  # { responseText, matches, payload, retrieval }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat failed: {e}")
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/chat/stream")
+async def stream_chat_with_memories(req: ChatRequest):
+    """
+    Server-Sent Events version of /api/chat:
+    - "delta" events carry {"text": ...} pieces of responseText as they are generated
+    - one final "result" event carries { responseText, matches, payload, retrieval }
+    - an "error" event replaces "result" if the call fails
+    """
+    async def events():
+        # Flush headers right away so the client sees the first byte immediately.
+        yield ": stream open\n\n"
+        try:
+            with timed("chat.select_memories"):
+                memories, retrieval = await select_memories(
+                    [m.model_dump() for m in req.memories],
+                    req.question,
+                )
+            start = time.perf_counter()
+            async with aclosing(stream_chat_agent_async(memories, req.question)) as agent_events:
+                async for kind, data in agent_events:
+                    if kind == "delta":
+                        if "first_delta" not in retrieval["timings_ms"]:
+                            retrieval["timings_ms"]["first_delta"] = round((time.perf_counter() - start) * 1000, 2)
+                        yield _sse("delta", {"text": data})
+                    else:
+                        retrieval["timings_ms"]["agent"] = round((time.perf_counter() - start) * 1000, 2)
+                        data["retrieval"] = retrieval
+                        yield _sse("result", data)
+        except Exception as e:
+            yield _sse("error", {"detail": f"Chat failed: {e}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,13 +1,34 @@
+import os
+import json
+import asyncio
+from typing import Dict, List, Optional
+
 from fastapi import HTTPException
-from pydantic import BaseModel, HttpUrl
-from travelPlanner.azure_client import call_extract_agent
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, HttpUrl
+from azure_outbound import get_endpoint
+from metrics import timed
+from travelPlanner.azure_client import call_extract_agent_async
+from travelPlanner.request_cache import ExtractResultCache, normalize_image_url
 from main import app
 
+# Agent calls in flight per batch. 0 (the default) follows the "agents" outbound
+# endpoint's maximum (OUTBOUND_AGENTS_MAX_CONCURRENCY); within that, the
+# endpoint's adaptive limit decides how many run, backing off on throttling.
+EXTRACT_BATCH_MAX_CONCURRENCY = int(os.getenv("EXTRACT_BATCH_MAX_CONCURRENCY", "0"))
+EXTRACT_BATCH_MAX_ITEMS = int(os.getenv("EXTRACT_BATCH_MAX_ITEMS", "500"))
+
 
 class ExtractRequest(BaseModel):
     imageUrl: HttpUrl
 
 
+class ExtractBatchRequest(BaseModel):
+    imageUrls: List[HttpUrl] = Field(max_length=EXTRACT_BATCH_MAX_ITEMS)
+    # Agent calls in flight for this batch; capped by _batch_concurrency().
+    concurrency: Optional[int] = Field(default=None, ge=1)
+
+
 class ExtractResponse(BaseModel):
     placeName: str
     city: str
@@ -16,12 +37,78 @@ class ExtractResponse(BaseModel):
     aiDescription: str
 
 
+# Completed results by normalized imageUrl; concurrent requests for the same
+# image share one agent call.
+extract_cache = ExtractResultCache()
+
+
+async def _extract(image_url: str) -> ExtractResponse:
+    result = await call_extract_agent_async(image_url)
+    # result should already be a dict with correct keys
+    with timed("extract.validate"):
+        return ExtractResponse(**result)
+
+
 @app.post("/api/extract", response_model=ExtractResponse)
 async def extract_memory(req: ExtractRequest):
     try:
-        result = call_extract_agent(str(req.imageUrl))
-        # result should already be a dict with correct keys
-        return ExtractResponse(**result)
+        return await extract_cache.get_or_compute(str(req.imageUrl), _extract)
     except Exception as e:
         # You can log e here
         raise HTTPException(status_code=500, detail=f"Failed to extract details: {e}")
+
+
+def _batch_concurrency(requested: Optional[int]) -> int:
+    cap = EXTRACT_BATCH_MAX_CONCURRENCY or get_endpoint("agents").concurrency.maximum
+    return min(requested or cap, cap)
+
+
+@app.post("/api/extract/batch")
+async def extract_batch(req: ExtractBatchRequest):
+    """
+    Extract details for many images, streaming NDJSON lines as each finishes:
+    {"index": i, "imageUrl": ..., "result": {...}} or {"index": i, "imageUrl": ..., "error": "..."}
+    followed by {"done": true, "succeeded": n, "failed": m}.
+
+    Repeated URLs (after normalization) are extracted once and reported for each index.
+    """
+    urls = [str(url) for url in req.imageUrls]
+    indexes_by_key: Dict[str, List[int]] = {}
+    first_url: Dict[str, str] = {}
+    for index, url in enumerate(urls):
+        key = normalize_image_url(url)
+        indexes_by_key.setdefault(key, []).append(index)
+        first_url.setdefault(key, url)
+
+    semaphore = asyncio.Semaphore(_batch_concurrency(req.concurrency))
+
+    async def run(key: str):
+        async with semaphore:
+            try:
+                result = await extract_cache.get_or_compute(first_url[key], _extract)
+                return key, result.model_dump(), None
+            except Exception as e:
+                return key, None, f"Failed to extract details: {e}"
+
+    async def lines():
+        tasks = [asyncio.create_task(run(key)) for key in indexes_by_key]
+        succeeded = failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                key, result, error = await next_done
+                for index in indexes_by_key[key]:
+                    line = {"index": index, "imageUrl": urls[index]}
+                    if error is None:
+                        line["result"] = result
+                        succeeded += 1
+                    else:
+                        line["error"] = error
+                        failed += 1
+                    yield json.dumps(line) + "\n"
+            yield json.dumps({"done": True, "succeeded": succeeded, "failed": failed}) + "\n"
+        finally:
+            # Client went away: stop the calls that have not finished yet.
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")